@@ -25,6 +25,13 @@ WINDOW = {
 
 MUSIC = None
 
+# GPU timer queries for effects and profiler scopes
+PROFILING = {
+    "enabled": False,
+    "latency": 3,
+    "samples": 60,
+}
+
 TIMER = 'demosys.timers.clock.Timer'
 
 TIMELINE = 'demosys.timeline.single.Timeline'
@@ -77,6 +84,7 @@ SCENE_LOADERS = (
     "demosys.loaders.scene.gltf.GLTF2",
     "demosys.loaders.scene.wavefront.ObjLoader",
     "demosys.loaders.scene.stl_loader.STLLoader",
+    "demosys.loaders.scene.dscene.DSceneLoader",
 )
 
 DATA_DIRS = ()
@@ -6,6 +6,7 @@ import moderngl
 import demosys
 from demosys import project
 from demosys.conf import settings
+from demosys.opengl.profiler import profiler
 from demosys.view import screenshot
 
 GLVersion = namedtuple('GLVersion', ['major', 'minor', 'code'])
@@ -72,6 +73,8 @@ class BaseWindow:
         # ModernGL context
         self.ctx = None
 
+        profiler.configure(**getattr(settings, 'PROFILING', {}))
+
     @property
     def size(self) -> Tuple[int, int]:
         """
@@ -106,6 +109,7 @@ class BaseWindow:
         """
         self.set_default_viewport()
         self.timeline.draw(current_time, frame_time, self.fbo)
+        profiler.end_frame()
 
     def clear(self):
         """
@@ -2,6 +2,7 @@ from pyrr import matrix44
 
 import moderngl
 from demosys import geometry
+from demosys.opengl.profiler import profiler
 from demosys.opengl.texture import helper
 from demosys.effects import Effect
 
@@ -32,20 +33,20 @@ class DeferredRenderer(Effect):
                 depth_attachment=depth_texture,
             )
 
-        self.gbuffer_scope = self.ctx.scope(
+        self.gbuffer_scope = profiler.scope("geometry", scope=self.ctx.scope(
             self.gbuffer,
             enable_only=moderngl.DEPTH_TEST | moderngl.CULL_FACE
-        )
+        ))
 
         if not self.lightbuffer:
             self.lightbuffer = self.ctx.framebuffer(
                 self.ctx.texture(self.size, 4),
             )
 
-        self.lightbuffer_scope = self.ctx.scope(
+        self.lightbuffer_scope = profiler.scope("lights", scope=self.ctx.scope(
             self.lightbuffer,
             enable_only=moderngl.BLEND | moderngl.CULL_FACE
-        )
+        ))
 
         # Unit cube for point lights (cube with radius 1.0)
         self.unit_cube = geometry.cube(width=2, height=2, depth=2)
@@ -123,11 +124,12 @@ class DeferredRenderer(Effect):
 
     def combine(self):
         """Combine diffuse and light buffer"""
-        self.gbuffer.color_attachments[0].use(location=0)
-        self.combine_shader["diffuse_buffer"].value = 0
-        self.lightbuffer.color_attachments[0].use(location=1)
-        self.combine_shader["light_buffer"].value = 1
-        self.quad.render(self.combine_shader)
+        with profiler.scope("combine"):
+            self.gbuffer.color_attachments[0].use(location=0)
+            self.combine_shader["diffuse_buffer"].value = 0
+            self.lightbuffer.color_attachments[0].use(location=1)
+            self.combine_shader["light_buffer"].value = 1
+            self.quad.render(self.combine_shader)
 
     def clear(self):
         """clear all buffers"""
@@ -2,7 +2,7 @@ import numpy
 from pyrr import matrix44
 
 import moderngl
-from demosys.opengl.vao import VAO
+from demosys.opengl.vao import VAO, DynamicBuffer
 
 from .base import BaseText, FontMeta
 
@@ -33,7 +33,8 @@ class TextWriter2D(BaseText):
 
         self._init(FontMeta(self._config))
 
-        self._string_buffer = self.ctx.buffer(reserve=self.area[0] * 4 * self.area[1])
+        # Orphan the string buffer when rewritten after a draw instead of keeping a ring
+        self._string_buffer = DynamicBuffer(self.area[0] * 4 * self.area[1], regions=1, name="textwriter")
         self._string_buffer.clear(chunk=b'\32')
         pos = self.ctx.buffer(data=bytes([0] * 4 * 3))
 
@@ -78,7 +79,7 @@ class TextWriter2D(BaseText):
 
         self._string_buffer.clear(size=self.area[0] * 4, offset=self.area[0] * 4 * line, chunk=b'\32')
 
-        self._string_buffer.write(
+        self._string_buffer.update(
             numpy.fromiter(
                 self._translate_string(text.encode('iso-8859-1', errors='replace'), self.area[0]),
                 dtype=numpy.uint32
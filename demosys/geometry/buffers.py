@@ -0,0 +1,28 @@
+from demosys.opengl.quantize import quantize_vertices
+from demosys.opengl.vao import interleave_vertices
+
+
+def add_vertex_buffers(vao, attributes, interleave=False, quantize=False):
+    """
+    Add generated attribute arrays to a VAO. Interleaving and quantizing
+    is done on the CPU so the data is only uploaded once.
+
+    Args:
+        vao: The :py:class:`demosys.opengl.vao.VAO`
+        attributes: List of ``(name, format, values)`` tuples
+
+    Keyword Args:
+        interleave (bool): Interleave the attributes in a single buffer
+        quantize (bool): Interleave and store normals and uvs as half floats
+    """
+    if not interleave and not quantize:
+        for name, frmt, values in attributes:
+            vao.buffer(values, frmt, [name])
+        return
+
+    data, buffer_format = interleave_vertices(attributes)
+    if quantize:
+        # Half floats are read as floats so shaders need no changes
+        data, buffer_format, _ = quantize_vertices(data, buffer_format, {'in_normal': 'half', 'in_uv': 'half'})
+
+    vao.buffer(data, buffer_format, list(data.dtype.names))
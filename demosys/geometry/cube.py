@@ -1,9 +1,11 @@
 import numpy
 
+from demosys.geometry.buffers import add_vertex_buffers
 from demosys.opengl.vao import VAO
 
 
-def cube(width, height, depth, center=(0.0, 0.0, 0.0), normals=True, uvs=True) -> VAO:
+def cube(width, height, depth, center=(0.0, 0.0, 0.0), normals=True, uvs=True, interleave=False,
+         quantize=False) -> VAO:
     """
     Creates a cube VAO with normals and texture coordinates
 
@@ -16,6 +18,8 @@ def cube(width, height, depth, center=(0.0, 0.0, 0.0), normals=True, uvs=True) -
         center: center of the cube as a 3-component tuple
         normals: (bool) Include normals
         uvs: (bool) include uv coordinates
+        interleave: (bool) Interleave the attributes in a single buffer
+        quantize: (bool) Interleave and store normals and uvs as half floats
 
     Returns:
         A :py:class:`demosys.opengl.vao.VAO` instance
@@ -144,10 +148,12 @@ def cube(width, height, depth, center=(0.0, 0.0, 0.0), normals=True, uvs=True) -
     vao = VAO("geometry:cube")
 
     # Add buffers
-    vao.buffer(pos, '3f', ['in_position'])
+    attributes = [('in_position', '3f', pos)]
     if normals:
-        vao.buffer(normal_data, '3f', ['in_normal'])
+        attributes.append(('in_normal', '3f', normal_data))
     if uvs:
-        vao.buffer(uvs_data, '2f', ['in_uv'])
+        attributes.append(('in_uv', '2f', uvs_data))
+
+    add_vertex_buffers(vao, attributes, interleave=interleave, quantize=quantize)
 
     return vao
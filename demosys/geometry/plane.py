@@ -1,10 +1,11 @@
 import numpy
 
 import moderngl
+from demosys.geometry.buffers import add_vertex_buffers
 from demosys.opengl.vao import VAO
 
 
-def plane_xz(size=(10, 10), resolution=(10, 10)) -> VAO:
+def plane_xz(size=(10, 10), resolution=(10, 10), interleave=False, quantize=False) -> VAO:
     """
     Generates a plane on the xz axis of a specific size and resolution.
     Normals and texture coordinates are also included.
@@ -13,6 +14,10 @@ def plane_xz(size=(10, 10), resolution=(10, 10)) -> VAO:
         size: (x, y) tuple
         resolution: (x, y) tuple
 
+    Keyword Args:
+        interleave (bool): Interleave the attributes in a single buffer
+        quantize (bool): Interleave and store normals and uvs as half floats
+
     Returns:
         A :py:class:`demosys.opengl.vao.VAO` instance
     """
@@ -59,10 +64,12 @@ def plane_xz(size=(10, 10), resolution=(10, 10)) -> VAO:
 
     vao = VAO("plane_xz", mode=moderngl.TRIANGLES)
 
-    vao.buffer(pos_data, '3f', ['in_position'])
-    vao.buffer(uv_data, '2f', ['in_uv'])
-    vao.buffer(normal_data, '3f', ['in_normal'])
+    add_vertex_buffers(vao, [
+        ('in_position', '3f', pos_data),
+        ('in_uv', '2f', uv_data),
+        ('in_normal', '3f', normal_data),
+    ], interleave=interleave, quantize=quantize)
 
-    vao.index_buffer(index_data, index_element_size=4)
+    vao.index_buffer(index_data, narrow=True)
 
     return vao
@@ -3,10 +3,11 @@ import math
 import numpy
 
 import moderngl as mlg
+from demosys.geometry.buffers import add_vertex_buffers
 from demosys.opengl.vao import VAO
 
 
-def sphere(radius=0.5, sectors=32, rings=16) -> VAO:
+def sphere(radius=0.5, sectors=32, rings=16, interleave=False, quantize=False) -> VAO:
     """
     Creates a sphere.
 
@@ -14,6 +15,8 @@ def sphere(radius=0.5, sectors=32, rings=16) -> VAO:
         radius (float): Radius or the sphere
         rings (int): number or horizontal rings
         sectors (int): number of vertical segments
+        interleave (bool): Interleave the attributes in a single buffer
+        quantize (bool): Interleave and store normals and uvs as half floats
 
     Returns:
         A :py:class:`demosys.opengl.vao.VAO` instance
@@ -67,9 +70,11 @@ def sphere(radius=0.5, sectors=32, rings=16) -> VAO:
 
     vao = VAO("sphere", mode=mlg.TRIANGLES)
     # VBOs
-    vao.buffer(vbo_vertices, '3f', ['in_position'])
-    vao.buffer(vbo_normals, '3f', ['in_normal'])
-    vao.buffer(vbo_uvs, '2f', ['in_uv'])
-    vao.index_buffer(vbo_elements, index_element_size=4)
+    add_vertex_buffers(vao, [
+        ('in_position', '3f', vbo_vertices),
+        ('in_normal', '3f', vbo_normals),
+        ('in_uv', '2f', vbo_uvs),
+    ], interleave=interleave, quantize=quantize)
+    vao.index_buffer(vbo_elements, narrow=True)
 
     return vao
@@ -11,6 +11,7 @@ class Loader(BaseLoader):
         fs_source = self.load_shader("fragment", self.meta.fragment_shader)
         tc_source = self.load_shader("tess_control", self.meta.tess_control_shader)
         te_source = self.load_shader("tess_evaluation", self.meta.tess_evaluation_shader)
+        cs_source = self.load_shader("compute", self.meta.compute_shader)
 
         shaders = program.ProgramShaders.from_separate(
             self.meta,
@@ -19,6 +20,7 @@ class Loader(BaseLoader):
             fragment_source=fs_source,
             tess_control_source=tc_source,
             tess_evaluation_source=te_source,
+            compute_source=cs_source,
         )
         prog = shaders.create()
 
@@ -1,6 +1,7 @@
 from pathlib import Path
 
 from demosys.loaders.base import BaseLoader
+from demosys.opengl.arena import shared_arena
 from demosys.scene import Scene
 
 
@@ -11,11 +12,18 @@ class SceneLoader(BaseLoader):
 
     def __init__(self, meta):
         super().__init__(meta)
+        # Loaders may replace meta with the parsed file
+        self._use_arena = meta.arena
 
     def load(self) -> Scene:
         """Load the scene"""
         raise NotImplementedError()
 
+    @property
+    def arena(self):
+        """The :py:class:`BufferArena` to allocate vertex data from or ``None``"""
+        return shared_arena() if self._use_arena else None
+
     @classmethod
     def supports_file(cls, meta):
         """Check if the loader has a supported file extension"""
@@ -0,0 +1,156 @@
+import numpy
+
+from demosys.loaders.scene.base import SceneLoader
+from demosys.opengl.vao import VAO
+from demosys.resources import textures
+from demosys.resources.meta import TextureDescription
+from demosys.scene import Material, MaterialTexture, Mesh, Node, Scene
+from demosys.scene.snapshot import Snapshot
+
+
+class DSceneLoader(SceneLoader):
+    """
+    Load scene snapshots written by :py:meth:`Scene.write_snapshot`.
+    Buffers are uploaded straight from the memory mapped file.
+    """
+    file_extensions = [
+        ['.dscene'],
+    ]
+
+    def load(self):
+        path = self.find_scene(self.meta.path)
+        if not path:
+            raise ValueError("Scene '{}' not found".format(self.meta.path))
+
+        self.meta.resolved_path = path
+        with Snapshot(path) as snapshot:
+            scene = self.load_snapshot(snapshot)
+
+        scene.prepare()
+        return scene
+
+    def load_snapshot(self, snapshot) -> Scene:
+        """Create the scene described by a snapshot"""
+        header = snapshot.header
+        scene = Scene(self.meta.resolved_path)
+
+        scene_textures = [self.load_texture(snapshot, info) for info in header['textures']]
+        samplers = [
+            self.ctx.sampler(
+                filter=tuple(info['filter']),
+                repeat_x=info['repeat_x'],
+                repeat_y=info['repeat_y'],
+                anisotropy=info['anisotropy'],
+            )
+            for info in header['samplers']
+        ]
+
+        for info in header['materials']:
+            material = Material(info['name'])
+            material.color = info['color']
+            material.double_sided = info['double_sided']
+            if info['texture'] is not None or info['sampler'] is not None:
+                material.mat_texture = MaterialTexture(
+                    texture=scene_textures[info['texture']] if info['texture'] is not None else None,
+                    sampler=samplers[info['sampler']] if info['sampler'] is not None else None,
+                )
+            scene.materials.append(material)
+
+        vaos = [self.load_vao(snapshot, info) for info in header['vaos']]
+
+        meshes = []
+        for info in header['meshes']:
+            mesh = Mesh(
+                info['name'],
+                vao=vaos[info['vao']] if info['vao'] is not None else None,
+                material=scene.materials[info['material']] if info['material'] is not None else None,
+                attributes=info['attributes'],
+                bbox_min=_array(info['bbox_min']),
+                bbox_max=_array(info['bbox_max']),
+            )
+            mesh.quantization = {
+                attr_type: tuple(encoding) for attr_type, encoding in info['quantization'].items()
+            }
+            meshes.append(mesh)
+
+        for mesh, info in zip(meshes, header['meshes']):
+            mesh.lods = [(size, meshes[index]) for size, index in info['lods']]
+
+        scene.meshes = [meshes[index] for index in header['scene_meshes']]
+
+        matrices = snapshot.array(header['matrices'], 'f4').reshape(-1, 4, 4)
+        for info, matrix in zip(header['nodes'], matrices):
+            node = Node(
+                mesh=meshes[info['mesh']] if info['mesh'] is not None else None,
+                matrix=matrix if info['matrix'] else None,
+            )
+            scene.nodes.append(node)
+
+        for node, info in zip(scene.nodes, header['nodes']):
+            node.children = [scene.nodes[index] for index in info['children']]
+
+        scene.root_nodes = [scene.nodes[index] for index in header['roots']]
+
+        # Snapshots store the bounding box of the scene
+        if header['bbox_min'] is not None and header['bbox_max'] is not None:
+            scene.bbox_min = _array(header['bbox_min'])
+            scene.bbox_max = _array(header['bbox_max'])
+            scene.diagonal_size = float(numpy.linalg.norm(scene.bbox_max - scene.bbox_min))
+
+        return scene
+
+    def load_vao(self, snapshot, info) -> VAO:
+        """Create a VAO uploading its buffers from the mapped blobs"""
+        vao = VAO(info['name'], mode=info['mode'])
+
+        for buffer in info['buffers']:
+            with snapshot.blob(buffer['data']) as data:
+                vao.buffer(
+                    self.upload(data, arena=not buffer['per_instance']),
+                    buffer['format'],
+                    buffer['attributes'],
+                    per_instance=buffer['per_instance'],
+                    arena=self.arena,
+                )
+
+        if info['indices']:
+            with snapshot.blob(info['indices']['data']) as data:
+                vao.index_buffer(
+                    self.upload(data),
+                    index_element_size=info['indices']['element_size'],
+                    arena=self.arena,
+                )
+
+        return vao
+
+    def upload(self, data, arena=True):
+        """
+        Upload a blob. Arena allocations get a numpy view of the blob
+        and other data a buffer created directly from the mapped memory.
+        """
+        if arena and self.arena is not None:
+            return numpy.frombuffer(data, dtype='u1')
+
+        return self.ctx.buffer(data)
+
+    def load_texture(self, snapshot, info):
+        """Load textures referenced by path or create them from the stored pixels"""
+        if 'path' in info:
+            return textures.load(TextureDescription(
+                label=info['path'],
+                path=info['path'],
+                flip=info['flip'],
+                mipmap=info['mipmap'],
+            ))
+
+        with snapshot.blob(info['data']) as data:
+            texture = self.ctx.texture(tuple(info['size']), info['components'], data, dtype=info['dtype'])
+
+        if info['mipmap']:
+            texture.build_mipmaps()
+
+        return texture
+
+
+def _array(value):
+    return None if value is None else numpy.array(value, dtype='f4')
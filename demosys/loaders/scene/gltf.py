@@ -2,6 +2,7 @@
 import base64
 import io
 import json
+import mmap
 import os
 import struct
 from collections import namedtuple
@@ -11,7 +12,6 @@ from PIL import Image
 from pyrr import Matrix44, matrix44, quaternion
 
 import moderngl
-from demosys import context
 from demosys.loaders.scene.base import SceneLoader
 from demosys.loaders.texture import t2d
 from demosys.opengl.vao import VAO
@@ -103,6 +103,7 @@ class GLTF2(SceneLoader):
         if not self.path:
             raise ValueError("Scene '{}' not found".format(self.meta.path))
 
+        self.meta.resolved_path = self.path
         self.scene = Scene(self.path)
 
         # Load gltf json file
@@ -113,14 +114,18 @@ class GLTF2(SceneLoader):
         if self.path.suffix == '.glb':
             self.load_glb()
 
-        self.meta.check_version()
-        self.meta.check_extensions(self.supported_extensions)
-        self.load_images()
-        self.load_samplers()
-        self.load_textures()
-        self.load_materials()
-        self.load_meshes()
-        self.load_nodes()
+        try:
+            self.meta.check_version()
+            self.meta.check_extensions(self.supported_extensions)
+            self.load_images()
+            self.load_samplers()
+            self.load_textures()
+            self.load_materials()
+            self.load_meshes()
+            self.load_nodes()
+        finally:
+            # Everything is uploaded. Unmap the buffers.
+            self.meta.close()
 
         self.scene.calc_scene_bbox()
         self.scene.prepare()
@@ -133,7 +138,7 @@ class GLTF2(SceneLoader):
             self.meta = GLTFMeta(self.path, json.load(fd))
 
     def load_glb(self):
-        """Loads a binary gltf file"""
+        """Loads a binary gltf file. The binary chunk is memory mapped instead of read."""
         with open(self.path, 'rb') as fd:
             # Check header
             magic = fd.read(4)
@@ -161,7 +166,8 @@ class GLTF2(SceneLoader):
             if chunk_1_type != b'BIN\x00':
                 raise ValueError("Expected BIN chunk, not {} in file {}".format(chunk_1_type, self.path))
 
-            self.meta = GLTFMeta(self.path, json.loads(json_meta), binary_buffer=fd.read(chunk_1_length))
+            self.meta = GLTFMeta(self.path, json.loads(json_meta))
+            self.meta.buffers[0].map(self.path, offset=fd.tell(), length=chunk_1_length)
 
     def load_images(self):
         for image in self.meta.images:
@@ -195,7 +201,7 @@ class GLTF2(SceneLoader):
     def load_meshes(self):
         for meta_mesh in self.meta.meshes:
             # Returns a list of meshes
-            meshes = meta_mesh.load(self.materials)
+            meshes = meta_mesh.load(self.materials, arena=self.arena)
             self.meshes.append(meshes)
 
             for mesh in meshes:
@@ -255,11 +261,10 @@ class GLTF2(SceneLoader):
 
 class GLTFMeta:
     """Container for gltf metadata"""
-    def __init__(self, path, data, binary_buffer=None):
+    def __init__(self, path, data):
         """
         :param file: GLTF file name loaded
         :param data: Metadata (json loaded)
-        :param binary_buffer: Binary buffer when loading glb files
         """
         self.data = data
         self.path = path
@@ -279,10 +284,6 @@ class GLTFMeta:
         self.accessors = [GLTFAccessor(i, a) for i, a in enumerate(data['accessors'])] \
             if data.get('accessors') else []
 
-        # glb files can contain buffer 0 data
-        if binary_buffer:
-            self.buffers[0].data = binary_buffer
-
         self._link_data()
 
         self.buffers_exist()
@@ -351,6 +352,14 @@ class GLTFMeta:
         """checks if the images references in textures exist"""
         pass
 
+    def close(self) -> bool:
+        """
+        Release the data of all buffers
+
+        :return: ``True`` if every mapped file was unmapped
+        """
+        return all([buffer.close() for buffer in self.buffers])
+
 
 class GLTFAsset:
     """Asset Information"""
@@ -373,14 +382,14 @@ class GLTFMesh:
         self.name = data.get('name')
         self.primitives = [Primitives(p) for p in data.get('primitives')]
 
-    def load(self, materials):
+    def load(self, materials, arena=None):
         name_map = {
             'POSITION': 'in_position',
             'NORMAL': 'in_normal',
             'TEXCOORD_0': 'in_uv',
             'TANGENT': 'in_tangent',
             'JOINTS_0': 'in_joints',
-            'WEIGHTS_0': 'in_heights',
+            'WEIGHTS_0': 'in_weights',
             'COLOR_0': 'in_color0',
         }
 
@@ -395,8 +404,7 @@ class GLTFMesh:
             # Index buffer
             component_type, index_vbo = self.load_indices(primitive)
             if index_vbo is not None:
-                vao.index_buffer(context.ctx().buffer(index_vbo.tobytes()),
-                                 index_element_size=component_type.size)
+                vao.index_buffer(index_vbo, index_element_size=component_type.size, narrow=True, arena=arena)
 
             attributes = {}
             vbos = self.prepare_attrib_mapping(primitive)
@@ -407,6 +415,7 @@ class GLTFMesh:
                     buffer,
                     " ".join(["{}{}".format(attr[1], DTYPE_BUFFER_TYPE[dtype]) for attr in vbo_info.attributes]),
                     [name_map[attr[0]] for attr in vbo_info.attributes],
+                    arena=arena,
                 )
 
                 for attr in vbo_info.attributes:
@@ -575,7 +584,9 @@ class GLTFBuffer:
         self.path = path
         self.byteLength = data.get('byteLength')
         self.uri = data.get('uri')
+        # memoryview of the buffer content
         self.data = None
+        self._mmap = None
 
     @property
     def has_data_uri(self):
@@ -591,20 +602,72 @@ class GLTFBuffer:
         return self.uri is not None and not self.has_data_uri
 
     def open(self):
-        if self.data:
+        if self.data is not None:
             return
 
         if self.has_data_uri:
-            self.data = base64.b64decode(self.uri[self.uri.find(',') + 1:])
+            self.data = memoryview(base64.b64decode(self.uri[self.uri.find(',') + 1:]))
             return
 
-        with open(self.path / self.uri, 'rb') as fd:
-            self.data = fd.read()
+        self.map(self.path / self.uri)
+
+    def map(self, path, offset=0, length=None):
+        """
+        Memory map a file and use a range of it as the buffer content
+
+        :param path: The file to map
+        :param offset: Byte offset of the buffer in the file
+        :param length: Byte length of the buffer. The rest of the file by default.
+        """
+        with open(str(path), 'rb') as fd:
+            if not os.fstat(fd.fileno()).st_size:
+                self.data = memoryview(b'')
+                return
+
+            self._mmap = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+        length = len(self._mmap) - offset if length is None else length
+        with memoryview(self._mmap) as view:
+            self.data = view[offset:offset + length]
 
     def read(self, byte_offset=0, byte_length=0):
+        """
+        Read a range of the buffer
+
+        :return: ``memoryview`` of the range. No data is copied, so the
+                 view and arrays created from it keep a mapped file open.
+        """
         self.open()
         return self.data[byte_offset:byte_offset + byte_length]
 
+    def close(self) -> bool:
+        """
+        Release the buffer content and unmap the file.
+
+        Views returned by :py:meth:`read` and numpy arrays created from them
+        reference the mapped memory. If any of them are still alive the
+        mapping can not be closed here and the file stays mapped until the
+        last of them is garbage collected. The loader uploads accessors
+        straight to buffers and keeps no arrays, so this only happens when
+        views are held outside the loader.
+
+        :return: ``True`` if the file was unmapped or nothing was mapped
+        """
+        if self.data is not None:
+            self.data.release()
+
+        closed = True
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Exported views keep the mapping alive. It is unmapped when they are collected.
+                closed = False
+
+        self.data = None
+        self._mmap = None
+        return closed
+
 
 class GLTFScene:
     def __init__(self, data):
@@ -5,7 +5,7 @@ import numpy
 import trimesh
 
 from demosys.loaders.scene.base import SceneLoader
-from demosys.opengl.vao import VAO
+from demosys.opengl.vao import VAO, interleave_vertices
 from demosys.scene import Material, Mesh, Node, Scene
 
 
@@ -20,6 +20,7 @@ class STLLoader(SceneLoader):
         if not path:
             raise ValueError("Scene '{}' not found".format(self.meta.path))
 
+        self.meta.resolved_path = path
         file_obj = str(path)
         if file_obj.endswith('.gz'):
             file_obj = gzip.GzipFile(file_obj)
@@ -29,16 +30,30 @@ class STLLoader(SceneLoader):
         scene_mesh = Mesh("mesh")
         scene_mesh.material = Material("default")
 
+        vertices = numpy.array(stl_mesh.vertices, dtype='f4')
+        scene_mesh.bbox_min = vertices.min(axis=0)
+        scene_mesh.bbox_max = vertices.max(axis=0)
+
+        attributes = [
+            ('in_position', '3f', vertices),
+            ('in_normal', '3f', numpy.array(stl_mesh.vertex_normals, dtype='f4')),
+        ]
+
         vao = VAO("mesh", mode=moderngl.TRIANGLES)
-        vao.buffer(numpy.array(stl_mesh.vertices, dtype='f4'), '3f', ['in_position'])
-        vao.buffer(numpy.array(stl_mesh.vertex_normals, dtype='f4'), '3f', ['in_normal'])
-        vao.index_buffer(numpy.array(stl_mesh.faces, dtype='u4'))
+        if self.meta.interleave:
+            data, buffer_format = interleave_vertices(attributes)
+            vao.buffer(data, buffer_format, list(data.dtype.names), arena=self.arena)
+        else:
+            for name, frmt, values in attributes:
+                vao.buffer(values, frmt, [name], arena=self.arena)
+        vao.index_buffer(numpy.array(stl_mesh.faces, dtype='u4'), narrow=True, arena=self.arena)
         scene_mesh.vao = vao
         scene_mesh.add_attribute('POSITION', 'in_position', 3)
         scene_mesh.add_attribute('NORMAL', 'in_normal', 3)
 
         scene.meshes.append(scene_mesh)
         scene.root_nodes.append(Node(mesh=scene_mesh))
+        scene.calc_scene_bbox()
         scene.prepare()
 
         return scene
@@ -25,7 +25,7 @@ def translate_buffer_format(vertex_format):
     if "C3F" in vertex_format:
         buffer_format.append("3f")
         attributes.append("in_color")
-        mesh_attributes.append(("NORMAL", "in_color", 3))
+        mesh_attributes.append(("COLOR_0", "in_color", 3))
 
     if "N3F" in vertex_format:
         buffer_format.append("3f")
@@ -39,17 +39,34 @@ def translate_buffer_format(vertex_format):
     return " ".join(buffer_format), attributes, mesh_attributes
 
 
+def calc_bbox(vertices, buffer_format):
+    """
+    Bounding box of interleaved float vertices. The position is the last attribute.
+
+    :param vertices: Flat ``numpy.array`` of floats
+    :param buffer_format: The buffer format from :py:func:`translate_buffer_format`
+    :return: (bbox_min, bbox_max) tuple or ``(None, None)`` without vertices
+    """
+    stride = sum(int(frmt[:-1]) for frmt in buffer_format.split())
+    positions = vertices.reshape(-1, stride)[:, -3:]
+    if not len(positions):
+        return None, None
+
+    return positions.min(axis=0), positions.max(axis=0)
+
+
 class VAOCacheLoader(cache.CacheLoader):
     """Load geometry data directly into vaos"""
 
     def load_vertex_buffer(self, fd, material, length):
         buffer_format, attributes, mesh_attributes = translate_buffer_format(material.vertex_format)
 
+        data = fd.read(length)
         vao = VAO(material.name, mode=moderngl.TRIANGLES)
-        # buffer = context.ctx().buffer(fd.read(length))
-        vao.buffer(fd.read(length), buffer_format, attributes)
+        vao.buffer(data, buffer_format, attributes)
 
         setattr(material, 'vao', vao)
+        setattr(material, 'bbox', calc_bbox(numpy.frombuffer(data, dtype='f4'), buffer_format))
         setattr(material, 'buffer_format', buffer_format)
         setattr(material, 'attributes', attributes)
         setattr(material, 'mesh_attributes', mesh_attributes)
@@ -79,6 +96,8 @@ class ObjLoader(SceneLoader):
         if path.suffix == '.bin':
             path = path.parent / path.stem
 
+        self.meta.resolved_path = path
+
         data = pywavefront.Wavefront(str(path), create_materials=True, cache=True)
         scene = Scene(self.meta.resolved_path)
         texture_cache = {}
@@ -92,8 +111,9 @@ class ObjLoader(SceneLoader):
                 vbo = numpy.array(mat.vertices, dtype='f4')
 
                 vao = VAO(mat.name, mode=moderngl.TRIANGLES)
-                vao.buffer(vbo, buffer_format, attributes)
+                vao.buffer(vbo, buffer_format, attributes, arena=self.arena)
                 mesh.vao = vao
+                mesh.bbox_min, mesh.bbox_max = calc_bbox(vbo, buffer_format)
 
                 for attrs in mesh_attributes:
                     mesh.add_attribute(*attrs)
@@ -102,6 +122,7 @@ class ObjLoader(SceneLoader):
             elif hasattr(mat, 'vao'):
                 mesh = Mesh(mat.name)
                 mesh.vao = mat.vao
+                mesh.bbox_min, mesh.bbox_max = mat.bbox
                 for attrs in mat.mesh_attributes:
                     mesh.add_attribute(*attrs)
             else:
@@ -134,8 +155,8 @@ class ObjLoader(SceneLoader):
             node = Node(mesh=mesh)
             scene.root_nodes.append(node)
 
-        # Not supported yet for obj
-        # self.calc_scene_bbox()
+        # Obj files have no bounding boxes. Mesh boxes are calculated from the loaded vertices.
+        scene.calc_scene_bbox()
         scene.prepare()
 
         return scene
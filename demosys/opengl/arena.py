@@ -0,0 +1,228 @@
+"""
+Suballocation of vertex and index data from a few large buffers
+"""
+import bisect
+
+import moderngl
+from demosys import context
+
+_shared = None
+
+
+class BufferRange:
+    """A range of bytes in a buffer owned by a :py:class:`BufferArena`"""
+    def __init__(self, arena, block, offset: int, size: int, allocated: int):
+        """
+        :param arena: The arena owning the range
+        :param block: The arena block the range belongs to
+        :param offset: Byte offset in the buffer
+        :param size: Byte size of the range
+        :param allocated: Bytes reserved in the buffer including alignment
+        """
+        self.arena = arena
+        self.block = block
+        self.offset = offset
+        self.size = size
+        self.allocated = allocated
+
+    @property
+    def buffer(self) -> moderngl.Buffer:
+        """The ``moderngl.Buffer`` containing the range"""
+        return self.block.buffer
+
+    @property
+    def released(self) -> bool:
+        """(bool) Has the range been returned to the arena?"""
+        return self.block is None
+
+    def write(self, data, offset=0):
+        """
+        Write data to the range
+
+        Args:
+            data: ``bytes`` or an object supporting the buffer protocol
+
+        Keyword Args:
+            offset (int): Byte offset into the range
+        """
+        data = memoryview(data).cast('B')
+        if offset + len(data) > self.size:
+            raise ValueError("Writing {} bytes at offset {} overflows range of {} bytes".format(
+                len(data), offset, self.size))
+
+        self.buffer.write(data, offset=self.offset + offset)
+
+    def read(self) -> bytes:
+        """Read the contents of the range"""
+        return self.buffer.read(size=self.size, offset=self.offset)
+
+    def release(self):
+        """Return the range to the arena"""
+        if not self.released:
+            self.arena.free(self)
+
+    def __str__(self):
+        return "<BufferRange offset={} size={}>".format(self.offset, self.size)
+
+    def __repr__(self):
+        return str(self)
+
+
+class ArenaBlock:
+    """A buffer in the arena with a sorted list of free ``[offset, size]`` ranges"""
+    def __init__(self, buffer: moderngl.Buffer):
+        self.buffer = buffer
+        self.size = buffer.size
+        self.free = [[0, buffer.size]]
+        self.used = 0
+
+    def allocate(self, size: int):
+        """First fit allocation. Returns the offset or ``None``"""
+        for i, (offset, free_size) in enumerate(self.free):
+            if free_size < size:
+                continue
+
+            if free_size == size:
+                del self.free[i]
+            else:
+                self.free[i] = [offset + size, free_size - size]
+
+            self.used += size
+            return offset
+
+        return None
+
+    def release(self, offset: int, size: int):
+        """Return a range merging it with neighbouring free ranges"""
+        i = bisect.bisect(self.free, [offset, size])
+        self.free.insert(i, [offset, size])
+        self.used -= size
+
+        if i + 1 < len(self.free) and offset + size == self.free[i + 1][0]:
+            self.free[i][1] += self.free.pop(i + 1)[1]
+
+        if i > 0 and self.free[i - 1][0] + self.free[i - 1][1] == offset:
+            self.free[i - 1][1] += self.free.pop(i)[1]
+
+
+class BufferArena:
+    """
+    Allocates aligned ranges from a few large buffers
+    instead of creating a buffer for every small mesh::
+
+        arena = BufferArena()
+        vao = VAO("mesh")
+        vao.buffer(positions, '3f', ['in_position'], arena=arena)
+        vao.index_buffer(indices, narrow=True, arena=arena)
+
+    Freed ranges are merged with neighbouring free space.
+    Blocks are added when no free range is large enough.
+    Ranges larger than the block size get a block of their own.
+    """
+    def __init__(self, block_size=16 * 1024 * 1024, alignment=16):
+        """
+        Keyword Args:
+            block_size (int): Byte size of each buffer
+            alignment (int): Byte alignment of each range.
+                             Must be a multiple of the largest index element size.
+        """
+        self.ctx = context.ctx()
+        self.block_size = block_size
+        self.alignment = alignment
+        self.blocks = []
+        self.allocations = 0
+
+    def allocate(self, size: int) -> BufferRange:
+        """
+        Allocate a range
+
+        Args:
+            size (int): Byte size of the range
+
+        Returns:
+            A :py:class:`BufferRange`
+        """
+        allocated = max(size + (-size % self.alignment), self.alignment)
+
+        for block in self.blocks:
+            offset = block.allocate(allocated)
+            if offset is not None:
+                break
+        else:
+            block = ArenaBlock(self.ctx.buffer(reserve=max(self.block_size, allocated)))
+            self.blocks.append(block)
+            offset = block.allocate(allocated)
+
+        self.allocations += 1
+        return BufferRange(self, block, offset, size, allocated)
+
+    def allocate_data(self, data) -> BufferRange:
+        """
+        Allocate a range and write data to it
+
+        Args:
+            data: ``bytes``, ``numpy.array`` or an object supporting the buffer protocol
+
+        Returns:
+            A :py:class:`BufferRange`
+        """
+        data = memoryview(data).cast('B')
+        buffer_range = self.allocate(len(data))
+        buffer_range.write(data)
+        return buffer_range
+
+    def free(self, buffer_range: BufferRange):
+        """
+        Return a range to the arena.
+        Empty blocks are released except the first one.
+
+        Args:
+            buffer_range: The :py:class:`BufferRange` to free
+        """
+        block = buffer_range.block
+        block.release(buffer_range.offset, buffer_range.allocated)
+        buffer_range.block = None
+        self.allocations -= 1
+
+        if not block.used and block is not self.blocks[0]:
+            self.blocks.remove(block)
+            block.buffer.release()
+
+    @property
+    def used(self) -> int:
+        """(int) Bytes allocated including alignment"""
+        return sum(block.used for block in self.blocks)
+
+    @property
+    def capacity(self) -> int:
+        """(int) Total byte size of all blocks"""
+        return sum(block.size for block in self.blocks)
+
+    def release(self):
+        """Release all blocks. Ranges allocated from the arena can no longer be used."""
+        for block in self.blocks:
+            block.buffer.release()
+
+        self.blocks = []
+        self.allocations = 0
+
+    def __str__(self):
+        return "<BufferArena blocks={} allocations={} used={}/{}>".format(
+            len(self.blocks), self.allocations, self.used, self.capacity)
+
+    def __repr__(self):
+        return str(self)
+
+
+def shared_arena() -> BufferArena:
+    """
+    The arena shared by scene loaders. Created on first use.
+
+    Returns:
+        A :py:class:`BufferArena`
+    """
+    global _shared
+    if _shared is None or _shared.ctx is not context.ctx():
+        _shared = BufferArena()
+
+    return _shared
@@ -0,0 +1,256 @@
+"""
+Builder for indirect draw command buffers
+"""
+import numpy
+
+import moderngl
+from demosys import context
+
+# glDrawElementsIndirect command
+DRAW_ELEMENTS_COMMAND = numpy.dtype([
+    ('count', 'u4'),
+    ('instance_count', 'u4'),
+    ('first_index', 'u4'),
+    ('base_vertex', 'i4'),
+    ('base_instance', 'u4'),
+])
+
+# glDrawArraysIndirect command
+DRAW_ARRAYS_COMMAND = numpy.dtype([
+    ('count', 'u4'),
+    ('instance_count', 'u4'),
+    ('first', 'u4'),
+    ('base_instance', 'u4'),
+])
+
+
+class DrawCommandBuffer:
+    """
+    Collects indirect draw commands for meshes sharing a :py:class:`VAO`.
+
+    Commands are stored in a numpy structured array and uploaded to a
+    ``moderngl.Buffer`` when rendering. Only the range of commands changed
+    since the last upload is written. Commands can be disabled by
+    setting their instance count to zero so culling does not need
+    to rebuild the buffer. The ``first_index`` of commands is relative to the
+    index range of the VAO and offset when the indices are stored in a
+    :py:class:`BufferArena`::
+
+        commands = DrawCommandBuffer()
+        for mesh in meshes:
+            mesh.command = commands.add(mesh.index_count, first_index=mesh.first_index,
+                                        base_vertex=mesh.base_vertex)
+
+        def draw(self, time, frametime, target):
+            commands.set_enabled(self.visible_mask)
+            commands.render(vao, program)
+    """
+    def __init__(self, indexed=True, capacity=16):
+        """
+        Keyword Args:
+            indexed (bool): Commands for indexed geometry (``glDrawElementsIndirect`` layout)
+            capacity (int): Initial number of commands to reserve
+        """
+        self.ctx = context.ctx()
+        self.indexed = indexed
+        self.dtype = DRAW_ELEMENTS_COMMAND if indexed else DRAW_ARRAYS_COMMAND
+
+        self.commands = numpy.zeros(max(capacity, 1), dtype=self.dtype)
+        # The instance count of each command when enabled
+        self.instance_counts = numpy.zeros(len(self.commands), dtype='u4')
+        self.count = 0
+
+        self.buffer = None
+        # First index of the VAO added to the uploaded commands
+        self.index_offset = 0
+        self._dirty = None
+
+    def __len__(self):
+        return self.count
+
+    def add(self, count: int, instance_count=1, first_index=0, base_vertex=0, base_instance=0) -> int:
+        """
+        Add a draw command
+
+        Args:
+            count (int): Number of indices or vertices to draw
+
+        Keyword Args:
+            instance_count (int): Number of instances
+            first_index (int): First index. The first vertex for non-indexed commands.
+            base_vertex (int): Value added to each index. Ignored for non-indexed commands.
+            base_instance (int): First instance for per instance attributes
+
+        Returns:
+            The index of the command
+        """
+        if self.count == len(self.commands):
+            self._grow(self.count * 2)
+
+        index = self.count
+        command = self.commands[index]
+        command['count'] = count
+        command['instance_count'] = instance_count
+        command['base_instance'] = base_instance
+
+        if self.indexed:
+            command['first_index'] = first_index
+            command['base_vertex'] = base_vertex
+        else:
+            command['first'] = first_index
+
+        self.instance_counts[index] = instance_count
+        self.count += 1
+        self._mark_dirty(index, index + 1)
+        return index
+
+    def clear(self):
+        """Remove all commands"""
+        self.count = 0
+        self._dirty = None
+
+    @property
+    def data(self) -> numpy.ndarray:
+        """View of the active commands"""
+        return self.commands[:self.count]
+
+    def enable(self, index: int, enabled=True):
+        """
+        Enable or disable a single command
+
+        Args:
+            index (int): The command index
+
+        Keyword Args:
+            enabled (bool): Enable or disable
+        """
+        self.commands['instance_count'][index] = self.instance_counts[index] if enabled else 0
+        self._mark_dirty(index, index + 1)
+
+    def disable(self, index: int):
+        """Disable a command by setting its instance count to zero"""
+        self.enable(index, enabled=False)
+
+    def set_enabled(self, mask, first=0):
+        """
+        Enable or disable a range of commands with a boolean mask
+
+        Args:
+            mask: Boolean ``numpy.array`` with one value per command
+
+        Keyword Args:
+            first (int): The first command the mask applies to
+
+        Raises:
+            ValueError: if the mask covers commands past the last command
+        """
+        mask = numpy.asarray(mask, dtype=bool)
+        last = first + len(mask)
+        if first < 0 or last > self.count:
+            raise ValueError("Mask for commands {} to {} does not fit in {} commands".format(first, last, self.count))
+
+        counts = numpy.where(mask, self.instance_counts[first:last], 0)
+        current = self.commands['instance_count'][first:last]
+
+        changed = numpy.nonzero(current != counts)[0]
+        if not len(changed):
+            return
+
+        current[:] = counts
+        self._mark_dirty(first + int(changed[0]), first + int(changed[-1]) + 1)
+
+    def set_instance_count(self, index: int, instance_count: int):
+        """
+        Change the instance count of a command
+
+        Args:
+            index (int): The command index
+            instance_count (int): The new instance count
+        """
+        self.instance_counts[index] = instance_count
+        self.commands['instance_count'][index] = instance_count
+        self._mark_dirty(index, index + 1)
+
+    @property
+    def enabled_count(self) -> int:
+        """Number of commands with a non-zero instance count"""
+        return int(numpy.count_nonzero(self.data['instance_count']))
+
+    def upload(self, index_offset=0) -> moderngl.Buffer:
+        """
+        Write changed commands to the buffer.
+        The buffer is recreated if it is too small.
+
+        Keyword Args:
+            index_offset (int): Added to the first index of indexed commands.
+                                All commands are written again when it changes.
+
+        Returns:
+            The ``moderngl.Buffer`` containing the commands
+        """
+        if self.buffer is None or self.buffer.size < self.commands.nbytes:
+            if self.buffer is not None:
+                self.buffer.release()
+
+            self.buffer = self.ctx.buffer(reserve=self.commands.nbytes, dynamic=True)
+            self._dirty = (0, self.count)
+
+        if self.indexed and index_offset != self.index_offset:
+            self.index_offset = index_offset
+            self._dirty = (0, self.count)
+
+        if self._dirty:
+            start, end = self._dirty
+            commands = self.commands[start:end]
+            if self.indexed and self.index_offset:
+                commands = commands.copy()
+                commands['first_index'] += self.index_offset
+
+            self.buffer.write(commands.tobytes(), offset=start * self.dtype.itemsize)
+            self._dirty = None
+
+        return self.buffer
+
+    def render(self, vao, program: moderngl.Program, mode=None, first=0, count=-1):
+        """
+        Upload changes and render the commands with :py:meth:`VAO.render_indirect`.
+        The :py:attr:`VAO.first_index` of arena index ranges is added to the commands.
+
+        Args:
+            vao: The :py:class:`VAO` the commands refer to
+            program: The ``moderngl.Program``
+
+        Keyword Args:
+            mode (int): Override the draw mode
+            first (int): The first command to render
+            count (int): Number of commands to render. -1 renders the remaining commands.
+        """
+        if count < 0:
+            count = self.count - first
+
+        if count <= 0:
+            return
+
+        buffer = self.upload(index_offset=vao.first_index if self.indexed else 0)
+        vao.render_indirect(program, buffer, mode=mode, count=count, first=first)
+
+    def release(self):
+        """Release the buffer"""
+        if self.buffer is not None:
+            self.buffer.release()
+            self.buffer = None
+
+    def _grow(self, capacity):
+        commands = numpy.zeros(capacity, dtype=self.dtype)
+        commands[:self.count] = self.commands[:self.count]
+        self.commands = commands
+
+        instance_counts = numpy.zeros(capacity, dtype='u4')
+        instance_counts[:self.count] = self.instance_counts[:self.count]
+        self.instance_counts = instance_counts
+
+    def _mark_dirty(self, start, end):
+        if self._dirty:
+            start, end = min(start, self._dirty[0]), max(end, self._dirty[1])
+
+        self._dirty = (start, end)
@@ -0,0 +1,130 @@
+"""
+Helper for binding resources to compute shaders and dispatching work
+"""
+from typing import Tuple
+
+import moderngl
+from demosys import context
+
+
+class ComputeDispatch:
+    """
+    Binds storage buffers and images for a compute shader
+    and dispatches work groups.
+
+    The number of work groups are calculated from the number of
+    work items using the ``local_size`` declared in the shader::
+
+        compute = ComputeDispatch(self.get_program("cull"))
+        compute.storage_buffer(0, instances)
+        compute.storage_buffer(1, visible)
+        compute.run(len(instances))
+    """
+    def __init__(self, program: moderngl.ComputeShader, local_size: Tuple[int, int, int] = None):
+        """
+        Args:
+            program: The ``moderngl.ComputeShader``
+
+        Keyword Args:
+            local_size (tuple): Work group size. Detected from the shader source if loaded
+                                through the resource system.
+        """
+        self.ctx = context.ctx()
+        self.program = program
+
+        if local_size is None:
+            extra = getattr(program, 'extra', None) or {}
+            local_size = extra.get('local_size', (1, 1, 1))
+
+        self.local_size = tuple(local_size) + (1,) * (3 - len(local_size))
+        self.storage_buffers = {}
+        self.images = {}
+
+    def storage_buffer(self, binding: int, buffer: moderngl.Buffer, offset=0, size=-1):
+        """
+        Bind a buffer as a shader storage buffer when dispatching
+
+        Args:
+            binding (int): The binding index
+            buffer: The ``moderngl.Buffer``
+
+        Keyword Args:
+            offset (int): Byte offset into the buffer
+            size (int): Byte size of the bound range. -1 is the entire buffer
+        """
+        self.storage_buffers[binding] = (buffer, offset, size)
+
+    def image(self, unit: int, texture: moderngl.Texture, read=True, write=True, level=0, format=0):
+        """
+        Bind a texture as an image when dispatching
+
+        Args:
+            unit (int): The image unit
+            texture: The ``moderngl.Texture``
+
+        Keyword Args:
+            read (bool): Allow shader reads
+            write (bool): Allow shader writes
+            level (int): Mipmap level to bind
+            format (int): Override the image format
+        """
+        self.images[unit] = (texture, read, write, level, format)
+
+    def group_count(self, x=1, y=1, z=1) -> Tuple[int, int, int]:
+        """
+        Calculate the number of work groups needed to cover a number of work items
+
+        Keyword Args:
+            x (int): Work items in x
+            y (int): Work items in y
+            z (int): Work items in z
+
+        Returns:
+            (x, y, z) tuple of work group counts
+        """
+        return (
+            -(-x // self.local_size[0]),
+            -(-y // self.local_size[1]),
+            -(-z // self.local_size[2]),
+        )
+
+    def use(self):
+        """Bind all registered storage buffers and images"""
+        for binding, (buffer, offset, size) in self.storage_buffers.items():
+            buffer.bind_to_storage_buffer(binding=binding, offset=offset, size=size)
+
+        for unit, (texture, read, write, level, frmt) in self.images.items():
+            texture.bind_to_image(unit, read=read, write=write, level=level, format=frmt)
+
+    def run(self, x=1, y=1, z=1, barrier=True):
+        """
+        Bind resources and dispatch enough work groups to cover the work items
+
+        Keyword Args:
+            x (int): Work items in x
+            y (int): Work items in y
+            z (int): Work items in z
+            barrier (bool): Issue a memory barrier after the dispatch (when supported by moderngl)
+
+        Returns:
+            The dispatched (x, y, z) work group counts
+        """
+        groups = self.group_count(x, y, z)
+        self.run_groups(*groups, barrier=barrier)
+        return groups
+
+    def run_groups(self, group_x=1, group_y=1, group_z=1, barrier=True):
+        """
+        Bind resources and dispatch an explicit number of work groups
+
+        Keyword Args:
+            group_x (int): Work groups in x
+            group_y (int): Work groups in y
+            group_z (int): Work groups in z
+            barrier (bool): Issue a memory barrier after the dispatch (when supported by moderngl)
+        """
+        self.use()
+        self.program.run(group_x, group_y, group_z)
+
+        if barrier and hasattr(self.ctx, 'memory_barrier'):
+            self.ctx.memory_barrier()
@@ -0,0 +1,173 @@
+"""
+Reusable N-buffered transform feedback state
+"""
+import numpy
+
+import moderngl
+from demosys import context
+from demosys.opengl import types
+from demosys.opengl.vao import VAO, VAOError
+
+
+class TransformFeedback:
+    """
+    Owns a ring of state buffers used as input and output for transform feedback.
+
+    Each step reads the current state and writes the next one. The program's
+    varyings are captured interleaved in the same layout as ``buffer_format``
+    so the output of one step can be the input of the next::
+
+        self.particles = TransformFeedback('3f 3f', ['in_position', 'in_velocity'], data=initial)
+
+        def draw(self, time, frametime, target):
+            self.particles.step(self.simulate, steps=2)
+            self.particles.render(self.billboards)
+
+    Additional per-vertex buffers that are not part of the simulated state
+    (colors, lifetimes etc) can be attached with :py:meth:`buffer`.
+    """
+    def __init__(self, buffer_format: str, attribute_names, data=None, vertices=0, states=2,
+                 mode=moderngl.POINTS, name="transform_feedback", count_primitives=False):
+        """
+        Args:
+            buffer_format (str): Interleaved format of the state (eg. ``3f 3f``)
+            attribute_names: Attribute names for each component in the format
+
+        Keyword Args:
+            data: Initial state as ``numpy.array`` or ``bytes``. Copied into the first state buffer.
+            vertices (int): Number of vertices when no initial data is supplied
+            states (int): Number of state buffers. Must be 2 or more.
+            mode (int): Draw mode used when transforming
+            name (str): The name for debug purposes
+            count_primitives (bool): Query the number of primitives written each step.
+                                     Reading the query stalls until the GPU is done.
+        """
+        if states < 2:
+            raise VAOError("TransformFeedback needs at least 2 states, not {}".format(states))
+
+        self.ctx = context.ctx()
+        self.name = name
+        self.mode = mode
+        self.buffer_format = buffer_format
+        self.attribute_names = attribute_names
+
+        if isinstance(data, numpy.ndarray):
+            data = data.tobytes()
+
+        self.states = []
+        self.vaos = []
+
+        for i in range(states):
+            if data is not None:
+                buffer = self.ctx.buffer(data) if i == 0 else self.ctx.buffer(reserve=len(data))
+            else:
+                buffer = self.ctx.buffer(reserve=max(vertices, 1) * self._vertex_size())
+
+            vao = VAO("{}:{}".format(name, i), mode=mode)
+            vao.buffer(buffer, buffer_format, list(attribute_names))
+            self.states.append(buffer)
+            self.vaos.append(vao)
+
+        self.vertices = self.vaos[0].vertex_count if data is not None else vertices
+        self.index = 0
+
+        # Statistics
+        self.vertices_processed = 0
+        self.total_vertices_processed = 0
+        self.primitives_written = None
+        self.query = self.ctx.query(primitives=True) if count_primitives else None
+
+    def _vertex_size(self) -> int:
+        return sum(f.bytes_total for f in types.parse_attribute_formats(self.buffer_format))
+
+    @property
+    def vao(self) -> VAO:
+        """The :py:class:`VAO` reading from the current state"""
+        return self.vaos[self.index]
+
+    @property
+    def buffer_current(self) -> moderngl.Buffer:
+        """The buffer containing the current state"""
+        return self.states[self.index]
+
+    def state(self, age=0) -> moderngl.Buffer:
+        """
+        Get the state buffer from a previous step.
+        A ring of N states keeps the last N - 1 states available.
+
+        Keyword Args:
+            age (int): Number of steps back in time. 0 is the current state.
+        """
+        if not 0 <= age < len(self.states):
+            raise VAOError("State age must be in the range [0, {}]".format(len(self.states) - 1))
+
+        return self.states[(self.index - age) % len(self.states)]
+
+    def buffer(self, buffer, buffer_format: str, attribute_names, per_instance=False):
+        """
+        Attach a static buffer to all states.
+        Takes the same arguments as :py:meth:`VAO.buffer`.
+
+        Returns:
+            The ``moderngl.Buffer`` instance
+        """
+        buffer = self.vaos[0].buffer(buffer, buffer_format, attribute_names, per_instance=per_instance)
+        for vao in self.vaos[1:]:
+            vao.buffer(buffer, buffer_format, attribute_names, per_instance=per_instance)
+
+        return buffer
+
+    def step(self, program: moderngl.Program, steps=1, vertices=None) -> int:
+        """
+        Run one or more simulation steps swapping states after each step.
+        Uniforms should be set on the program before calling this method.
+
+        Args:
+            program: The transform feedback program
+
+        Keyword Args:
+            steps (int): Number of steps to run
+            vertices (int): Number of vertices to process. Defaults to all.
+
+        Returns:
+            The number of vertices processed
+        """
+        vertices = self.vertices if vertices is None else vertices
+
+        if self.query:
+            with self.query:
+                self._step(program, steps, vertices)
+            self.primitives_written = self.query.primitives
+        else:
+            self._step(program, steps, vertices)
+
+        self.vertices_processed = vertices * steps
+        self.total_vertices_processed += self.vertices_processed
+        return self.vertices_processed
+
+    def _step(self, program, steps, vertices):
+        for _ in range(steps):
+            target = (self.index + 1) % len(self.states)
+            self.vaos[self.index].transform(program, self.states[target], mode=self.mode, vertices=vertices)
+            self.index = target
+
+    def render(self, program: moderngl.Program, mode=None, vertices=None, first=0, instances=1):
+        """
+        Render the current state.
+        Takes the same arguments as :py:meth:`VAO.render`.
+        """
+        self.vao.render(
+            program,
+            mode=mode,
+            vertices=self.vertices if vertices is None else vertices,
+            first=first,
+            instances=instances,
+        )
+
+    def release(self):
+        """Release all states and attached buffers"""
+        for vao in self.vaos[1:]:
+            vao.release(buffer=False)
+            vao.buffers[0].buffer.release()
+
+        self.vaos[0].release()
@@ -0,0 +1,187 @@
+"""
+GPU time measurement of effects and draw scopes using timer queries
+"""
+from collections import deque
+
+from demosys import context
+
+
+class GPUProfiler:
+    """
+    Measures GPU time spent in named scopes using ``ctx.query(time=True)``.
+
+    Query results are read back ``latency`` frames after they were issued
+    so reading them never stalls the pipeline. Averages are calculated over
+    the last ``samples`` frames a scope was active.
+
+    Scopes can be nested. Timer queries cannot overlap in OpenGL, so a parent
+    scope is suspended while a child scope is active. The time reported for a
+    scope is exclusive of its children unless ``inclusive`` is requested.
+    Nested scopes are named by their path (``effect/geometry``).
+
+    Example::
+
+        from demosys.opengl.profiler import profiler
+
+        with profiler.scope("shadows"):
+            self.render_shadows()
+
+        print(profiler.averages())
+    """
+    def __init__(self, enabled=False, latency=3, samples=60):
+        self.frame = 0
+        self.configure(enabled=enabled, latency=latency, samples=samples)
+
+    def configure(self, enabled=False, latency=3, samples=60):
+        """
+        Configure the profiler. Any pending results are discarded.
+
+        Keyword Args:
+            enabled (bool): Enable timer queries
+            latency (int): Number of frames before results are read back
+            samples (int): Number of frames used for rolling averages
+        """
+        self.enabled = enabled
+        self.latency = max(int(latency), 1)
+        self.samples = samples
+        self.reset()
+
+    def reset(self):
+        """Discard all pending queries and collected samples"""
+        self._stack = []
+        self._active = None
+        self._pending = [[] for _ in range(self.latency + 1)]
+        self._pool = []
+        self._times = {}
+
+    def scope(self, name: str, scope=None) -> 'ProfilerScope':
+        """
+        Create a context manager measuring the GPU time of a scope.
+        The returned object can be stored and reused every frame.
+
+        Args:
+            name (str): Name of the scope
+
+        Keyword Args:
+            scope: Optional context manager to enter inside the measured scope (eg. ``moderngl.Scope``)
+        """
+        return ProfilerScope(self, name, scope=scope)
+
+    def begin(self, name: str):
+        """Begin measuring a scope. Must be paired with :py:meth:`end`."""
+        if not self.enabled:
+            return
+
+        path = "{}/{}".format(self._stack[-1], name) if self._stack else name
+        self._stop()
+        self._stack.append(path)
+        self._start(path)
+
+    def end(self):
+        """End the current scope resuming the parent scope if present"""
+        if not self.enabled or not self._stack:
+            return
+
+        self._stop()
+        self._stack.pop()
+        if self._stack:
+            self._start(self._stack[-1])
+
+    def end_frame(self):
+        """
+        Mark the end of a frame and collect results issued ``latency`` frames ago.
+        This is called by the window after the timeline is drawn.
+        """
+        if not self.enabled:
+            return
+
+        self.frame += 1
+        slot = self.frame % len(self._pending)
+        pending = self._pending[slot]
+        if not pending:
+            return
+
+        frame_times = {}
+        for path, query in pending:
+            frame_times[path] = frame_times.get(path, 0) + query.elapsed
+            self._pool.append(query)
+
+        for path, elapsed in frame_times.items():
+            times = self._times.get(path)
+            if times is None:
+                times = self._times[path] = deque(maxlen=self.samples)
+            times.append(elapsed)
+
+        self._pending[slot] = []
+
+    def average(self, name: str, inclusive=False) -> float:
+        """
+        Get the rolling average GPU time of a scope in milliseconds
+
+        Args:
+            name (str): Path of the scope
+
+        Keyword Args:
+            inclusive (bool): Include the time of nested scopes
+        """
+        total = self._average(name)
+        if inclusive:
+            prefix = name + "/"
+            total += sum(self._average(path) for path in self._times if path.startswith(prefix))
+
+        return total
+
+    def averages(self, inclusive=False) -> dict:
+        """
+        Get the rolling average GPU time of all scopes in milliseconds
+
+        Keyword Args:
+            inclusive (bool): Include the time of nested scopes
+
+        Returns:
+            dict with scope path as key and milliseconds as value
+        """
+        return {path: self.average(path, inclusive=inclusive) for path in sorted(self._times)}
+
+    def _average(self, path):
+        times = self._times.get(path)
+        if not times:
+            return 0.0
+
+        return sum(times) / len(times) / 1000000.0
+
+    def _start(self, path):
+        query = self._pool.pop() if self._pool else context.ctx().query(time=True)
+        query.__enter__()
+        self._active = (path, query)
+
+    def _stop(self):
+        if self._active is None:
+            return
+
+        path, query = self._active
+        query.__exit__(None, None, None)
+        self._pending[self.frame % len(self._pending)].append(self._active)
+        self._active = None
+
+
+class ProfilerScope:
+    """Context manager measuring a named scope"""
+    def __init__(self, profiler: GPUProfiler, name: str, scope=None):
+        self.profiler = profiler
+        self.name = name
+        self.scope = scope
+
+    def __enter__(self):
+        self.profiler.begin(self.name)
+        if self.scope is not None:
+            self.scope.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.scope is not None:
+            self.scope.__exit__(exc_type, exc_value, traceback)
+        self.profiler.end()
+
+
+profiler = GPUProfiler()
@@ -1,3 +1,4 @@
+import re
 from typing import Tuple, Union
 
 import moderngl
@@ -11,6 +12,12 @@ TESS_CONTROL_SHADER = 'TESS_CONTROL_SHADER'
 TESS_EVALUATION_SHADER = 'TESS_EVALUATION_SHADER'
 COMPUTE_SHADER = 'COMPUTE_SHADER'
 
+# Matches global out declarations with optional layout and interpolation qualifiers
+OUT_ATTRIB_RE = re.compile(
+    r"^\s*(?:layout\s*\([^)]*\)\s*)?(?:(?:flat|smooth|noperspective|centroid|invariant)\s+)*"
+    r"out\s+\w+\s+([\w\s,\[\]]+);"
+)
+
 
 class ProgramShaders:
     """Helper class preparing shader source strings for a program"""
@@ -22,6 +29,7 @@ class ProgramShaders:
         self.fragment_source = None
         self.tess_control_source = None
         self.tess_evaluation_source = None
+        self.compute_source = None
 
     @property
     def ctx(self) -> moderngl.Context:
@@ -32,10 +40,22 @@ class ProgramShaders:
     def from_single(cls, meta: ProgramDescription, source: str):
         """Initialize a single glsl string containing all shaders"""
         instance = cls(meta)
+
+        # Compute shaders cannot be combined with other shader types
+        if COMPUTE_SHADER in source:
+            instance.compute_source = ShaderSource(
+                COMPUTE_SHADER,
+                meta.path or meta.compute_shader,
+                source,
+                defines=meta.defines,
+            )
+            return instance
+
         instance.vertex_source = ShaderSource(
             VERTEX_SHADER,
             meta.path or meta.vertex_shader,
-            source
+            source,
+            defines=meta.defines,
         )
 
         if GEOMETRY_SHADER in source:
@@ -43,6 +63,7 @@ class ProgramShaders:
                 GEOMETRY_SHADER,
                 meta.path or meta.geometry_shader,
                 source,
+                defines=meta.defines,
             )
 
         if FRAGMENT_SHADER in source:
@@ -50,6 +71,7 @@ class ProgramShaders:
                 FRAGMENT_SHADER,
                 meta.path or meta.fragment_shader,
                 source,
+                defines=meta.defines,
             )
 
         if TESS_CONTROL_SHADER in source:
@@ -57,6 +79,7 @@ class ProgramShaders:
                 TESS_CONTROL_SHADER,
                 meta.path or meta.tess_control_shader,
                 source,
+                defines=meta.defines,
             )
 
         if TESS_EVALUATION_SHADER in source:
@@ -64,26 +87,40 @@ class ProgramShaders:
                 TESS_EVALUATION_SHADER,
                 meta.path or meta.tess_evaluation_shader,
                 source,
+                defines=meta.defines,
             )
 
         return instance
 
     @classmethod
     def from_separate(cls, meta: ProgramDescription, vertex_source, geometry_source=None, fragment_source=None,
-                      tess_control_source=None, tess_evaluation_source=None):
+                      tess_control_source=None, tess_evaluation_source=None, compute_source=None):
         """Initialize multiple shader strings"""
         instance = cls(meta)
-        instance.vertex_source = ShaderSource(
-            VERTEX_SHADER,
-            meta.path or meta.vertex_shader,
-            vertex_source,
-        )
+
+        if compute_source:
+            instance.compute_source = ShaderSource(
+                COMPUTE_SHADER,
+                meta.path or meta.compute_shader,
+                compute_source,
+                defines=meta.defines,
+            )
+            return instance
+
+        if vertex_source:
+            instance.vertex_source = ShaderSource(
+                VERTEX_SHADER,
+                meta.path or meta.vertex_shader,
+                vertex_source,
+                defines=meta.defines,
+            )
 
         if geometry_source:
             instance.geometry_source = ShaderSource(
                 GEOMETRY_SHADER,
                 meta.path or meta.geometry_shader,
                 geometry_source,
+                defines=meta.defines,
             )
 
         if fragment_source:
@@ -91,6 +128,7 @@ class ProgramShaders:
                 FRAGMENT_SHADER,
                 meta.path or meta.fragment_shader,
                 fragment_source,
+                defines=meta.defines,
             )
 
         if tess_control_source:
@@ -98,6 +136,7 @@ class ProgramShaders:
                 TESS_CONTROL_SHADER,
                 meta.path or meta.tess_control_shader,
                 tess_control_source,
+                defines=meta.defines,
             )
 
         if tess_evaluation_source:
@@ -105,6 +144,7 @@ class ProgramShaders:
                 TESS_EVALUATION_SHADER,
                 meta.path or meta.tess_control_shader,
                 tess_evaluation_source,
+                defines=meta.defines,
             )
 
         return instance
@@ -114,13 +154,24 @@ class ProgramShaders:
         Creates a shader program.
 
         Returns:
-            ModernGL Program instance
+            ModernGL Program or ComputeShader instance
         """
+        if self.compute_source:
+            program = self.ctx.compute_shader(self.compute_source.source)
+            program.extra = {
+                'meta': self.meta,
+                'local_size': self.compute_source.find_local_size(),
+            }
+            return program
+
+        if not self.vertex_source:
+            raise ShaderError("Program {} has no vertex or compute shader".format(self.meta.label))
+
         # Get out varyings
-        out_attribs = []
+        out_attribs = list(self.meta.varyings)
 
         # If no fragment shader is present we are doing transform feedback
-        if not self.fragment_source:
+        if not self.fragment_source and not out_attribs:
             # Out attributes is present in geometry shader if present
             if self.geometry_source:
                 out_attribs = self.geometry_source.find_out_attribs()
@@ -144,7 +195,7 @@ class ShaderSource:
     """
     Helper class representing a single shader type
     """
-    def __init__(self, shader_type: str, name: str, source: str):
+    def __init__(self, shader_type: str, name: str, source: str, defines: dict = None):
         self.type = shader_type
         self.name = name
         self.source = source.strip()
@@ -160,6 +211,10 @@ class ShaderSource:
         # Add preprocessors to source VERTEX_SHADER, FRAGMENT_SHADER etc.
         self.lines.insert(1, "#define {} 1".format(self.type))
 
+        # Additional defines such as feature flags for program variants
+        for name, value in (defines or {}).items():
+            self.lines.insert(2, "#define {} {}".format(name, value))
+
         self.source = '\n'.join(self.lines)
 
     def find_out_attribs(self):
@@ -170,10 +225,30 @@ class ShaderSource:
         """
         names = []
         for line in self.lines:
-            if line.strip().startswith("out "):
-                names.append(line.split()[2].replace(';', ''))
+            match = OUT_ATTRIB_RE.match(line)
+            if not match:
+                continue
+
+            for name in match.group(1).split(','):
+                names.append(name.split('[')[0].strip())
+
         return names
 
+    def find_local_size(self) -> Tuple[int, int, int]:
+        """
+        Get the work group size declared in a compute shader.
+        Dimensions not declared defaults to 1.
+
+        :return: (x, y, z) tuple
+        """
+        size = {'x': 1, 'y': 1, 'z': 1}
+        for line in self.lines:
+            if line.strip().startswith("layout") and "local_size_" in line:
+                for axis, value in re.findall(r"local_size_([xyz])\s*=\s*(\d+)", line):
+                    size[axis] = int(value)
+
+        return size['x'], size['y'], size['z']
+
     def print(self):
         """Print the shader lines"""
         print("---[ START {} ]---".format(self.name))
@@ -203,7 +278,7 @@ class ReloadableProgram:
 
     @property
     def name(self):
-        return self.meta.path or self.meta.vertex_shader
+        return self.meta.path or self.meta.vertex_shader or self.meta.compute_shader
 
     @property
     def _members(self):
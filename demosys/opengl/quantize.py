@@ -0,0 +1,213 @@
+"""
+Compact encodings for vertex attributes
+
+Only ``f1`` is a normalized format in moderngl. Integer attributes reach
+float shader inputs with their raw value, so range relative and octahedral
+encodings are decoded in the shader using the scale and offset returned here.
+"""
+import numpy
+
+from demosys.opengl.types import attribute_format, parse_attribute_formats
+from demosys.opengl.vao import vertex_layout
+
+# Attribute format of each encoding
+ENCODINGS = {
+    # 16 bit floats. Read as floats without any decoding.
+    'half': '{}f2',
+    # Unit vectors as signed bytes. Normalizing in the shader is enough.
+    'snorm8': '3i1',
+    # Octahedral unit vectors in two signed shorts
+    'oct': '2i2',
+    # Unsigned shorts relative to the value range: ``value * scale + offset``
+    'unorm16': '{}u2',
+}
+
+SNORM8_MAX = 127
+SNORM16_MAX = 32767
+UNORM16_MAX = 65535
+
+
+def quantize_attribute(values: numpy.ndarray, encoding: str):
+    """
+    Encode float attribute values
+
+    Args:
+        values: ``(N, components)`` float array
+        encoding (str): ``half``, ``snorm8``, ``oct`` or ``unorm16``
+
+    Returns:
+        (values, format, decode) tuple. ``decode`` is a dict with the ``scale``
+        and ``offset`` to apply in the shader or ``None``.
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError("Unknown encoding '{}'. Valid encodings: {}".format(encoding, list(ENCODINGS.keys())))
+
+    values = numpy.asarray(values, dtype='f8').reshape(len(values), -1)
+    components = values.shape[1]
+    frmt = ENCODINGS[encoding].format(components)
+
+    if encoding == 'half':
+        return values.astype('f2'), frmt, None
+
+    if encoding == 'snorm8':
+        return _snorm(_normalize(values[:, :3]), SNORM8_MAX).astype('i1'), frmt, None
+
+    if encoding == 'oct':
+        encoded = _snorm(oct_encode(values[:, :3]), SNORM16_MAX).astype('i2')
+        return encoded, frmt, {'scale': [1.0 / SNORM16_MAX] * 2, 'offset': [0.0] * 2}
+
+    # unorm16
+    vmin, vmax = values.min(axis=0), values.max(axis=0)
+    extent = vmax - vmin
+    extent = numpy.where(extent > 0, extent, 1.0)
+
+    encoded = numpy.round((values - vmin) / extent * UNORM16_MAX)
+    return encoded.astype('u2'), frmt, {
+        'scale': (extent / UNORM16_MAX).tolist(),
+        'offset': vmin.tolist(),
+    }
+
+
+def dequantize_attribute(values: numpy.ndarray, encoding: str, decode=None) -> numpy.ndarray:
+    """
+    Decode values created by :py:func:`quantize_attribute` the same way the shader does
+
+    Args:
+        values: The encoded values
+        encoding (str): The encoding used
+
+    Keyword Args:
+        decode (dict): The decode parameters returned by :py:func:`quantize_attribute`
+
+    Returns:
+        ``(N, components)`` float32 array
+    """
+    values = numpy.asarray(values).reshape(len(values), -1).astype('f8')
+
+    if encoding == 'snorm8':
+        return _normalize(values).astype('f4')
+
+    if decode:
+        values = values * decode['scale'] + decode['offset']
+
+    if encoding == 'oct':
+        return oct_decode(values).astype('f4')
+
+    return values.astype('f4')
+
+
+def oct_encode(normals: numpy.ndarray) -> numpy.ndarray:
+    """
+    Octahedral encoding of unit vectors
+
+    Args:
+        normals: ``(N, 3)`` array of unit vectors
+
+    Returns:
+        ``(N, 2)`` array in the range [-1, 1]
+    """
+    normals = numpy.asarray(normals, dtype='f8')
+    length = numpy.abs(normals).sum(axis=1, keepdims=True)
+    normals = normals / numpy.where(length > 0, length, 1.0)
+
+    encoded = normals[:, :2].copy()
+    lower = normals[:, 2] < 0
+    folded = encoded[lower]
+    encoded[lower] = (1.0 - numpy.abs(folded[:, ::-1])) * _sign(folded)
+    return encoded
+
+
+def oct_decode(encoded: numpy.ndarray) -> numpy.ndarray:
+    """
+    Decode octahedral encoded unit vectors
+
+    Args:
+        encoded: ``(N, 2)`` array in the range [-1, 1]
+
+    Returns:
+        ``(N, 3)`` array of unit vectors
+    """
+    encoded = numpy.asarray(encoded, dtype='f8')
+    normals = numpy.empty((len(encoded), 3))
+    normals[:, :2] = encoded
+    normals[:, 2] = 1.0 - numpy.abs(encoded).sum(axis=1)
+
+    lower = normals[:, 2] < 0
+    folded = encoded[lower]
+    normals[lower, :2] = (1.0 - numpy.abs(folded[:, ::-1])) * _sign(folded)
+    return _normalize(normals)
+
+
+def quantize_vao(vao, encodings: dict) -> dict:
+    """
+    Encode float attributes in a VAO and replace the static buffers
+    with a single interleaved buffer. Attributes that are not floats
+    or already half floats are left untouched.
+
+    Args:
+        vao: The :py:class:`VAO` to quantize
+        encodings (dict): Attribute name to encoding, for example
+                          ``{'in_normal': 'oct', 'in_uv': 'half'}``
+
+    Returns:
+        dict with attribute name to ``(encoding, decode)`` of the encoded
+        attributes. Empty if nothing was encoded.
+    """
+    data, buffer_format, encoded = quantize_vertices(*vao.read_vertices(), encodings)
+    if encoded:
+        vao.replace_vertices(data, buffer_format)
+
+    return encoded
+
+
+def quantize_vertices(vertices: numpy.ndarray, buffer_format: str, encodings: dict):
+    """
+    Encode float attributes in a numpy structured array of vertices.
+    Attributes that are not floats or already half floats are left untouched.
+
+    Args:
+        vertices: numpy structured array with a field for each attribute
+        buffer_format (str): The buffer format of the vertices
+        encodings (dict): Attribute name to encoding
+
+    Returns:
+        (vertices, buffer_format, encoded) tuple. The vertices are returned
+        as they are when nothing was encoded.
+    """
+    formats = [f for f in parse_attribute_formats(buffer_format) if not f.padding]
+
+    attributes, columns, encoded = [], [], {}
+    for name, attrib_format in zip(vertices.dtype.names, formats):
+        values = vertices[name]
+        encoding = encodings.get(name)
+
+        if encoding and values.dtype == numpy.float32:
+            values, frmt, decode = quantize_attribute(values, encoding)
+            encoded[name] = (encoding, decode)
+            attrib_format = attribute_format(frmt)
+
+        attributes.append((name, attrib_format))
+        columns.append(values)
+
+    if not encoded:
+        return vertices, buffer_format, encoded
+
+    dtype, buffer_format = vertex_layout(attributes)
+    data = numpy.zeros(len(vertices), dtype=dtype)
+    for name, values in zip(vertices.dtype.names, columns):
+        data[name] = values.reshape(data[name].shape)
+
+    return data, buffer_format, encoded
+
+
+def _normalize(values):
+    length = numpy.linalg.norm(values, axis=1, keepdims=True)
+    return values / numpy.where(length > 0, length, 1.0)
+
+
+def _snorm(values, maximum):
+    return numpy.round(numpy.clip(values, -1.0, 1.0) * maximum)
+
+
+def _sign(values):
+    return numpy.where(values >= 0, 1.0, -1.0)
@@ -12,8 +12,13 @@ Example:
         (self.pos_scale_buffer, '2f 1f/i', 'in_pos', 'in_scale'),
     ]
 """
+import re
 from typing import List
 
+import numpy
+
+PADDING_RE = re.compile(r'^(\d*)x(\d*)$')
+
 
 class BufferFormat:
 
@@ -31,6 +36,22 @@ class BufferFormat:
     def bytes_total(self):
         return self.components * self.bytes_per_component
 
+    @property
+    def padding(self) -> bool:
+        """Is this a padding format not mapping to an attribute?"""
+        return 'x' in self.format
+
+    @property
+    def dtype(self) -> numpy.dtype:
+        """The numpy dtype of a single attribute value"""
+        if self.padding:
+            return numpy.dtype('V{}'.format(self.bytes_total))
+
+        kind = self.format.lstrip('0123456789')[0]
+        # Normalized bytes are stored as unsigned bytes
+        kind = 'u' if kind == 'f' and self.bytes_per_component == 1 else kind
+        return numpy.dtype(('{}{}'.format(kind, self.bytes_per_component), (self.components, )))
+
     def pad_str(self) -> str:
         """Padding string used my moderngl in interleaved buffers"""
         return "{}x{}".format(self.components, self.bytes_per_component)
@@ -70,10 +91,23 @@ def attribute_format(frmt: str) -> BufferFormat:
         ))
 
 
+def padding_format(frmt: str) -> BufferFormat:
+    """
+    Parse a moderngl padding format such as ``x``, ``3x`` or ``2x4``
+    :param frmt: The padding format
+    :return: BufferFormat instance or None if this is not padding
+    """
+    match = PADDING_RE.match(frmt)
+    if not match:
+        return None
+
+    return BufferFormat(frmt, int(match.group(1) or 1), int(match.group(2) or 1))
+
+
 def parse_attribute_formats(frmt: str) -> List[BufferFormat]:
     formats = []
     for attrib in frmt.split():
-        formats.append(attribute_format(attrib))
+        formats.append(padding_format(attrib) or attribute_format(attrib))
 
     return formats
 
@@ -102,6 +136,9 @@ ATTRIBUTE_FORMATS = {
     '2f': BufferFormat('2f', 2, 4),
     '3f': BufferFormat('3f', 3, 4),
     '4f': BufferFormat('4f', 4, 4),
+    # Matrices (mat3 and mat4)
+    '9f': BufferFormat('9f', 9, 4),
+    '16f': BufferFormat('16f', 16, 4),
 
     # u4 unsigned int - short version
     '1u': BufferFormat('1u4', 1, 4),
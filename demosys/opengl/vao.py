@@ -5,6 +5,7 @@ import numpy
 import moderngl
 from demosys import context
 from demosys.opengl import types
+from demosys.opengl.arena import BufferRange
 
 # For sanity checking draw modes when creating the VAO
 DRAW_MODES = {
@@ -21,36 +22,240 @@ DRAW_MODES = {
 }
 
 
+class DynamicBuffer:
+    """
+    A vertex buffer for data changing every frame.
+
+    Writing into a buffer the GPU may still be reading from forces the driver
+    to wait for the draw calls using it. A dynamic buffer instead writes new data
+    into a fresh region once the current region has been rendered.
+
+    With ``regions > 1`` the buffer is a ring of equally sized buffers.
+    A :py:class:`VAO` keeps one vertex array per region and renders the current one.
+    With ``regions=1`` the storage is orphaned instead so the driver can hand out
+    new memory while the old storage is still in use.
+
+    Only the first :py:meth:`update` after the buffer was rendered moves to a new region.
+    Later updates write into the same region. Partial updates keep the remaining
+    contents of the previous region::
+
+        self.lines = DynamicBuffer(4 * 1024)
+        self.vao.buffer(self.lines, '2f', 'in_position')
+
+        def draw(self, time, frametime, target):
+            self.lines.update(self.generate_lines(time))
+            self.vao.render(self.program, vertices=self.line_count)
+
+    OpenGL fences are not available through moderngl. Instead the frame number
+    a region was last rendered in is recorded. Writing into a region rendered less than
+    ``latency`` frames ago is counted as a potential stall in :py:attr:`stalls`.
+    Increase the number of regions if this number keeps growing.
+    """
+    def __init__(self, size: int, regions=3, latency=2, name=""):
+        """
+        Args:
+            size (int): Byte size of each region
+
+        Keyword Args:
+            regions (int): Number of regions in the ring. 1 means orphaning is used.
+            latency (int): Number of frames a region may still be used by the GPU
+            name (str): The name for debug purposes
+        """
+        self.ctx = context.ctx()
+        self.name = name
+        self.size = size
+        self.regions = max(int(regions), 1)
+        self.latency = latency
+        self.buffers = [self.ctx.buffer(reserve=size, dynamic=True) for _ in range(self.regions)]
+        self.index = 0
+
+        # The frame number each region was last rendered in
+        self.fences = [None] * self.regions
+        self._rendered = False
+        # Orphaned storage loses its content so we keep a copy for partial updates
+        self._shadow = bytearray(size) if self.regions == 1 else None
+
+        # Statistics
+        self.updates = 0
+        self.orphans = 0
+        self.copies = 0
+        self.stalls = 0
+
+    @property
+    def buffer(self) -> moderngl.Buffer:
+        """The ``moderngl.Buffer`` of the current region"""
+        return self.buffers[self.index]
+
+    def update(self, data, offset=0):
+        """
+        Write data into the buffer moving to a fresh region if the current one was rendered
+
+        Args:
+            data: ``bytes`` or ``numpy.array``
+
+        Keyword Args:
+            offset (int): Byte offset into the region
+        """
+        if isinstance(data, numpy.ndarray):
+            data = data.tobytes()
+
+        self._prepare(offset, len(data))
+        self.buffer.write(data, offset=offset)
+
+        if self._shadow is not None:
+            self._shadow[offset:offset + len(data)] = data
+
+    def clear(self, size=-1, offset=0, chunk=None):
+        """
+        Clear the buffer or parts of it moving to a fresh region if the current one was rendered
+
+        Keyword Args:
+            size (int): Number of bytes to clear. -1 clears to the end of the region
+            offset (int): Byte offset into the region
+            chunk (bytes): Repeated content to fill with. Zeros by default
+        """
+        if size < 0:
+            size = self.size - offset
+
+        self._prepare(offset, size)
+        self.buffer.clear(size=size, offset=offset, chunk=chunk)
+
+        if self._shadow is not None:
+            chunk = chunk or b'\0'
+            self._shadow[offset:offset + size] = (chunk * (size // len(chunk) + 1))[:size]
+
+    def rendered(self):
+        """Record that the current region is used by a draw call. Called by :py:class:`VAO`."""
+        self._rendered = True
+        self.fences[self.index] = self._frame()
+
+    def release(self):
+        """Release all regions"""
+        for buffer in self.buffers:
+            buffer.release()
+
+    def _prepare(self, offset, size):
+        if offset < 0 or offset + size > self.size:
+            raise VAOError("Dynamic buffer {} cannot fit {} bytes at offset {}".format(self.name, size, offset))
+
+        self.updates += 1
+        if not self._rendered:
+            return
+
+        self._rendered = False
+        keep = offset > 0 or size < self.size
+
+        if self.regions == 1:
+            self.buffer.orphan()
+            self.orphans += 1
+            if keep:
+                self.buffer.write(bytes(self._shadow))
+            return
+
+        previous = self.buffer
+        self.index = (self.index + 1) % self.regions
+
+        fence, frame = self.fences[self.index], self._frame()
+        if fence is not None and frame is not None and frame - fence < self.latency:
+            self.stalls += 1
+
+        if keep:
+            self.ctx.copy_buffer(self.buffer, previous)
+            self.copies += 1
+
+    def _frame(self):
+        window = context.window(raise_on_error=False)
+        return window.frames if window else None
+
+
 class BufferInfo:
     """Container for a vbo with additional information"""
-    def __init__(self, buffer: moderngl.Buffer, buffer_format: str, attributes=None, per_instance=False):
+    def __init__(self, buffer, buffer_format: str, attributes=None, per_instance=False):
         """
-        :param buffer: The vbo object
+        :param buffer: The vbo object, a :py:class:`DynamicBuffer` or a :py:class:`BufferRange`
         :param format: The format of the buffer
         """
-        self.buffer = buffer
+        self._buffer = buffer
+        self.dynamic = buffer if isinstance(buffer, DynamicBuffer) else None
+        self.range = buffer if isinstance(buffer, BufferRange) else None
         self.attrib_formats = types.parse_attribute_formats(buffer_format)
         self.attributes = attributes
         self.per_instance = per_instance
 
         # Sanity check byte size
-        if self.buffer.size % self.vertex_size != 0:
+        if self.size % self.vertex_size != 0:
             raise VAOError("Buffer with type {} has size not aligning with {}. Remainder: {}".format(
-                buffer_format, self.vertex_size, self.buffer.size % self.vertex_size
+                buffer_format, self.vertex_size, self.size % self.vertex_size
             ))
 
-        self.vertices = self.buffer.size // self.vertex_size
+        self.vertices = self.size // self.vertex_size
+
+    @property
+    def buffer(self) -> moderngl.Buffer:
+        """
+        The buffer. For dynamic buffers this is the buffer of the current region
+        and for ranges the arena buffer containing the range.
+        """
+        if self.dynamic:
+            return self.dynamic.buffer
+
+        return self.range.buffer if self.range else self._buffer
+
+    @property
+    def offset(self) -> int:
+        """(int) Byte offset of the data in :py:attr:`buffer`"""
+        return self.range.offset if self.range else 0
+
+    @property
+    def size(self) -> int:
+        """(int) Byte size of the data"""
+        return self.range.size if self.range else self.buffer.size
+
+    def read(self) -> bytes:
+        """Read the data"""
+        return self.buffer.read(size=self.size, offset=self.offset)
+
+    def release(self):
+        """Release the buffer or return the range to its arena"""
+        if self.dynamic:
+            self.dynamic.release()
+        elif self.range:
+            self.range.release()
+        else:
+            self._buffer.release()
 
     @property
     def vertex_size(self) -> int:
         return sum(f.bytes_total for f in self.attrib_formats)
 
+    @property
+    def dtype(self) -> numpy.dtype:
+        """Structured numpy dtype of a vertex with a field for each attribute"""
+        names, formats, offsets = [], [], []
+        attributes = iter(self.attributes)
+        offset = 0
+        for attrib_format in self.attrib_formats:
+            if not attrib_format.padding:
+                names.append(next(attributes))
+                formats.append(attrib_format.dtype)
+                offsets.append(offset)
+
+            offset += attrib_format.bytes_total
+
+        return numpy.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': offset})
+
     def content(self, attributes: List[str]):
         """Build content tuple for the buffer"""
         formats = []
         attrs = []
-        for attrib_format, attrib in zip(self.attrib_formats, self.attributes):
+        attribute_names = iter(self.attributes)
+        for attrib_format in self.attrib_formats:
+
+            if attrib_format.padding:
+                formats.append(attrib_format.format)
+                continue
 
+            attrib = next(attribute_names)
             if attrib not in attributes:
                 formats.append(attrib_format.pad_str())
                 continue
@@ -64,7 +269,7 @@ class BufferInfo:
             return None
 
         return (
-            self.buffer,
+            self.range or self.buffer,
             "{}{}".format(" ".join(formats), '/i' if self.per_instance else ''),
             *attrs
         )
@@ -82,7 +287,9 @@ class VAO:
     The class will auto detect the programs attributes and add padding when needed
     to match the vertex object.
     A new vertexbuffer object is created and stored internally for each unique
-    shader program used.
+    shader program used. The attribute mapping is cached by the attribute layout
+    of the program so programs with the same attributes share it.
+    Vertex arrays belonging to released programs are released automatically.
 
     A secondary purpose is to provide an alternate way to build vertexbuffers
     This can be practical when loading or creating various geometry.
@@ -111,10 +318,15 @@ class VAO:
 
         self.buffers = []
         self._index_buffer = None
+        self._index_range = None
         self._index_element_size = None
 
         self.vertex_count = 0
+        # (program glo, dynamic regions) -> (program, program mglo, moderngl.VertexArray)
         self.vaos = {}
+        # (attribute layout, dynamic regions) -> vertex array content
+        self._content_cache = {}
+        self._dynamic_buffers = []
 
     def render(self, program: moderngl.Program, mode=None, vertices=-1, first=0, instances=1):
         """
@@ -134,12 +346,16 @@ class VAO:
         if mode is None:
             mode = self.mode
 
-        vao.render(mode, vertices=vertices, first=first, instances=instances)
+        vao.render(mode, vertices=vertices, first=first + self.first_index, instances=instances)
+        self._rendered()
 
     def render_indirect(self, program: moderngl.Program, buffer, mode=None, count=-1, *, first=0):
         """
         The render primitive (mode) must be the same as the input primitive of the GeometryShader.
         The draw commands are 5 integers: (count, instanceCount, firstIndex, baseVertex, baseInstance).
+        When the index buffer is a range in a :py:class:`BufferArena` the commands
+        must include :py:attr:`first_index` in ``firstIndex``.
+        :py:meth:`DrawCommandBuffer.render` adds it to the commands.
 
         Args:
             program: The ``moderngl.Program``
@@ -156,6 +372,7 @@ class VAO:
             mode = self.mode
 
         vao.render_indirect(buffer, mode=mode, count=count, first=first)
+        self._rendered()
 
     def transform(self, program: moderngl.Program, buffer: moderngl.Buffer,
                   mode=None, vertices=-1, first=0, instances=1):
@@ -177,84 +394,320 @@ class VAO:
         if mode is None:
             mode = self.mode
 
-        vao.transform(buffer, mode=mode, vertices=vertices, first=first, instances=instances)
+        vao.transform(buffer, mode=mode, vertices=vertices, first=first + self.first_index, instances=instances)
+        self._rendered()
 
-    def buffer(self, buffer, buffer_format: str, attribute_names, per_instance=False):
+    def buffer(self, buffer, buffer_format: str, attribute_names, per_instance=False, arena=None):
         """
         Register a buffer/vbo for the VAO. This can be called multiple times.
         adding multiple buffers (interleaved or not)
 
         Args:
-            buffer: The buffer data. Can be ``numpy.array``, ``moderngl.Buffer`` or ``bytes``.
+            buffer: The buffer data. Can be ``numpy.array``, ``moderngl.Buffer``, ``bytes``,
+                    a :py:class:`DynamicBuffer` for data changing every frame
+                    or a :py:class:`BufferRange` in a :py:class:`BufferArena`.
             buffer_format (str): The format of the buffer. (eg. ``3f 3f`` for interleaved positions and normals).
             attribute_names: A list of attribute names this buffer should map to.
 
         Keyword Args:
             per_instance (bool): Is this buffer per instance data for instanced rendering?
+            arena: :py:class:`BufferArena` to allocate ``numpy.array`` and ``bytes`` data from.
+                   Per instance data, normalized ``f1`` formats and attributes with more
+                   than 4 components always get a buffer of their own.
 
         Returns:
             The ``moderngl.Buffer`` instance object. This is handy when providing ``bytes`` and ``numpy.array``.
+            A :py:class:`DynamicBuffer` is returned as is. Data allocated from an arena returns the
+            :py:class:`BufferRange`.
         """
         if not isinstance(attribute_names, list):
             attribute_names = [attribute_names, ]
 
-        if not type(buffer) in [moderngl.Buffer, numpy.ndarray, bytes]:
+        if not type(buffer) in [moderngl.Buffer, numpy.ndarray, bytes, DynamicBuffer, BufferRange]:
             raise VAOError(
                 (
-                    "buffer parameter must be a moderngl.Buffer, numpy.ndarray or bytes instance"
-                    "(not {})".format(type(buffer))
+                    "buffer parameter must be a moderngl.Buffer, DynamicBuffer, BufferRange, "
+                    "numpy.ndarray or bytes instance (not {})".format(type(buffer))
                 )
             )
 
+        formats = [f for f in types.parse_attribute_formats(buffer_format) if not f.padding]
+        if len(formats) != len(attribute_names):
+            raise VAOError("Format '{}' does not describe attributes {}".format(buffer_format, attribute_names))
+
+        if arena is not None and not per_instance and isinstance(buffer, (numpy.ndarray, bytes)):
+            if all(_can_bind(f) for f in formats):
+                buffer = arena.allocate_data(numpy.ascontiguousarray(buffer) if isinstance(buffer, numpy.ndarray)
+                                             else buffer)
+
+        # Arrays are uploaded without copying them into bytes first
         if isinstance(buffer, numpy.ndarray):
-            buffer = self.ctx.buffer(buffer.tobytes())
+            buffer = self.ctx.buffer(numpy.ascontiguousarray(buffer))
 
         if isinstance(buffer, bytes):
             buffer = self.ctx.buffer(data=buffer)
 
-        formats = buffer_format.split()
-        if len(formats) != len(attribute_names):
-            raise VAOError("Format '{}' does not describe attributes {}".format(buffer_format, attribute_names))
-
         self.buffers.append(BufferInfo(buffer, buffer_format, attribute_names, per_instance=per_instance))
         self.vertex_count = self.buffers[-1].vertices
+        self._content_cache = {}
+
+        if isinstance(buffer, DynamicBuffer):
+            self._dynamic_buffers.append(buffer)
 
         return buffer
 
-    def index_buffer(self, buffer, index_element_size=4):
+    def remove_buffer(self, buffer):
+        """
+        Detach a buffer added with :py:meth:`buffer`. The buffer is not released.
+
+        Args:
+            buffer: The ``moderngl.Buffer``, :py:class:`DynamicBuffer` or :py:class:`BufferRange` to detach
+        """
+        infos = [info for info in self.buffers if info._buffer is buffer]
+        if not infos:
+            raise VAOError("Buffer is not attached to VAO {}".format(self.name))
+
+        # Instances and content are referencing the buffer
+        for _, _, vao in self.vaos.values():
+            vao.release()
+
+        self.vaos = {}
+        self._content_cache = {}
+
+        self.buffers = [info for info in self.buffers if info not in infos]
+        self.vertex_count = self.buffers[-1].vertices if self.buffers else 0
+        if isinstance(buffer, DynamicBuffer):
+            self._dynamic_buffers.remove(buffer)
+
+    def interleave(self, align=4) -> moderngl.Buffer:
+        """
+        Combine all static per vertex buffers into a single interleaved buffer.
+        Each attribute is aligned to ``align`` bytes by inserting padding.
+        Per instance and dynamic buffers are left untouched.
+        The data is read back from the separate buffers and they are released.
+        Use :py:func:`interleave_vertices` to interleave data still on the CPU
+        instead of uploading and reading it back.
+
+        Keyword Args:
+            align (int): Byte alignment of each attribute
+
+        Returns:
+            The new ``moderngl.Buffer`` or ``None`` if there was nothing to interleave
+        """
+        if len(self._static_buffers()) < 2:
+            return None
+
+        return self.replace_vertices(*self.read_vertices(align=align))
+
+    def replace_vertices(self, data: numpy.ndarray, buffer_format: str, indices=None) -> moderngl.Buffer:
+        """
+        Replace all static per vertex buffers with a single interleaved buffer.
+        The old buffers are released. Per instance and dynamic buffers are kept.
+
+        Args:
+            data: numpy structured array with a field for each attribute
+            buffer_format (str): The buffer format matching the structured array
+
+        Keyword Args:
+            indices: Optional ``numpy.array`` of indices replacing the index buffer.
+                     The indices are narrowed to the smallest fitting type.
+
+        Returns:
+            The new ``moderngl.Buffer``. A :py:class:`BufferRange` if the
+            replaced buffers were allocated from an arena.
+        """
+        infos = self._static_buffers()
+        arena = next((info.range.arena for info in infos if info.range), None)
+
+        # Instances and content are referencing the old buffers
+        for _, _, vao in self.vaos.values():
+            vao.release()
+
+        self.vaos = {}
+        self._content_cache = {}
+
+        for info in infos:
+            info.release()
+
+        buffer = arena.allocate_data(data) if arena else self.ctx.buffer(data.tobytes())
+        info = BufferInfo(buffer, buffer_format, list(data.dtype.names))
+        self.buffers = [info] + [b for b in self.buffers if b not in infos]
+        self.vertex_count = info.vertices
+
+        if indices is not None:
+            index_arena = self._index_range.arena if self._index_range else None
+            self._release_index_buffer()
+            self.index_buffer(indices, narrow=True, arena=index_arena)
+
+        return buffer
+
+    def read_vertices(self, align=4):
+        """
+        Read back all static per vertex buffers into a numpy structured array
+        with a field for each attribute. Each attribute is aligned to ``align`` bytes.
+
+        Keyword Args:
+            align (int): Byte alignment of each attribute
+
+        Returns:
+            (numpy.ndarray, str) tuple with the data and the matching buffer format
+        """
+        infos = self._static_buffers()
+        if not infos:
+            raise VAOError("VAO {} has no static vertex buffers to read".format(self.name))
+
+        vertices = infos[0].vertices
+        if any(info.vertices != vertices for info in infos):
+            raise VAOError("Buffers in VAO {} have different vertex counts: {}".format(
+                self.name, [info.vertices for info in infos]))
+
+        dtype, buffer_format = vertex_layout(
+            [
+                (name, attrib_format)
+                for info in infos
+                for attrib_format, name in zip([f for f in info.attrib_formats if not f.padding], info.attributes)
+            ],
+            align=align,
+        )
+        data = numpy.zeros(vertices, dtype=dtype)
+
+        for info in infos:
+            source = numpy.frombuffer(info.read(), dtype=info.dtype)
+            for name in info.attributes:
+                data[name] = source[name]
+
+        return data, buffer_format
+
+    def read_indices(self) -> numpy.ndarray:
+        """
+        Read back the index buffer
+
+        Returns:
+            ``numpy.array`` of indices or ``None`` if there is no index buffer
+        """
+        if not self._index_buffer:
+            return None
+
+        data = self._index_range.read() if self._index_range else self._index_buffer.read()
+        return numpy.frombuffer(data, dtype='u{}'.format(self._index_element_size)).copy()
+
+    def index_buffer(self, buffer, index_element_size=4, narrow=False, arena=None):
         """
         Set the index buffer for this VAO
 
         Args:
-            buffer: ``moderngl.Buffer``, ``numpy.array`` or ``bytes``
+            buffer: ``moderngl.Buffer``, ``numpy.array``, ``bytes`` or a :py:class:`BufferRange`
 
         Keyword Args:
             index_element_size (int): Byte size of each element. 1, 2 or 4
+            narrow (bool): Convert ``numpy.array`` and ``bytes`` data to the smallest
+                           element size fitting the largest index
+            arena: :py:class:`BufferArena` to allocate ``numpy.array`` and ``bytes`` data from
         """
-        if not type(buffer) in [moderngl.Buffer, numpy.ndarray, bytes]:
-            raise VAOError("buffer parameter must be a moderngl.Buffer, numpy.ndarray or bytes instance")
+        if not type(buffer) in [moderngl.Buffer, numpy.ndarray, bytes, BufferRange]:
+            raise VAOError("buffer parameter must be a moderngl.Buffer, BufferRange, numpy.ndarray or bytes instance")
+
+        if narrow and isinstance(buffer, bytes):
+            buffer = numpy.frombuffer(buffer, dtype='u{}'.format(index_element_size))
+
+        if narrow and isinstance(buffer, numpy.ndarray):
+            buffer = narrow_indices(buffer)
+            index_element_size = buffer.itemsize
+
+        if arena is not None and isinstance(buffer, numpy.ndarray):
+            buffer = arena.allocate_data(numpy.ascontiguousarray(buffer))
+
+        if arena is not None and isinstance(buffer, bytes):
+            buffer = arena.allocate_data(buffer)
 
         if isinstance(buffer, numpy.ndarray):
-            buffer = self.ctx.buffer(buffer.tobytes())
+            buffer = self.ctx.buffer(numpy.ascontiguousarray(buffer))
 
         if isinstance(buffer, bytes):
             buffer = self.ctx.buffer(data=buffer)
 
-        self._index_buffer = buffer
+        self._index_range = buffer if isinstance(buffer, BufferRange) else None
+        self._index_buffer = buffer.buffer if self._index_range else buffer
         self._index_element_size = index_element_size
+        self._content_cache = {}
+
+    @property
+    def index_element_size(self) -> int:
+        """(int) Byte size of each index or ``None`` if there is no index buffer"""
+        return self._index_element_size if self._index_buffer else None
+
+    @property
+    def index_count(self) -> int:
+        """(int) Number of indices or ``None`` if there is no index buffer"""
+        if not self._index_buffer:
+            return None
+
+        size = self._index_range.size if self._index_range else self._index_buffer.size
+        return size // self._index_element_size
+
+    @property
+    def first_index(self) -> int:
+        """(int) Position of the first index in the index buffer. Non-zero for arena ranges."""
+        return self._index_range.offset // self._index_element_size if self._index_range else 0
 
     def instance(self, program: moderngl.Program) -> moderngl.VertexArray:
         """
         Obtain the ``moderngl.VertexArray`` instance for the program.
         The instance is only created once and cached internally.
 
+        When dynamic buffers are attached an instance is created for each combination
+        of regions and the instance for the current regions is returned.
+
         Returns: ``moderngl.VertexArray`` instance
         """
-        vao = self.vaos.get(program.glo)
-        if vao:
-            return vao
+        key = (program.glo, self._regions())
+        entry = self.vaos.get(key)
+        if entry and entry[1] is program.mglo:
+            return entry[2]
+
+        # The cached instance belongs to a released program with the same glo
+        if entry:
+            self.release_instance(program)
 
+        # This is a good time to get rid of instances for other released programs
+        self.release_unused()
+
+        # Arena ranges are bound separately at their offset
+        content = self.content(program)
+        ranges = [c for c in content if isinstance(c[0], BufferRange)]
+        content = [c for c in content if not isinstance(c[0], BufferRange)]
+
+        # Create the vao
+        if self._index_buffer:
+            vao = context.ctx().vertex_array(program, content,
+                                             self._index_buffer, self._index_element_size)
+        else:
+            vao = context.ctx().vertex_array(program, content)
+
+        for buffer_range, buffer_format, *attributes in ranges:
+            _bind_range(vao, program, buffer_range, buffer_format, attributes)
+
+        # Vertex counts are detected from the size of the arena buffers
+        if ranges or self._index_range:
+            vao.vertices = self.index_count if self._index_buffer else self.vertex_count
+
+        self.vaos[key] = (program, program.mglo, vao)
+        return vao
+
+    def content(self, program: moderngl.Program) -> list:
+        """
+        Get the vertex array content mapping buffers to the program's attributes.
+        The content is cached by the attribute layout of the program.
+
+        Returns:
+            List of ``(buffer, format, *attributes)`` tuples
+        """
         program_attributes = [name for name, attr in program._members.items() if isinstance(attr, moderngl.Attribute)]
+        layout = (tuple(sorted(program_attributes)), self._regions())
+
+        vao_content = self._content_cache.get(layout)
+        if vao_content is not None:
+            return vao_content
 
         # Make sure all attributes are covered
         for attrib_name in program_attributes:
@@ -283,15 +736,65 @@ class VAO:
 
                 raise VAOError("Did not find a buffer mapping for {}".format([n for n in program_attributes]))
 
-        # Create the vao
-        if self._index_buffer:
-            vao = context.ctx().vertex_array(program, vao_content,
-                                             self._index_buffer, self._index_element_size)
-        else:
-            vao = context.ctx().vertex_array(program, vao_content)
+        self._content_cache[layout] = vao_content
+        return vao_content
 
-        self.vaos[program.glo] = vao
-        return vao
+    def release_instance(self, program: moderngl.Program):
+        """
+        Release the ``moderngl.VertexArray`` instance for a program if present
+
+        Args:
+            program: The ``moderngl.Program``
+        """
+        for key in [key for key in self.vaos if key[0] == program.glo]:
+            self.vaos.pop(key)[2].release()
+
+    def release_unused(self) -> int:
+        """
+        Release ``moderngl.VertexArray`` instances belonging to released programs
+
+        Returns:
+            The number of released instances
+        """
+        released = [key for key, (program, mglo, _) in self.vaos.items() if _is_released(program, mglo)]
+        for key in released:
+            self.vaos.pop(key)[2].release()
+
+        return len(released)
+
+    @property
+    def cache_info(self) -> dict:
+        """
+        Cache sizes for diagnostics.
+
+        Returns:
+            dict with the number of cached vertex arrays and attribute layouts
+        """
+        return {
+            'vertex_arrays': len(self.vaos),
+            'layouts': len({layout for layout, _ in self._content_cache}),
+        }
+
+    def _static_buffers(self) -> List[BufferInfo]:
+        """Buffers with per vertex data not changing every frame"""
+        return [info for info in self.buffers if not info.per_instance and not info.dynamic]
+
+    def _regions(self) -> tuple:
+        """The current region of each dynamic buffer"""
+        return tuple(dynamic.index for dynamic in self._dynamic_buffers)
+
+    def _rendered(self):
+        for dynamic in self._dynamic_buffers:
+            dynamic.rendered()
+
+    def _release_index_buffer(self):
+        if self._index_range:
+            self._index_range.release()
+        elif self._index_buffer:
+            self._index_buffer.release()
+
+        self._index_buffer = None
+        self._index_range = None
 
     def release(self, buffer=True):
         """
@@ -300,15 +803,124 @@ class VAO:
         Keyword Args:
             buffers (bool): also release buffers
         """
-        for key, vao in self.vaos:
+        for _, _, vao in self.vaos.values():
             vao.release()
 
+        self.vaos = {}
+        self._content_cache = {}
+
         if buffer:
             for buff in self.buffers:
-                buff.buffer.release()
+                buff.release()
+
+            self._release_index_buffer()
+
+
+def vertex_layout(attributes, align=4):
+    """
+    Create an interleaved vertex layout aligning each attribute to ``align`` bytes
+
+    Args:
+        attributes: List of ``(name, BufferFormat)`` tuples
+
+    Keyword Args:
+        align (int): Byte alignment of each attribute
+
+    Returns:
+        (numpy.dtype, str) tuple with a structured dtype and the matching buffer format
+    """
+    formats, names, dtype_formats, offsets = [], [], [], []
+    offset = 0
+    for name, attrib_format in attributes:
+        formats.append(attrib_format.format)
+        names.append(name)
+        dtype_formats.append(attrib_format.dtype)
+        offsets.append(offset)
+        offset += attrib_format.bytes_total
+
+        padding = -offset % align
+        if padding:
+            formats.append("{}x".format(padding))
+            offset += padding
 
-            if self._index_buffer:
-                self._index_buffer.release()
+    dtype = numpy.dtype({'names': names, 'formats': dtype_formats, 'offsets': offsets, 'itemsize': offset})
+    return dtype, " ".join(formats)
+
+
+def interleave_vertices(attributes, align=4):
+    """
+    Interleave attribute arrays on the CPU into a numpy structured array
+    that can be uploaded with :py:meth:`VAO.buffer` as a single buffer
+
+    Args:
+        attributes: List of ``(name, format, values)`` tuples with a single
+                    attribute format such as ``3f`` and a numpy array of values
+
+    Keyword Args:
+        align (int): Byte alignment of each attribute
+
+    Returns:
+        (numpy.ndarray, str) tuple with the vertices and the matching buffer format
+    """
+    formats = [(name, types.attribute_format(frmt)) for name, frmt, _ in attributes]
+    dtype, buffer_format = vertex_layout(formats, align=align)
+
+    count = numpy.size(attributes[0][2]) // formats[0][1].components
+    data = numpy.zeros(count, dtype=dtype)
+    for name, _, values in attributes:
+        data[name] = numpy.reshape(values, data[name].shape)
+
+    return data, buffer_format
+
+
+def narrow_indices(indices: numpy.ndarray) -> numpy.ndarray:
+    """
+    Convert indices to the smallest unsigned type fitting the largest index
+
+    Args:
+        indices: ``numpy.array`` of indices
+
+    Returns:
+        Flattened ``numpy.array`` of ``uint8``, ``uint16`` or ``uint32``
+    """
+    indices = indices.ravel()
+    largest = int(indices.max()) if indices.size else 0
+
+    for dtype in (numpy.uint8, numpy.uint16):
+        if largest <= numpy.iinfo(dtype).max:
+            return indices.astype(dtype, copy=False)
+
+    return indices.astype(numpy.uint32, copy=False)
+
+
+def _can_bind(attrib_format) -> bool:
+    """Can the attribute be bound at an offset? Binding never normalizes and takes up to 4 components."""
+    return attrib_format.components <= 4 and not attrib_format.format.endswith('f1')
+
+
+def _bind_range(vao, program, buffer_range, buffer_format, attributes):
+    """Bind the attributes of an arena range to a vertex array"""
+    formats = types.parse_attribute_formats(buffer_format)
+    stride = sum(f.bytes_total for f in formats)
+    attributes = iter(attributes)
+    offset = buffer_range.offset
+
+    for attrib_format in formats:
+        if not attrib_format.padding:
+            attribute = program[next(attributes)]
+            cls = {'d': 'd', 'i': 'i', 'I': 'i'}.get(attribute.shape, 'f')
+            vao.bind(attribute.location, cls, buffer_range.buffer, attrib_format.format,
+                     offset=offset, stride=stride)
+
+        offset += attrib_format.bytes_total
+
+
+def _is_released(program, mglo) -> bool:
+    """
+    Check if a program is released or replaced (reloaded).
+    Released moderngl objects have their internal object turned into an InvalidObject.
+    """
+    return program.mglo is not mglo or type(mglo).__name__ == 'InvalidObject'
 
 
 class VAOError(Exception):
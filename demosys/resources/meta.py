@@ -24,7 +24,8 @@ class ProgramDescription(ResourceDescription):
 
     def __init__(self, path=None, label=None, loader=None, reloadable=False,
                  vertex_shader=None, geometry_shader=None, fragment_shader=None,
-                 tess_control_shader=None, tess_evaluation_shader=None, **kwargs):
+                 tess_control_shader=None, tess_evaluation_shader=None, compute_shader=None,
+                 defines=None, varyings=None, **kwargs):
         kwargs.update({
             "path": path,
             "label": label,
@@ -35,6 +36,9 @@ class ProgramDescription(ResourceDescription):
             "fragment_shader": fragment_shader,
             "tess_control_shader": tess_control_shader,
             "tess_evaluation_shader": tess_evaluation_shader,
+            "compute_shader": compute_shader,
+            "defines": defines,
+            "varyings": varyings,
         })
         super().__init__(**kwargs)
 
@@ -66,6 +70,23 @@ class ProgramDescription(ResourceDescription):
     def tess_evaluation_shader(self):
         return self._kwargs.get('tess_evaluation_shader')
 
+    @property
+    def compute_shader(self):
+        return self._kwargs.get('compute_shader')
+
+    @property
+    def defines(self) -> dict:
+        """(dict) Preprocessor defines injected into every shader in the program"""
+        return self._kwargs.get('defines') or {}
+
+    @property
+    def varyings(self) -> list:
+        """
+        (list) Transform feedback varyings in capture order.
+        When not specified they are detected from out attributes in the source.
+        """
+        return self._kwargs.get('varyings') or []
+
 
 class SceneDescription(ResourceDescription):
     """Describes a scene to load"""
@@ -73,13 +94,75 @@ class SceneDescription(ResourceDescription):
     default_loader = None
     resource_type = 'scenes'
 
-    def __init__(self, path=None, label=None, **kwargs):
+    def __init__(self, path=None, label=None, interleave=False, batch=False,
+                 optimize=False, vertex_cache_size=32, quantize=False, quantize_positions=False,
+                 arena=False, lods=0, lod_ratio=0.5, lod_cache=True, **kwargs):
         kwargs.update({
             "path": path,
             "label": label,
+            "interleave": interleave,
+            "batch": batch,
+            "optimize": optimize,
+            "vertex_cache_size": vertex_cache_size,
+            "quantize": quantize,
+            "quantize_positions": quantize_positions,
+            "arena": arena,
+            "lods": lods,
+            "lod_ratio": lod_ratio,
+            "lod_cache": lod_cache,
         })
         super().__init__(**kwargs)
 
+    @property
+    def interleave(self) -> bool:
+        """(bool) Interleave separate vertex attribute buffers when supported by the loader"""
+        return self._kwargs.get('interleave')
+
+    @property
+    def batch(self) -> bool:
+        """(bool) Merge static meshes into batches after loading"""
+        return self._kwargs.get('batch')
+
+    @property
+    def optimize(self) -> bool:
+        """(bool) Reorder triangles and vertices for the vertex cache after loading"""
+        return self._kwargs.get('optimize')
+
+    @property
+    def vertex_cache_size(self) -> int:
+        """(int) Vertex cache size to optimize for"""
+        return self._kwargs.get('vertex_cache_size')
+
+    @property
+    def quantize(self) -> bool:
+        """(bool) Store normals as octahedral shorts and uvs as half floats after loading"""
+        return self._kwargs.get('quantize')
+
+    @property
+    def quantize_positions(self) -> bool:
+        """(bool) Also store positions as shorts relative to the mesh bounding box"""
+        return self._kwargs.get('quantize_positions')
+
+    @property
+    def arena(self) -> bool:
+        """(bool) Allocate vertex and index data from the shared buffer arena"""
+        return self._kwargs.get('arena')
+
+    @property
+    def lods(self) -> int:
+        """(int) Number of simplified levels of detail to generate for each mesh after loading"""
+        return self._kwargs.get('lods')
+
+    @property
+    def lod_ratio(self) -> float:
+        """(float) Fraction of triangles kept by each level of detail"""
+        return self._kwargs.get('lod_ratio')
+
+    @property
+    def lod_cache(self) -> bool:
+        """(bool) Store generated levels of detail in a ``.lod.npz`` file next to the scene"""
+        return self._kwargs.get('lod_cache')
+
 
 class TextureDescription(ResourceDescription):
     """Describes a texture to load"""
@@ -17,6 +17,34 @@ class Scenes(BaseRegistry):
             import_string(loader) for loader in settings.SCENE_LOADERS
         ]
 
+    def load(self, meta: SceneDescription):
+        """
+        Load a scene and apply post processing steps
+        requested in the description such as batching
+        """
+        scene = super().load(meta)
+        if meta.optimize:
+            stats = scene.optimize(cache_size=meta.vertex_cache_size)
+            print("Optimized {} meshes in {}: ACMR {:.3f} -> {:.3f}".format(
+                stats['meshes'], meta.label, stats['acmr_before'], stats['acmr_after']))
+
+        if meta.lods:
+            cache = str(meta.resolved_path) + '.lod.npz' if meta.lod_cache else None
+            stats = scene.generate_lods(levels=meta.lods, ratio=meta.lod_ratio, cache=cache)
+            print("Generated {} levels of detail for {} meshes in {}: {} -> {} triangles ({} cached)".format(
+                stats['levels'], stats['meshes'], meta.label, stats['triangles_before'],
+                stats['triangles_after'], stats['cached']))
+
+        if meta.quantize:
+            stats = scene.quantize(position='unorm16' if meta.quantize_positions else None)
+            print("Quantized {} meshes in {}: {} -> {} bytes".format(
+                stats['meshes'], meta.label, stats['bytes_before'], stats['bytes_after']))
+
+        if meta.batch:
+            scene.batch()
+
+        return scene
+
     def resolve_loader(self, meta: SceneDescription):
         """
         Resolve scene loader based on file extension
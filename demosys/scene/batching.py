@@ -0,0 +1,288 @@
+"""
+Static batching of meshes sharing a vertex format into merged VAOs
+"""
+from collections import OrderedDict
+from typing import List
+
+import numpy
+
+from demosys import context
+from demosys.opengl.commands import DrawCommandBuffer
+from demosys.opengl.vao import VAO
+
+from .programs import INSTANCED, QUANTIZED_POSITION, QUANTIZED_UV, SKINNED, VariantProgram
+
+
+class BatchPart:
+    """A mesh drawn by a node merged into a batch"""
+    def __init__(self, node, mesh, base_vertex: int, first_index: int, index_count: int):
+        self.node = node
+        self.mesh = mesh
+        self.base_vertex = base_vertex
+        self.first_index = first_index
+        self.index_count = index_count
+
+
+class BatchGroup:
+    """A range of draw commands sharing a program variant and material"""
+    def __init__(self, mesh_program, features: int, material, first: int, count: int):
+        self.mesh_program = mesh_program
+        self.features = features
+        self.material = material
+        self.first = first
+        self.count = count
+
+
+class MeshBatch:
+    """
+    Static meshes with the same vertex format merged into a single VAO.
+
+    Vertices are baked into scene space using the world matrix of each node.
+    Each part keeps its base vertex and index range and is drawn by an
+    indirect draw command in :py:attr:`commands`. Parts can be hidden
+    by disabling their command. Commands are ordered by program variant and
+    material so each group is rendered with a single ``render_indirect`` call.
+    When indirect rendering is not supported (OpenGL < 4.3) the base vertex
+    is added to the indices and each run of consecutive visible parts
+    in a group is rendered with a single ``render`` call.
+    """
+    def __init__(self, name: str, mode: int, buffer_format: str, parts, indirect=None):
+        """
+        :param name: Name of the batch
+        :param mode: Draw mode
+        :param buffer_format: Format of the interleaved vertex data
+        :param parts: List of (node, mesh, vertices, indices) tuples
+        :param indirect: Use indirect rendering. Auto detected by default.
+        """
+        self.ctx = context.ctx()
+        self.name = name
+        self.indirect = self.ctx.version_code >= 430 if indirect is None else indirect
+
+        parts = sorted(parts, key=lambda p: (p[1].program_features, id(p[1].material)))
+
+        self.parts = []
+        vertex_data, index_data = [], []
+        base_vertex, first_index = 0, 0
+        for node, mesh, vertices, indices in parts:
+            self.parts.append(BatchPart(node, mesh, base_vertex, first_index, len(indices)))
+            vertex_data.append(vertices)
+            index_data.append(indices if self.indirect else indices.astype('u4') + base_vertex)
+            base_vertex += len(vertices)
+            first_index += len(indices)
+
+        self.vertex_count = base_vertex
+        self.index_count = first_index
+
+        self.vao = VAO(name, mode=mode)
+        self.vao.buffer(numpy.concatenate(vertex_data), buffer_format, list(vertex_data[0].dtype.names))
+        self.vao.index_buffer(numpy.concatenate(index_data), narrow=True)
+
+        self.commands = DrawCommandBuffer(capacity=len(self.parts))
+        for part in self.parts:
+            self.commands.add(part.index_count, first_index=part.first_index, base_vertex=part.base_vertex)
+
+        self.groups = []
+        for i, part in enumerate(self.parts):
+            group = self.groups[-1] if self.groups else None
+            if group and group.features == part.mesh.program_features and group.material is part.mesh.material:
+                group.count += 1
+            else:
+                self.groups.append(BatchGroup(
+                    part.mesh.mesh_program, part.mesh.program_features, part.mesh.material, i, 1))
+
+        # Index ranges of each group drawn without indirect rendering
+        self._ranges = None
+
+    @property
+    def draw_calls(self) -> int:
+        """Number of draw calls issued by :py:meth:`draw`"""
+        if self.indirect:
+            return len(self.groups)
+
+        return sum(len(ranges) for ranges in self.ranges())
+
+    def ranges(self) -> list:
+        """
+        Index ranges covering the runs of consecutive visible parts in each group.
+        Parts of a group are next to each other in the index buffer and the
+        indices include the base vertex, so each run is a single draw.
+
+        :return: List with a list of (first_index, index_count) tuples for each group
+        """
+        if self._ranges is None:
+            self._ranges = [self._group_ranges(group) for group in self.groups]
+
+        return self._ranges
+
+    def set_visible(self, visible):
+        """
+        Enable or disable the draw command of each part
+
+        :param visible: Boolean array with the visibility of each part
+        """
+        self.commands.set_enabled(visible)
+        self._ranges = None
+
+    def draw(self, projection_matrix=None, view_matrix=None, camera_matrix=None, time=0):
+        """
+        Draw all groups in the batch
+
+        :param projection_matrix: projection matrix (bytes)
+        :param view_matrix: view matrix of the scene (bytes)
+        :param camera_matrix: camera_matrix (bytes)
+        :param time: The current time
+        """
+        ranges = None if self.indirect else self.ranges()
+        for i, group in enumerate(self.groups):
+            if ranges is not None and not ranges[i]:
+                continue
+
+            program = group.mesh_program.use(
+                group.features,
+                group.material,
+                projection_matrix=projection_matrix,
+                view_matrix=view_matrix,
+                camera_matrix=camera_matrix,
+            )
+
+            if self.indirect:
+                self.commands.render(self.vao, program, first=group.first, count=group.count)
+                continue
+
+            for first, count in ranges[i]:
+                self.vao.render(program, vertices=count, first=first)
+
+    def release(self):
+        """Release the merged buffers"""
+        self.vao.release()
+        self.commands.release()
+
+    def _group_ranges(self, group) -> list:
+        commands = self.commands.data[group.first:group.first + group.count]
+        enabled = (commands['instance_count'] > 0).astype('i1')
+        edges = numpy.diff(numpy.concatenate(([0], enabled, [0])))
+        starts = numpy.nonzero(edges == 1)[0]
+        ends = numpy.nonzero(edges == -1)[0] - 1
+
+        first = commands['first_index'][starts].astype('i8')
+        last = commands['first_index'][ends].astype('i8') + commands['count'][ends]
+        return list(zip(first.tolist(), (last - first).tolist()))
+
+
+def batch_scene(scene, indirect=None) -> List[MeshBatch]:
+    """
+    Merge static meshes in a scene into batches by vertex format and draw mode.
+    Only meshes drawn by a :py:class:`VariantProgram` without skinning,
+    instancing or range quantized attributes are batched.
+    Batched nodes are flagged so they are not drawn twice.
+
+    The vertices of every mesh are read back from the GPU and the merged
+    copies are kept next to the original buffers, so batching roughly
+    doubles the vertex memory of the batched meshes unless the sources
+    are released with ``Scene.batch(release_sources=True)``.
+
+    :param scene: The scene to batch
+    :param indirect: Use indirect rendering. Auto detected by default.
+    :return: List of MeshBatch instances
+    """
+    # Vertices are baked relative to the scene's view matrix
+    scene_inverse = numpy.linalg.inv(scene.view_matrix.astype('f8'))
+
+    candidates = OrderedDict()
+    for node in _walk(scene.root_nodes):
+        mesh = node.mesh
+        if not _can_batch(mesh) or node.matrix_global is None:
+            continue
+
+        vertices, buffer_format = mesh.vao.read_vertices()
+        if not _can_bake(mesh, vertices):
+            continue
+
+        indices = mesh.vao.read_indices()
+        if indices is None:
+            indices = numpy.arange(len(vertices), dtype='u4')
+
+        matrix = numpy.asarray(node.matrix_global, dtype='f8') @ scene_inverse
+        key = (mesh.vao.mode, buffer_format, vertices.dtype)
+        candidates.setdefault(key, []).append((node, mesh, _bake(mesh, vertices, matrix), indices))
+
+    batches = []
+    for (mode, buffer_format, _), parts in candidates.items():
+        # Nothing to gain from batching a single draw
+        if len(parts) < 2:
+            continue
+
+        batches.append(MeshBatch(
+            "{}:batch:{}".format(scene.name, len(batches)), mode, buffer_format, parts, indirect=indirect))
+
+        for node, *_ in parts:
+            node.batched = True
+
+    return batches
+
+
+def _walk(nodes):
+    for node in nodes:
+        yield node
+        yield from _walk(node.children)
+
+
+def _can_batch(mesh) -> bool:
+    if mesh is None or mesh.vao is None:
+        return False
+
+    if not isinstance(mesh.mesh_program, VariantProgram):
+        return False
+
+    if mesh.program_features & (SKINNED | INSTANCED):
+        return False
+
+    # Levels of detail are selected per node
+    if mesh.lods:
+        return False
+
+    # Decoding depends on the value range of each mesh
+    if mesh.program_features & (QUANTIZED_POSITION | QUANTIZED_UV):
+        return False
+
+    return all(not info.per_instance and not info.dynamic for info in mesh.vao.buffers)
+
+
+def _can_bake(mesh, vertices) -> bool:
+    """Positions, normals and tangents must be floats to be transformed"""
+    for attr_type in ('POSITION', 'NORMAL', 'TANGENT'):
+        name = _attribute_name(mesh, vertices, attr_type)
+        if name and vertices.dtype[name].base.kind != 'f':
+            return False
+
+    return _attribute_name(mesh, vertices, 'POSITION') is not None
+
+
+def _bake(mesh, vertices, matrix):
+    """Transform positions, normals and tangents into scene space"""
+    vertices = vertices.copy()
+
+    name = _attribute_name(mesh, vertices, 'POSITION')
+    positions = vertices[name][:, :3].astype('f8')
+    vertices[name][:, :3] = positions @ matrix[:3, :3] + matrix[3, :3]
+
+    normal_matrix = numpy.linalg.inv(matrix[:3, :3]).T
+    for attr_type, transform in (('NORMAL', normal_matrix), ('TANGENT', matrix[:3, :3])):
+        name = _attribute_name(mesh, vertices, attr_type)
+        if not name:
+            continue
+
+        directions = vertices[name][:, :3].astype('f8') @ transform
+        lengths = numpy.linalg.norm(directions, axis=1, keepdims=True)
+        vertices[name][:, :3] = directions / numpy.where(lengths > 0, lengths, 1.0)
+
+    return vertices
+
+
+def _attribute_name(mesh, vertices, attr_type):
+    """Name of an attribute type if present in the vertex data"""
+    attribute = mesh.attributes.get(attr_type)
+    if not attribute or attribute['name'] not in vertices.dtype.names:
+        return None
+
+    return attribute['name']
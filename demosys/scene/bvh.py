@@ -0,0 +1,278 @@
+"""
+Bounding volume hierarchy over axis aligned bounding boxes
+"""
+import numpy
+
+
+class BVH:
+    """
+    Bounding volume hierarchy built with binned SAH splits.
+
+    Nodes are stored in flat arrays. The two children of an inner node are
+    stored next to each other starting at :py:attr:`child` and every node covers
+    a contiguous range of :py:attr:`order`, the item indices sorted by leaf.
+    Queries traverse the tree one level at a time testing all nodes of the
+    level in a single numpy pass.
+    """
+    def __init__(self, bbox_min, bbox_max, leaf_size=4, bins=16):
+        """
+        :param bbox_min: ``(N, 3)`` array of item box minimums
+        :param bbox_max: ``(N, 3)`` array of item box maximums
+        :param leaf_size: Ranges of this size or smaller always become leaves
+        :param bins: Number of bins evaluated for each split
+        """
+        self.bbox_min = numpy.array(bbox_min, dtype='f4').reshape(-1, 3)
+        self.bbox_max = numpy.array(bbox_max, dtype='f4').reshape(-1, 3)
+        self.leaf_size = max(leaf_size, 1)
+        self.bins = bins
+
+        count = len(self.bbox_min)
+        capacity = max(2 * count - 1, 1)
+        self.order = numpy.arange(count, dtype='i4')
+        self.node_min = numpy.zeros((capacity, 3), dtype='f4')
+        self.node_max = numpy.zeros((capacity, 3), dtype='f4')
+        self.first = numpy.zeros(capacity, dtype='i4')
+        self.count = numpy.zeros(capacity, dtype='i4')
+        # Index of the first child or -1 for leaves
+        self.child = numpy.full(capacity, -1, dtype='i4')
+        self.depth = numpy.zeros(capacity, dtype='i4')
+        self.node_count = 0
+
+        if count:
+            self._build()
+
+    def __len__(self):
+        return len(self.bbox_min)
+
+    @property
+    def leaves(self) -> numpy.ndarray:
+        """Indices of the leaf nodes"""
+        return numpy.nonzero(self.child[:self.node_count] < 0)[0]
+
+    def frustum(self, planes) -> numpy.ndarray:
+        """
+        Find the items intersecting a frustum
+
+        :param planes: ``(6, 4)`` array of normalized frustum planes
+        :return: Boolean array with the visibility of each item
+        """
+        planes = numpy.asarray(planes, dtype='f4')
+        normals, abs_normals = planes[:, :3].T, numpy.abs(planes[:, :3]).T
+        visible = numpy.zeros(len(self), dtype=bool)
+        if not len(self):
+            return visible
+
+        def classify(bmin, bmax):
+            distances = (bmin + bmax) * 0.5 @ normals + planes[:, 3]
+            radii = (bmax - bmin) * 0.5 @ abs_normals
+            return numpy.all(distances + radii >= 0.0, axis=1), numpy.all(distances - radii >= 0.0, axis=1)
+
+        nodes = numpy.zeros(1, dtype='i4')
+        while len(nodes):
+            intersects, contained = classify(self.node_min[nodes], self.node_max[nodes])
+
+            # Everything below a contained node is visible
+            inside = nodes[contained]
+            visible[self.order[_ranges(self.first[inside], self.count[inside])]] = True
+
+            nodes = nodes[intersects & ~contained]
+            leaves = nodes[self.child[nodes] < 0]
+            if len(leaves):
+                items = self.order[_ranges(self.first[leaves], self.count[leaves])]
+                visible[items[classify(self.bbox_min[items], self.bbox_max[items])[0]]] = True
+
+            nodes = self._children(nodes)
+
+        return visible
+
+    def ray(self, origin, direction, max_distance=numpy.inf):
+        """
+        Find the items whose box is hit by a ray
+
+        :param origin: Ray origin
+        :param direction: Ray direction. Distances are in units of its length.
+        :param max_distance: Ignore hits further away
+        :return: (items, distances) tuple of arrays sorted by distance.
+                 The distance is zero for boxes containing the origin.
+        """
+        origin = numpy.asarray(origin, dtype='f4')
+        direction = numpy.asarray(direction, dtype='f4')
+        with numpy.errstate(divide='ignore'):
+            inverse = 1.0 / direction
+
+        def slabs(bmin, bmax):
+            with numpy.errstate(invalid='ignore'):
+                near = (bmin - origin) * inverse
+                far = (bmax - origin) * inverse
+            # 0 * inf is nan for rays parallel to a slab touching the box
+            near, far = numpy.fmin(near, far), numpy.fmax(near, far)
+            enter = numpy.maximum(numpy.nanmax(near, axis=1), 0.0)
+            leave = numpy.minimum(numpy.nanmin(far, axis=1), max_distance)
+            return enter <= leave, enter
+
+        hits, distances = [], []
+        nodes = numpy.zeros(1 if len(self) else 0, dtype='i4')
+        while len(nodes):
+            nodes = nodes[slabs(self.node_min[nodes], self.node_max[nodes])[0]]
+            leaves = nodes[self.child[nodes] < 0]
+            if len(leaves):
+                items = self.order[_ranges(self.first[leaves], self.count[leaves])]
+                hit, enter = slabs(self.bbox_min[items], self.bbox_max[items])
+                hits.append(items[hit])
+                distances.append(enter[hit])
+
+            nodes = self._children(nodes)
+
+        if not hits:
+            return numpy.zeros(0, dtype='i4'), numpy.zeros(0, dtype='f4')
+
+        hits, distances = numpy.concatenate(hits), numpy.concatenate(distances)
+        order = numpy.argsort(distances, kind='stable')
+        return hits[order], distances[order]
+
+    def segment(self, start, end):
+        """
+        Find the items whose box intersects a line segment
+
+        :param start: Start of the segment
+        :param end: End of the segment
+        :return: (items, distances) tuple of arrays sorted by distance from ``start``
+        """
+        start = numpy.asarray(start, dtype='f4')
+        direction = numpy.asarray(end, dtype='f4') - start
+        length = float(numpy.linalg.norm(direction))
+        if length == 0.0:
+            direction, length = numpy.array([1.0, 0.0, 0.0], dtype='f4'), 0.0
+        else:
+            direction = direction / length
+
+        return self.ray(start, direction, max_distance=length)
+
+    def refit(self, bbox_min=None, bbox_max=None):
+        """
+        Update node bounds after items moved keeping the tree structure.
+        Queries get slower as items move far from where the tree was built.
+
+        :param bbox_min: New ``(N, 3)`` item box minimums
+        :param bbox_max: New ``(N, 3)`` item box maximums
+        """
+        if bbox_min is not None:
+            self.bbox_min[:] = bbox_min
+        if bbox_max is not None:
+            self.bbox_max[:] = bbox_max
+
+        if not len(self):
+            return
+
+        # Leaves cover consecutive ranges of the item order
+        leaves = self.leaves
+        leaves = leaves[numpy.argsort(self.first[leaves])]
+        starts = self.first[leaves]
+        self.node_min[leaves] = numpy.minimum.reduceat(self.bbox_min[self.order], starts)
+        self.node_max[leaves] = numpy.maximum.reduceat(self.bbox_max[self.order], starts)
+
+        # Children are always deeper than their parent
+        inner = numpy.nonzero(self.child[:self.node_count] >= 0)[0]
+        depths = self.depth[inner]
+        for depth in sorted(set(depths.tolist()), reverse=True):
+            nodes = inner[depths == depth]
+            left, right = self.child[nodes], self.child[nodes] + 1
+            self.node_min[nodes] = numpy.minimum(self.node_min[left], self.node_min[right])
+            self.node_max[nodes] = numpy.maximum(self.node_max[left], self.node_max[right])
+
+    def _children(self, nodes):
+        nodes = self.child[nodes]
+        nodes = nodes[nodes >= 0]
+        return numpy.concatenate([nodes, nodes + 1])
+
+    def _build(self):
+        """
+        Build the tree one level at a time.
+        Every node of a level is binned and split in the same numpy operations.
+        """
+        centers = (self.bbox_min + self.bbox_max) * 0.5
+        bins = self.bins
+        self.node_count = 1
+        nodes = numpy.zeros(1, dtype='i4')
+        self.count[0] = len(self)
+        depth = 0
+
+        while len(nodes):
+            first, count = self.first[nodes], self.count[nodes]
+            self.depth[nodes] = depth
+            positions = _ranges(first, count)
+            items = self.order[positions]
+            # Start of each node in the concatenated items
+            starts = numpy.cumsum(count) - count
+            segment = numpy.repeat(numpy.arange(len(nodes)), count)
+
+            self.node_min[nodes] = numpy.minimum.reduceat(self.bbox_min[items], starts)
+            self.node_max[nodes] = numpy.maximum.reduceat(self.bbox_max[items], starts)
+
+            # Bin item centers along the axis with the largest centroid extent of each node
+            cmin = numpy.minimum.reduceat(centers[items], starts)
+            cmax = numpy.maximum.reduceat(centers[items], starts)
+            axis = numpy.argmax(cmax - cmin, axis=1)
+            node_range = numpy.arange(len(nodes))
+            low, extent = cmin[node_range, axis], (cmax - cmin)[node_range, axis]
+            scale = numpy.where(extent > 0.0, bins / numpy.where(extent > 0.0, extent, 1.0), 0.0)
+            item_bins = ((centers[items, axis[segment]] - low[segment]) * scale[segment]).astype('i4')
+            item_bins = numpy.clip(item_bins, 0, bins - 1)
+
+            keys = segment * bins + item_bins
+            bin_min = numpy.full((len(nodes) * bins, 3), numpy.inf, dtype='f4')
+            bin_max = numpy.full((len(nodes) * bins, 3), -numpy.inf, dtype='f4')
+            numpy.minimum.at(bin_min, keys, self.bbox_min[items])
+            numpy.maximum.at(bin_max, keys, self.bbox_max[items])
+            bin_min, bin_max = bin_min.reshape(-1, bins, 3), bin_max.reshape(-1, bins, 3)
+            bin_count = numpy.bincount(keys, minlength=len(nodes) * bins).reshape(-1, bins)
+
+            # Surface area heuristic for the bins - 1 split planes of each node
+            left_area = _area(numpy.minimum.accumulate(bin_min, axis=1)[:, :-1],
+                              numpy.maximum.accumulate(bin_max, axis=1)[:, :-1])
+            right_area = _area(numpy.minimum.accumulate(bin_min[:, ::-1], axis=1)[:, ::-1][:, 1:],
+                               numpy.maximum.accumulate(bin_max[:, ::-1], axis=1)[:, ::-1][:, 1:])
+            left_count = numpy.cumsum(bin_count, axis=1)[:, :-1]
+            right_count = count[:, None] - left_count
+            valid = (left_count > 0) & (right_count > 0)
+            cost = numpy.where(valid, left_area * left_count + right_area * right_count, numpy.inf)
+            best = numpy.argmin(cost, axis=1)
+            best_cost = cost[node_range, best]
+
+            # Splitting must be cheaper than testing every item in a leaf
+            leaf_cost = _area(self.node_min[nodes], self.node_max[nodes]) * count
+            split = (count > self.leaf_size) & numpy.isfinite(best_cost)
+            split &= (best_cost < leaf_cost) | (count > 4 * self.leaf_size)
+
+            # Stable partition of the items of split nodes
+            right = split[segment] & (item_bins > best[segment])
+            self.order[positions] = items[numpy.lexsort((right, segment))]
+            left_total = numpy.bincount(segment, weights=~right, minlength=len(nodes)).astype('i4')
+
+            parents = nodes[split]
+            children = self.node_count + 2 * numpy.arange(len(parents), dtype='i4')
+            self.node_count += 2 * len(parents)
+            self.child[parents] = children
+            self.first[children] = first[split]
+            self.count[children] = left_total[split]
+            self.first[children + 1] = first[split] + left_total[split]
+            self.count[children + 1] = count[split] - left_total[split]
+
+            nodes = numpy.concatenate([children, children + 1])
+            depth += 1
+
+
+def _area(bmin, bmax):
+    """Half the surface area of boxes"""
+    size = numpy.maximum(bmax - bmin, 0.0)
+    return size[..., 0] * size[..., 1] + size[..., 1] * size[..., 2] + size[..., 2] * size[..., 0]
+
+
+def _ranges(first, count):
+    """Concatenated ``arange(first, first + count)`` for each range"""
+    if not len(first):
+        return numpy.zeros(0, dtype='i4')
+
+    ends = numpy.cumsum(count)
+    offsets = numpy.repeat(first - ends + count, count)
+    return numpy.arange(ends[-1], dtype='i4') + offsets
@@ -0,0 +1,205 @@
+"""
+View frustum culling of scene meshes using their bounding boxes
+"""
+import numpy
+
+from .bvh import BVH
+from .programs import SKINNED
+
+
+def frustum_planes(matrix) -> numpy.ndarray:
+    """
+    Extract the six frustum planes from a view projection matrix.
+    The matrix uses the pyrr row vector convention (``camera_matrix @ projection_matrix``).
+
+    :param matrix: 4x4 view projection matrix
+    :return: ``(6, 4)`` array of normalized planes. Points inside have a positive distance.
+    """
+    matrix = numpy.asarray(matrix, dtype='f8')
+    columns = matrix.T
+    planes = numpy.array([
+        columns[3] + columns[0],  # left
+        columns[3] - columns[0],  # right
+        columns[3] + columns[1],  # bottom
+        columns[3] - columns[1],  # top
+        columns[3] + columns[2],  # near
+        columns[3] - columns[2],  # far
+    ])
+    return planes / numpy.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+
+def transform_aabbs(bbox_min, bbox_max, matrices):
+    """
+    Transform axis aligned bounding boxes. The result encloses all eight transformed corners.
+
+    :param bbox_min: ``(N, 3)`` array of box minimums
+    :param bbox_max: ``(N, 3)`` array of box maximums
+    :param matrices: ``(N, 4, 4)`` array of matrices in the pyrr row vector convention
+    :return: (centers, extents) tuple of ``(N, 3)`` arrays
+    """
+    bbox_min = numpy.asarray(bbox_min, dtype='f8')
+    bbox_max = numpy.asarray(bbox_max, dtype='f8')
+    matrices = numpy.asarray(matrices, dtype='f8')
+
+    centers = (bbox_min + bbox_max) * 0.5
+    extents = (bbox_max - bbox_min) * 0.5
+
+    rotation = matrices[:, :3, :3]
+    centers = numpy.einsum('ni,nij->nj', centers, rotation) + matrices[:, 3, :3]
+    extents = numpy.einsum('ni,nij->nj', extents, numpy.abs(rotation))
+    return centers, extents
+
+
+def aabb_corners(bbox_min, bbox_max) -> numpy.ndarray:
+    """
+    The eight corners of axis aligned bounding boxes
+
+    :param bbox_min: ``(N, 3)`` array of box minimums
+    :param bbox_max: ``(N, 3)`` array of box maximums
+    :return: ``(N, 8, 3)`` array of corners
+    """
+    bbox_min = numpy.asarray(bbox_min, dtype='f8').reshape(-1, 3)
+    bbox_max = numpy.asarray(bbox_max, dtype='f8').reshape(-1, 3)
+    # Bit i of the corner index selects the max value of axis i
+    select = (numpy.arange(8)[:, None] >> numpy.arange(3)) & 1
+    return numpy.where(select.astype(bool), bbox_max[:, None, :], bbox_min[:, None, :])
+
+
+def transform_aabb_corners(bbox_min, bbox_max, matrices):
+    """
+    Transform all eight corners of each box and return the boxes enclosing them.
+    Unlike :py:func:`transform_aabbs` this also handles projective matrices.
+
+    :param bbox_min: ``(N, 3)`` array of box minimums
+    :param bbox_max: ``(N, 3)`` array of box maximums
+    :param matrices: ``(N, 4, 4)`` array of matrices in the pyrr row vector convention
+    :return: (bbox_min, bbox_max) tuple of ``(N, 3)`` arrays
+    """
+    corners = aabb_corners(bbox_min, bbox_max)
+    matrices = numpy.asarray(matrices, dtype='f8').reshape(-1, 4, 4)
+
+    points = corners @ matrices[:, :3, :] + matrices[:, 3:4, :]
+    points = points[..., :3] / points[..., 3:]
+    return points.min(axis=1), points.max(axis=1)
+
+
+def aabbs_in_frustum(planes, centers, extents) -> numpy.ndarray:
+    """
+    Test boxes against frustum planes. Boxes intersecting a plane are visible.
+
+    :param planes: ``(6, 4)`` frustum planes
+    :param centers: ``(N, 3)`` box centers
+    :param extents: ``(N, 3)`` box half sizes
+    :return: Boolean ``(N,)`` array. True for visible boxes.
+    """
+    distances = centers @ planes[:, :3].T + planes[:, 3]
+    radii = extents @ numpy.abs(planes[:, :3]).T
+    return numpy.all(distances + radii >= 0.0, axis=1)
+
+
+class FrustumCuller:
+    """
+    Culls the mesh nodes of a :py:class:`SceneGraph`.
+
+    The bounding box of every mesh is transformed by the world matrix of
+    its node and tested against the camera frustum in one numpy pass.
+    Meshes without a bounding box and skinned meshes are always visible.
+    After :py:meth:`build_bvh` the boxes are culled by traversing a :py:class:`BVH` instead.
+    Frames where nodes moved use the flat test and the BVH is refitted once they stop moving.
+    """
+    def __init__(self, graph):
+        """
+        :param graph: The :py:class:`SceneGraph` to cull
+        """
+        self.graph = graph
+        self.nodes = [node for node in graph.nodes if node.mesh]
+        self.indices = numpy.array([node.index for node in self.nodes], dtype='i4')
+        # Position of each node in the arrays
+        self.slots = {id(node): slot for slot, node in enumerate(self.nodes)}
+
+        count = len(self.nodes)
+        self.bbox_min = numpy.zeros((count, 3), dtype='f4')
+        self.bbox_max = numpy.zeros((count, 3), dtype='f4')
+        self.always_visible = numpy.zeros(count, dtype=bool)
+
+        for slot, node in enumerate(self.nodes):
+            mesh = node.mesh
+            if mesh.bbox_min is None or mesh.bbox_max is None or mesh.program_features & SKINNED:
+                self.always_visible[slot] = True
+                continue
+
+            self.bbox_min[slot] = mesh.bbox_min
+            self.bbox_max[slot] = mesh.bbox_max
+
+        # Slots of the meshes with a bounding box
+        self.bounded = numpy.nonzero(~self.always_visible)[0]
+        self.visible = numpy.ones(count, dtype=bool)
+        self.bvh = None
+        # Did world matrices change since the last cull?
+        self.moved = False
+        # Are the BVH bounds out of date?
+        self.stale = False
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def cull(self, projection_matrix, camera_matrix) -> numpy.ndarray:
+        """
+        Update :py:attr:`visible` for the current camera
+
+        :param projection_matrix: The projection matrix (numpy array)
+        :param camera_matrix: The camera matrix (numpy array)
+        :return: Boolean array with the visibility of each node in :py:attr:`nodes`
+        """
+        if not len(self.nodes):
+            return self.visible
+
+        planes = frustum_planes(numpy.asarray(camera_matrix, dtype='f8') @ numpy.asarray(projection_matrix, dtype='f8'))
+        if self.bvh is not None and not self.moved:
+            self.refit()
+            self.visible = self.always_visible.copy()
+            self.visible[self.bounded] = self.bvh.frustum(planes)
+            return self.visible
+
+        centers, extents = transform_aabbs(self.bbox_min, self.bbox_max, self.graph.world[self.indices])
+        self.visible = aabbs_in_frustum(planes, centers, extents) | self.always_visible
+        self.stale |= self.moved
+        self.moved = False
+        return self.visible
+
+    def world_bounds(self):
+        """
+        The bounding boxes of meshes in :py:attr:`bounded` transformed by their world matrix
+
+        :return: (bbox_min, bbox_max) tuple of ``(N, 3)`` arrays
+        """
+        slots = self.bounded
+        centers, extents = transform_aabbs(self.bbox_min[slots], self.bbox_max[slots],
+                                           self.graph.world[self.indices[slots]])
+        return centers - extents, centers + extents
+
+    def build_bvh(self, **kwargs) -> BVH:
+        """
+        Build a :py:class:`BVH` over the world space boxes of the meshes in :py:attr:`bounded`
+
+        :param kwargs: Arguments passed to :py:class:`BVH`
+        :return: The new BVH
+        """
+        self.bvh = BVH(*self.world_bounds(), **kwargs)
+        self.moved = self.stale = False
+        return self.bvh
+
+    def refit(self):
+        """Update the BVH if world matrices changed since it was last fitted"""
+        if self.bvh is not None and (self.moved or self.stale):
+            self.bvh.refit(*self.world_bounds())
+            self.stale = False
+
+    def slots_of(self, nodes) -> numpy.ndarray:
+        """
+        Positions of nodes in :py:attr:`visible`
+
+        :param nodes: List of nodes with a mesh
+        :return: Integer array
+        """
+        return numpy.array([self.slots[id(node)] for node in nodes], dtype='i4')
@@ -0,0 +1,207 @@
+"""
+Scenes compiled into lists of prebound draw packets
+"""
+import numpy
+
+from .programs import MeshProgram, RenderState
+
+# Placeholders identifying camera dependent uniforms while recording
+_PROJECTION = b'P' * 64
+_CAMERA = b'C' * 64
+_VIEW = b'V' * 64
+_MISSING = object()
+
+
+class DrawPacket:
+    """
+    Everything needed to draw a mesh node without looking anything up.
+    Only the state that changed since the previous packet in the list is stored.
+    """
+    __slots__ = ['node', 'mesh', 'slot', 'vertex_array', 'mode', 'vertices', 'first', 'instances',
+                 'camera', 'values', 'writes', 'textures', 'view_uniform', 'view', 'fallback']
+
+    def __init__(self, node, slot):
+        self.node = node
+        self.mesh = node.mesh
+        # Position of the node in the render queue
+        self.slot = slot
+        self.vertex_array = None
+        self.mode = None
+        self.vertices = -1
+        self.first = 0
+        self.instances = 1
+        # (uniform, 0) for the projection matrix and (uniform, 1) for the camera matrix
+        self.camera = []
+        # (uniform, value) and (uniform, bytes) pairs
+        self.values = []
+        self.writes = []
+        # (texture, location) pairs
+        self.textures = []
+        self.view_uniform = None
+        self.view = None
+        # Drawn with MeshProgram.submit() when the mesh program could not be recorded
+        self.fallback = False
+
+
+class _RecordingState(RenderState):
+    """Records what a mesh program does in submit() without touching OpenGL"""
+    def reset(self):
+        super().reset()
+        self.recorded = []
+        self.draw = None
+
+    def use_texture(self, texture, location=0):
+        self.recorded.append(('texture', texture, location))
+
+    def write(self, program, name, data):
+        self.recorded.append(('write', program[name], data))
+
+    def set_value(self, program, name, value):
+        self.recorded.append(('value', program[name], value))
+
+    def render(self, vao, program, mode=None, vertices=-1, first=0, instances=1):
+        self.program = program
+        self.draw = (vao, mode, vertices, first, instances)
+
+
+class DrawList:
+    """
+    A prepared scene compiled into a flat list of :py:class:`DrawPacket`.
+
+    Each packet holds the ``moderngl.VertexArray`` for its program, its
+    uniform values as prepared Python objects and its textures. Packets are
+    ordered by the state part of the render queue keys. Uniforms and
+    textures that are the same as in the previous packet are left out.
+    Replaying the list only writes the projection and camera matrices when
+    the program changes and the view matrix of each visible packet.
+
+    Meshes are recorded by running :py:meth:`MeshProgram.submit` with a
+    recording state. Mesh programs that do not override it, VAOs with
+    dynamic buffers and meshes with simplified levels are drawn with
+    ``submit()`` during replay instead.
+    """
+    def __init__(self, queue):
+        """
+        :param queue: The :py:class:`RenderQueue` of the scene to compile
+        """
+        self.queue = queue
+        self.state = RenderState()
+        self.packets = []
+        # Number of packets drawn by the last replay
+        self.draw_calls = 0
+
+        recorder = _RecordingState()
+        last_values, last_textures, last_program = {}, {}, None
+        for slot in numpy.argsort(queue.keys, kind='stable').tolist():
+            node = queue.nodes[slot]
+            packet = DrawPacket(node, slot)
+            self.packets.append(packet)
+
+            if not self._record(packet, recorder):
+                packet.fallback = True
+                last_values, last_textures, last_program = {}, {}, None
+                continue
+
+            if recorder.program is not last_program:
+                last_program = recorder.program
+                last_values = {}
+
+            for kind, target, *args in recorder.recorded:
+                if kind == 'texture':
+                    texture, location = target, args[0]
+                    if last_textures.get(location) is not texture:
+                        packet.textures.append((texture, location))
+                        last_textures[location] = texture
+                elif args[0] is _PROJECTION or args[0] is _CAMERA:
+                    if not last_values.get(id(target)):
+                        packet.camera.append((target, 0 if args[0] is _PROJECTION else 1))
+                        last_values[id(target)] = True
+                elif args[0] is _VIEW:
+                    packet.view_uniform = target
+                elif last_values.get(id(target), _MISSING) != args[0]:
+                    (packet.writes if kind == 'write' else packet.values).append((target, args[0]))
+                    last_values[id(target)] = args[0]
+
+        self.refresh()
+
+    def __len__(self):
+        return len(self.packets)
+
+    def _record(self, packet, recorder) -> bool:
+        """Record the state and draw call of a packet. Returns False if it must be drawn with submit()"""
+        mesh_program = packet.mesh.mesh_program
+        if not mesh_program or type(mesh_program).submit is MeshProgram.submit:
+            return False
+
+        # The level is selected every frame
+        if packet.mesh.lods:
+            return False
+
+        recorder.reset()
+        mesh_program.submit(packet.mesh, recorder, projection_matrix=_PROJECTION,
+                            view_matrix=_VIEW, camera_matrix=_CAMERA)
+        if not recorder.draw:
+            return False
+
+        vao, mode, vertices, first, instances = recorder.draw
+        if vao._dynamic_buffers:
+            return False
+
+        packet.vertex_array = vao.instance(recorder.program)
+        packet.mode = vao.mode if mode is None else mode
+        packet.vertices = vertices
+        packet.first = first + vao.first_index
+        packet.instances = instances
+        return True
+
+    def refresh(self):
+        """Update the view matrix of each packet. Call after node matrices changed."""
+        for packet in self.packets:
+            packet.view = packet.node.matrix_global_bytes
+
+    def replay(self, projection_matrix, camera_matrix, time=0, visible=None):
+        """
+        Draw the packets
+
+        :param projection_matrix: projection matrix (numpy array)
+        :param camera_matrix: camera_matrix (numpy array)
+        :param time: The current time
+        :param visible: Boolean array with the visibility of each render queue item
+        """
+        matrices = (projection_matrix.astype('f4').tobytes(), camera_matrix.astype('f4').tobytes())
+        visible = [True] * len(self.queue) if visible is None else visible.tolist()
+        levels = self.queue.select_lods(projection_matrix, camera_matrix).tolist()
+        draw_calls = 0
+
+        for packet in self.packets:
+            if packet.fallback:
+                if visible[packet.slot]:
+                    mesh = packet.mesh
+                    if levels[packet.slot]:
+                        mesh = mesh.lods[levels[packet.slot] - 1][1]
+                    # Uniforms written by other packets are not tracked by the state
+                    self.state.reset()
+                    mesh.mesh_program.submit(
+                        mesh, self.state, projection_matrix=matrices[0],
+                        view_matrix=packet.view, camera_matrix=matrices[1], time=time)
+                    draw_calls += 1
+                continue
+
+            # State changes are applied for hidden packets as well since the next packets rely on them
+            for uniform, matrix in packet.camera:
+                uniform.write(matrices[matrix])
+            for uniform, value in packet.values:
+                uniform.value = value
+            for uniform, data in packet.writes:
+                uniform.write(data)
+            for texture, location in packet.textures:
+                texture.use(location=location)
+
+            if visible[packet.slot]:
+                if packet.view_uniform:
+                    packet.view_uniform.write(packet.view)
+                packet.vertex_array.render(packet.mode, vertices=packet.vertices,
+                                           first=packet.first, instances=packet.instances)
+                draw_calls += 1
+
+        self.draw_calls = draw_calls
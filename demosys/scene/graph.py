@@ -0,0 +1,144 @@
+"""
+Flattened scene graph with vectorised transform propagation
+"""
+import numpy
+
+
+class SceneGraph:
+    """
+    The nodes of a scene flattened into arrays.
+
+    Nodes are stored in depth first order so parents come before their children
+    and the subtree of a node is a contiguous range. Local and world matrices are
+    ``(N, 4, 4)`` float32 arrays and world matrices are calculated level by level
+    with one batched matrix multiplication per level of the hierarchy.
+    Nodes in the graph read and write their matrices through these arrays.
+
+    Changing the matrix of a node marks its subtree dirty and
+    :py:meth:`update_dirty` only recalculates the dirty world matrices.
+    """
+    def __init__(self, root_nodes):
+        """
+        :param root_nodes: The root nodes of the scene
+        """
+        self.nodes = []
+        parents, depths = [], []
+
+        stack = [(node, -1, 0) for node in reversed(root_nodes)]
+        while stack:
+            node, parent, depth = stack.pop()
+            self.nodes.append(node)
+            parents.append(parent)
+            depths.append(depth)
+
+            index = len(self.nodes) - 1
+            stack.extend((child, index, depth + 1) for child in reversed(node.children))
+
+        count = len(self.nodes)
+        self.parents = numpy.array(parents, dtype='i4')
+        self.depths = numpy.array(depths, dtype='i4')
+        # Index of the first node after the subtree of each node
+        self.subtree_end = _subtree_end(self.depths)
+        # Node indices for each level of the hierarchy
+        self.levels = [numpy.nonzero(self.depths == depth)[0] for depth in range(self.depths.max(initial=-1) + 1)]
+
+        self.local = numpy.tile(numpy.identity(4, dtype='f4'), (count, 1, 1))
+        self.world = numpy.tile(numpy.identity(4, dtype='f4'), (count, 1, 1))
+        # Nodes with a matrix of their own. Other nodes inherit the parent matrix.
+        self.has_matrix = numpy.zeros(count, dtype=bool)
+        self.view_matrix = numpy.identity(4, dtype='f4')
+        self._world_bytes = [None] * count
+        # Nodes with a dirty subtree
+        self._dirty = set()
+
+        for index, node in enumerate(self.nodes):
+            matrix = node.matrix
+            if matrix is not None:
+                self.local[index] = matrix
+                self.has_matrix[index] = True
+
+            node.bind(self, index)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def update(self, view_matrix):
+        """
+        Calculate the world matrix of every node
+
+        :param view_matrix: The matrix applied to the root nodes
+        """
+        self.view_matrix = numpy.asarray(view_matrix, dtype='f4')
+
+        for depth, indices in enumerate(self.levels):
+            self._update_level(depth, indices)
+
+        self._world_bytes = [None] * len(self.nodes)
+        self._dirty.clear()
+
+    def mark_dirty(self, index: int):
+        """
+        Mark the subtree of a node as changed
+
+        :param index: The node index
+        """
+        self._dirty.add(index)
+
+    @property
+    def dirty(self) -> bool:
+        """(bool) Are there world matrices to recalculate?"""
+        return bool(self._dirty)
+
+    def update_dirty(self) -> int:
+        """
+        Recalculate the world matrices of dirty subtrees
+
+        :return: The number of updated nodes
+        """
+        if not self._dirty:
+            return 0
+
+        indices = numpy.unique(numpy.concatenate([
+            numpy.arange(index, self.subtree_end[index]) for index in self._dirty
+        ]))
+        self._dirty.clear()
+
+        # Parents come before children so each level reads updated parent matrices
+        depths = self.depths[indices]
+        for depth in numpy.unique(depths).tolist():
+            self._update_level(depth, indices[depths == depth])
+
+        for index in indices.tolist():
+            self._world_bytes[index] = None
+
+        return len(indices)
+
+    def world_bytes(self, index: int) -> bytes:
+        """
+        The world matrix of a node as bytes. Cached until the matrix changes.
+
+        :param index: The node index
+        """
+        data = self._world_bytes[index]
+        if data is None:
+            data = self._world_bytes[index] = self.world[index].tobytes()
+
+        return data
+
+    def _update_level(self, depth, indices):
+        if depth == 0:
+            self.world[indices] = self.local[indices] @ self.view_matrix
+        else:
+            self.world[indices] = self.local[indices] @ self.world[self.parents[indices]]
+
+
+def _subtree_end(depths):
+    """The end of each subtree is the next node at the same or a lower depth"""
+    end = numpy.full(len(depths), len(depths), dtype='i4')
+    stack = []
+    for index, depth in enumerate(depths.tolist()):
+        while stack and depths[stack[-1]] >= depth:
+            end[stack.pop()] = index
+        stack.append(index)
+
+    return end
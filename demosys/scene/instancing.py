@@ -0,0 +1,140 @@
+"""
+Automatic instancing of meshes referenced by multiple nodes
+"""
+from collections import OrderedDict
+from typing import List
+
+import numpy
+
+from demosys import context
+
+from .programs import VariantProgram
+
+INSTANCE_ATTRIBUTE = 'in_instance_matrix'
+
+
+class InstanceGroup:
+    """
+    Nodes sharing a mesh drawn with a single instanced draw call.
+
+    The global matrix of each node is stored in a per instance buffer
+    attached to the mesh's VAO as ``in_instance_matrix``. The mesh gets
+    the ``INSTANCE_MATRIX`` attribute so the mesh program picks the
+    instanced variant.
+    """
+    def __init__(self, mesh, nodes):
+        """
+        :param mesh: The shared mesh
+        :param nodes: List of nodes referencing the mesh
+        """
+        self.ctx = context.ctx()
+        self.mesh = mesh
+        self.nodes = nodes
+        self.matrices = numpy.zeros((len(nodes), 4, 4), dtype='f4')
+        # Visibility of each node set by culling
+        self.visible = None
+        self.instance_count = len(nodes)
+
+        self.buffer = self.ctx.buffer(reserve=self.matrices.nbytes, dynamic=True)
+        mesh.vao.buffer(self.buffer, '16f', [INSTANCE_ATTRIBUTE], per_instance=True)
+        mesh.add_attribute('INSTANCE_MATRIX', INSTANCE_ATTRIBUTE, 16)
+        mesh.mesh_program.apply(mesh)
+
+        for node in nodes:
+            node.instanced = True
+
+        self.update()
+
+    @property
+    def instances(self) -> int:
+        """Number of instances drawn"""
+        return len(self.nodes)
+
+    def update(self):
+        """Upload the current global matrix of each visible node"""
+        graph = self.nodes[0].graph
+        if graph is not None:
+            self.matrices[:] = graph.world[[node.index for node in self.nodes]]
+        else:
+            for i, node in enumerate(self.nodes):
+                self.matrices[i] = node.matrix_global
+
+        matrices = self.matrices if self.visible is None else self.matrices[self.visible]
+        self.instance_count = len(matrices)
+        self.buffer.write(matrices.tobytes())
+
+    def set_visible(self, visible):
+        """
+        Only draw the visible nodes. The matrices are uploaded again when the visibility changes.
+
+        :param visible: Boolean array with the visibility of each node or ``None`` to draw all
+        """
+        if visible is None and self.visible is None:
+            return
+
+        if visible is not None and self.visible is not None and numpy.array_equal(visible, self.visible):
+            return
+
+        self.visible = None if visible is None else numpy.array(visible, dtype=bool)
+        self.update()
+
+    def draw(self, projection_matrix=None, camera_matrix=None, time=0):
+        """
+        Draw all instances
+
+        :param projection_matrix: projection matrix (bytes)
+        :param camera_matrix: camera_matrix (bytes)
+        :param time: The current time
+        """
+        if not self.instance_count:
+            return
+
+        program = self.mesh.mesh_program.use(
+            self.mesh.program_features,
+            self.mesh.material,
+            projection_matrix=projection_matrix,
+            camera_matrix=camera_matrix,
+            quantization=self.mesh.quantization,
+        )
+        self.mesh.vao.render(program, instances=self.instance_count)
+
+    def release(self):
+        """Detach and release the instance buffer. The nodes draw the mesh separately again."""
+        self.mesh.vao.remove_buffer(self.buffer)
+        self.buffer.release()
+        del self.mesh.attributes['INSTANCE_MATRIX']
+        self.mesh.mesh_program.apply(self.mesh)
+
+        for node in self.nodes:
+            node.instanced = False
+
+
+def instance_scene(scene, min_instances=2) -> List[InstanceGroup]:
+    """
+    Group nodes referencing the same mesh and create an :py:class:`InstanceGroup`
+    for meshes used by at least ``min_instances`` nodes.
+    Only meshes drawn by a :py:class:`VariantProgram` and without levels of detail are instanced.
+
+    :param scene: The scene
+    :param min_instances: Minimum number of nodes sharing a mesh
+    :return: List of InstanceGroup instances
+    """
+    nodes_by_mesh = OrderedDict()
+    for node in scene.nodes_with_mesh():
+        mesh = node.mesh
+        if not isinstance(mesh.mesh_program, VariantProgram) or node.matrix_global is None or node.batched:
+            continue
+
+        if 'INSTANCE_MATRIX' in mesh.attributes:
+            continue
+
+        # Levels of detail are selected per node
+        if mesh.lods:
+            continue
+
+        nodes_by_mesh.setdefault(id(mesh), []).append(node)
+
+    return [
+        InstanceGroup(nodes[0].mesh, nodes)
+        for nodes in nodes_by_mesh.values() if len(nodes) >= min_instances
+    ]
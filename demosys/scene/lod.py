@@ -0,0 +1,178 @@
+"""
+Level of detail meshes generated by simplifying the geometry of a VAO
+"""
+import hashlib
+import json
+import os
+
+import numpy
+
+import moderngl
+from demosys.opengl.vao import VAO
+
+from .optimize import index_vertices, optimize_vertex_fetch, tipsify
+from .simplify import simplify
+
+# Bumped when the cache layout or the simplifier output changes
+CACHE_VERSION = 1
+
+
+def read_geometry(vao):
+    """
+    Read back the vertices and indices of a VAO.
+    Non-indexed geometry is indexed by merging identical vertices.
+
+    :param vao: The VAO to read
+    :return: (vertices, buffer_format, indices) tuple
+    """
+    vertices, buffer_format = vao.read_vertices()
+    indices = vao.read_indices()
+    if indices is None:
+        vertices, indices = index_vertices(vertices)
+
+    return vertices, buffer_format, indices.astype('u4')
+
+
+def geometry_key(vertices, buffer_format, indices) -> str:
+    """Hash identifying geometry in the cache"""
+    digest = hashlib.sha1(buffer_format.encode())
+    digest.update(vertices.tobytes())
+    digest.update(indices.tobytes())
+    return digest.hexdigest()
+
+
+def simplify_vertices(vertices, indices, position, target_triangles, max_error=numpy.inf, cache_size=32):
+    """
+    Simplify an indexed triangle list of structured vertices and optimize
+    the result for the vertex cache. Collapsed vertices keep the other
+    attributes of the vertex they collapse into. Vertices split by uv or
+    normal seams are treated as open borders and keep the seams in place.
+
+    :param vertices: numpy structured array of vertices
+    :param indices: Triangle list indices
+    :param position: Name of the position field
+    :param target_triangles: The triangle count to reduce to
+    :param max_error: Do not collapse edges with a higher quadric error
+    :param cache_size: Vertex cache size to optimize for
+    :return: (vertices, indices) tuple with the unused vertices removed
+    """
+    positions = vertices[position].reshape(len(vertices), -1)[:, :3]
+    positions, indices = simplify(positions, indices, target_triangles, max_error=max_error)
+
+    vertices = vertices.copy()
+    vertices[position][:, :3] = positions
+    if not len(indices):
+        return vertices[:0], indices
+
+    indices = tipsify(indices, len(vertices), cache_size=cache_size)
+    order, indices = optimize_vertex_fetch(indices, len(vertices))
+    return vertices[order[:int(indices.max()) + 1]], indices
+
+
+def lod_chain(vertices, indices, position, levels=3, ratio=0.5, cache_size=32):
+    """
+    Simplify geometry into a chain of levels. Each level keeps ``ratio``
+    of the triangles of the previous level and is simplified from it.
+    The chain stops early when a level can not be reduced further.
+
+    :param vertices: numpy structured array of vertices
+    :param indices: Triangle list indices
+    :param position: Name of the position field
+    :param levels: Number of levels to generate
+    :param ratio: Fraction of triangles kept by each level
+    :param cache_size: Vertex cache size to optimize for
+    :return: List of (vertices, indices) tuples from the most to the least detailed
+    """
+    chain = []
+    triangles = len(indices) // 3
+    for _ in range(levels):
+        target = int(triangles * ratio)
+        if target < 1:
+            break
+
+        vertices, indices = simplify_vertices(vertices, indices, position, target, cache_size=cache_size)
+        # Collapses were rejected and the level would look like the previous one
+        if len(indices) // 3 > triangles * (1.0 + ratio) * 0.5 or not len(indices):
+            break
+
+        chain.append((vertices, indices))
+        triangles = len(indices) // 3
+
+    return chain
+
+
+def create_vao(name, vertices, buffer_format, indices, mode=moderngl.TRIANGLES):
+    """
+    Create an indexed VAO with a single interleaved buffer
+
+    :param name: Name of the VAO
+    :param vertices: numpy structured array of vertices
+    :param buffer_format: The buffer format of the structured array
+    :param indices: Triangle list indices
+    :param mode: Draw mode
+    :return: The new VAO
+    """
+    vao = VAO(name, mode=mode)
+    vao.buffer(vertices, buffer_format, list(vertices.dtype.names))
+    vao.index_buffer(indices, narrow=True)
+    return vao
+
+
+def read_cache(path, levels, ratio) -> dict:
+    """
+    Read level chains cached by :py:func:`write_cache`.
+    Missing files and caches created with other settings are ignored.
+
+    :param path: Path to the ``.npz`` cache file
+    :param levels: Number of levels the chains were generated with
+    :param ratio: Triangle ratio the chains were generated with
+    :return: dict of geometry key to chain
+    """
+    if not os.path.exists(path):
+        return {}
+
+    try:
+        with numpy.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            if meta.get('version') != CACHE_VERSION or meta.get('levels') != levels or meta.get('ratio') != ratio:
+                return {}
+
+            return {
+                key: [
+                    (data['{}_{}_vertices'.format(i, level)], data['{}_{}_indices'.format(i, level)])
+                    for level in range(count)
+                ]
+                for i, (key, count) in enumerate(zip(meta['keys'], meta['counts']))
+            }
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def write_cache(path, chains, levels, ratio):
+    """
+    Write level chains to a ``.npz`` file
+
+    :param path: Path to the cache file
+    :param chains: dict of geometry key to chain
+    :param levels: Number of levels the chains were generated with
+    :param ratio: Triangle ratio the chains were generated with
+    """
+    arrays = {}
+    for i, chain in enumerate(chains.values()):
+        for level, (vertices, indices) in enumerate(chain):
+            arrays['{}_{}_vertices'.format(i, level)] = vertices
+            arrays['{}_{}_indices'.format(i, level)] = indices
+
+    arrays['meta'] = numpy.array(json.dumps({
+        'version': CACHE_VERSION,
+        'levels': levels,
+        'ratio': ratio,
+        'keys': list(chains.keys()),
+        'counts': [len(chain) for chain in chains.values()],
+    }))
+
+    # Write next to the cache so an interrupted write never leaves a broken file
+    temp = path + '.tmp'
+    with open(temp, 'wb') as fd:
+        numpy.savez(fd, **arrays)
+    os.replace(temp, path)
@@ -1,7 +1,6 @@
 """
 Mesh class containing geometry information
 """
-from pyrr import matrix44
 import numpy
 
 
@@ -26,6 +25,12 @@ class Mesh:
         self.bbox_min = bbox_min
         self.bbox_max = bbox_max
         self.mesh_program = None
+        # Feature bitmask assigned by mesh programs supporting variants
+        self.program_features = 0
+        # Encoded attributes by type: {"NORMAL": ("oct", decode), ...}
+        self.quantization = {}
+        # Simplified versions of the mesh as (screen_size, mesh) tuples from the most to the least detailed
+        self.lods = []
 
     def draw(self, projection_matrix=None, view_matrix=None, camera_matrix=None, time=0):
         """
@@ -62,32 +67,78 @@ class Mesh:
         """
         self.attributes[attr_type] = {"name": name, "components": components}
 
-    def calc_global_bbox(self, view_matrix, bbox_min, bbox_max):
-        # Copy and extend to vec4
-        bb1 = numpy.append(self.bbox_min[:], 1.0)
-        bb2 = numpy.append(self.bbox_max[:], 1.0)
+    def calc_bbox(self):
+        """
+        Calculate :py:attr:`bbox_min` and :py:attr:`bbox_max` from the vertex positions
+        for loaders not providing bounding boxes
+        """
+        position = self.attributes.get("POSITION")
+        if not self.vao or not position:
+            return
+
+        vertices, _ = self.vao.read_vertices()
+        positions = vertices[position["name"]].reshape(len(vertices), -1)[:, :3].astype('f8')
+        if not len(positions):
+            return
 
-        # Transform the bbox values
-        bmin = matrix44.apply_to_vector(view_matrix, bb1),
-        bmax = matrix44.apply_to_vector(view_matrix, bb2),
-        bmin = numpy.asarray(bmin)[0]
-        bmax = numpy.asarray(bmax)[0]
+        encoding = self.quantization.get("POSITION")
+        if encoding and encoding[1]:
+            positions = positions * encoding[1]['scale'] + encoding[1]['offset']
 
-        # If a rotation happened there is an axis change and we have to ensure max-min is positive
-        for i in range(3):
-            if bmax[i] - bmin[i] < 0:
-                bmin[i], bmax[i] = bmax[i], bmin[i]
+        self.bbox_min = positions.min(axis=0).astype('f4')
+        self.bbox_max = positions.max(axis=0).astype('f4')
 
-        if bbox_min is None or bbox_max is None:
-            return bmin[0:3], bmax[0:3]
+    def add_lod(self, vao, screen_size) -> 'Mesh':
+        """
+        Add a simplified version of the mesh drawn when the bounding sphere
+        of the mesh covers less than ``screen_size`` of the viewport height.
+        The level shares the material, attributes and mesh program of this mesh.
 
-        for i in range(3):
-            bbox_min[i] = min(bbox_min[i], bmin[i])
+        :param vao: The VAO of the simplified geometry
+        :param screen_size: Fraction of the viewport height below which the level is drawn
+        :return: The mesh of the new level
+        """
+        lod = Mesh(
+            "{}_lod{}".format(self.name, len(self.lods) + 1),
+            vao=vao,
+            material=self.material,
+            attributes={attr_type: dict(info) for attr_type, info in self.attributes.items()},
+            bbox_min=self.bbox_min,
+            bbox_max=self.bbox_max,
+        )
+        lod.mesh_program = self.mesh_program
+        lod.program_features = self.program_features
+        lod.quantization = dict(self.quantization)
+
+        self.lods.append((screen_size, lod))
+        self.lods.sort(key=lambda level: -level[0])
+        return lod
+
+    def select_lod(self, screen_size) -> 'Mesh':
+        """
+        The level to draw for a projected size
 
-        for i in range(3):
-            bbox_max[i] = max(bbox_max[i], bmax[i])
+        :param screen_size: Fraction of the viewport height covered by the bounding sphere
+        :return: This mesh or one of the meshes in :py:attr:`lods`
+        """
+        mesh = self
+        for size, lod in self.lods:
+            if screen_size < size:
+                mesh = lod
+        return mesh
+
+    def bounding_sphere(self):
+        """
+        The sphere enclosing the bounding box
+
+        :return: (center, radius) tuple or ``None`` if the mesh has no bounding box
+        """
+        if self.bbox_min is None or self.bbox_max is None:
+            return None
 
-        return bbox_min, bbox_max
+        bbox_min = numpy.asarray(self.bbox_min, dtype='f8')
+        bbox_max = numpy.asarray(self.bbox_max, dtype='f8')
+        return (bbox_min + bbox_max) * 0.5, float(numpy.linalg.norm(bbox_max - bbox_min)) * 0.5
 
     def has_normals(self):
         return "NORMAL" in self.attributes
@@ -1,6 +1,7 @@
 """
 Wrapper for a loaded mesh / vao with properties
 """
+import numpy
 from pyrr import matrix44
 
 
@@ -8,10 +9,72 @@ class Node:
     def __init__(self, camera=None, mesh=None, matrix=None):
         self.camera = camera
         self.mesh = mesh
-        self.matrix = matrix
-        self.matrix_global = None
-        self.matrix_global_bytes = None
         self.children = []
+        # The mesh is drawn by a scene batch instead of the node
+        self.batched = False
+        # The mesh is drawn by an instance group instead of the node
+        self.instanced = False
+
+        # The SceneGraph storing the matrices once the scene is prepared
+        self.graph = None
+        self.index = None
+
+        self._matrix = matrix
+        self._matrix_global = None
+        self._matrix_global_bytes = None
+
+    @property
+    def matrix(self):
+        """
+        The local matrix or ``None``. A view into the scene graph once the scene is prepared.
+        Assigning a matrix marks the node and its children dirty. Call :py:meth:`mark_dirty`
+        after modifying the matrix in place.
+        """
+        if self.graph is None:
+            return self._matrix
+
+        return self.graph.local[self.index] if self.graph.has_matrix[self.index] else None
+
+    @matrix.setter
+    def matrix(self, value):
+        if self.graph is None:
+            self._matrix = value
+            return
+
+        self.graph.has_matrix[self.index] = value is not None
+        self.graph.local[self.index] = numpy.identity(4) if value is None else value
+        self.graph.mark_dirty(self.index)
+
+    def mark_dirty(self):
+        """Recalculate the world matrix of the node and its children before the next draw"""
+        if self.graph is not None:
+            self.graph.mark_dirty(self.index)
+
+    @property
+    def matrix_global(self):
+        """The world matrix calculated by the scene"""
+        if self.graph is None:
+            return self._matrix_global
+
+        return self.graph.world[self.index]
+
+    @property
+    def matrix_global_bytes(self) -> bytes:
+        """The world matrix as bytes"""
+        if self.graph is None:
+            return self._matrix_global_bytes
+
+        return self.graph.world_bytes(self.index)
+
+    def bind(self, graph, index):
+        """
+        Store the matrices of the node in a scene graph
+
+        :param graph: The :py:class:`SceneGraph`
+        :param index: The index of the node in the graph
+        """
+        self.graph = graph
+        self.index = index
 
     def add_child(self, child):
         self.children.append(child)
@@ -24,7 +87,7 @@ class Node:
         :param camera_matrix: camera_matrix (bytes)
         :param time: The current time
         """
-        if self.mesh:
+        if self.mesh and not self.batched and not self.instanced:
             self.mesh.draw(
                 projection_matrix=projection_matrix,
                 view_matrix=self.matrix_global_bytes,
@@ -53,29 +116,17 @@ class Node:
         for child in self.children:
             child.draw_bbox(projection_matrix, camera_matrix, shader, vao)
 
-    def calc_global_bbox(self, view_matrix, bbox_min, bbox_max):
-        """Recursive calculation of scene bbox"""
-        if self.matrix is not None:
-            view_matrix = matrix44.multiply(self.matrix, view_matrix)
-
-        if self.mesh:
-            bbox_min, bbox_max = self.mesh.calc_global_bbox(view_matrix, bbox_min, bbox_max)
-
-        for child in self.children:
-            bbox_min, bbox_max = child.calc_global_bbox(view_matrix, bbox_min, bbox_max)
-
-        return bbox_min, bbox_max
-
     def calc_view_mat(self, view_matrix):
+        """Recursive calculation of world matrices for nodes not in a scene graph"""
         if self.matrix is not None:
-            self.matrix_global = matrix44.multiply(self.matrix, view_matrix).astype('f4')
-            self.matrix_global_bytes = self.matrix_global.tobytes()
+            self._matrix_global = matrix44.multiply(self.matrix, view_matrix).astype('f4')
+            self._matrix_global_bytes = self._matrix_global.tobytes()
 
             for child in self.children:
-                child.calc_view_mat(self.matrix_global)
+                child.calc_view_mat(self._matrix_global)
         else:
-            self.matrix_global = view_matrix
-            self.matrix_global_bytes = view_matrix.tobytes()
+            self._matrix_global = view_matrix
+            self._matrix_global_bytes = view_matrix.tobytes()
 
             for child in self.children:
                 child.calc_view_mat(view_matrix)
@@ -0,0 +1,126 @@
+"""
+Occlusion culling of scene meshes with queries on their bounding boxes
+"""
+import numpy
+
+import moderngl
+from demosys import context
+
+from .culling import transform_aabbs
+
+# Fraction of the largest box side added around the boxes drawn by the queries
+BOX_PADDING = 0.01
+
+
+class OcclusionCuller:
+    """
+    Hides meshes whose bounding box was completely hidden in the previous frame.
+
+    After a frame is drawn the bounding box of every mesh inside the frustum
+    is rendered with color and depth writes disabled, each inside a
+    ``moderngl.Query`` counting the samples passing the depth test.
+    The next frame reads the results and hides boxes without samples.
+    Reading results a frame later keeps the pipeline from stalling at the
+    cost of meshes appearing one frame late when they are uncovered.
+
+    Meshes always visible to the :py:class:`FrustumCuller` and meshes whose
+    box contains the camera are never hidden. The scene must be drawn with
+    ``moderngl.DEPTH_TEST`` enabled for the queries to find anything occluded.
+    """
+    def __init__(self, culler, vao, program):
+        """
+        :param culler: The :py:class:`FrustumCuller` of the scene
+        :param vao: VAO with a unit box drawn as triangles (``geometry.bbox``)
+        :param program: Program drawing the box scaled to the ``bb_min`` and ``bb_max`` uniforms
+        """
+        self.culler = culler
+        self.vao = vao
+        self.program = program
+        self.ctx = context.ctx()
+
+        count = len(culler)
+        self.queries = [None] * count
+        # Slots with a query issued in the last frame
+        self.tested = numpy.zeros(count, dtype=bool)
+        self.occluded = numpy.zeros(count, dtype=bool)
+        # Number of meshes inside the frustum hidden in the last frame
+        self.rejected = 0
+
+        # Boxes are grown slightly so faces matching the mesh surface pass the depth test
+        padding = numpy.max(culler.bbox_max - culler.bbox_min, axis=1, keepdims=True) * BOX_PADDING
+        self.bounds = [
+            ((culler.bbox_min[slot] - padding[slot]).tobytes(), (culler.bbox_max[slot] + padding[slot]).tobytes())
+            for slot in range(count)
+        ]
+
+    def __len__(self):
+        return len(self.culler)
+
+    def apply(self, visible) -> numpy.ndarray:
+        """
+        Hide meshes found occluded by the queries of the last frame
+
+        :param visible: Boolean array with the frustum visibility of each culler slot
+        :return: Boolean array with the occluded meshes hidden
+        """
+        self.occluded[:] = False
+        for slot in numpy.nonzero(self.tested)[0].tolist():
+            self.occluded[slot] = self.queries[slot].samples == 0
+        self.tested[:] = False
+
+        occluded = visible & self.occluded
+        self.rejected = int(numpy.count_nonzero(occluded))
+        return visible & ~occluded
+
+    def test(self, visible, projection_matrix, camera_matrix):
+        """
+        Issue the queries for the next frame. Must be called after the scene
+        is drawn so the depth buffer contains the occluders.
+
+        :param visible: Boolean array with the frustum visibility of each culler slot
+        :param projection_matrix: projection matrix (numpy array)
+        :param camera_matrix: camera_matrix (numpy array)
+        """
+        culler = self.culler
+        slots = culler.bounded[visible[culler.bounded]]
+        if not len(slots):
+            return
+
+        # Boxes clipped by the near plane around the camera may report no samples
+        projection_matrix = numpy.asarray(projection_matrix, dtype='f8')
+        camera_matrix = numpy.asarray(camera_matrix, dtype='f8')
+        near = 0.0
+        if projection_matrix[2, 3] != 0.0:
+            near = projection_matrix[3, 2] / (projection_matrix[2, 2] - 1.0)
+        eye = numpy.linalg.inv(camera_matrix)[3, :3]
+        margin = abs(near) * numpy.sqrt(1.0 + 1.0 / projection_matrix[1, 1] ** 2 + 1.0 / projection_matrix[0, 0] ** 2)
+
+        centers, extents = transform_aabbs(culler.bbox_min[slots], culler.bbox_max[slots],
+                                           culler.graph.world[culler.indices[slots]])
+        slots = slots[numpy.any(numpy.abs(centers - eye) > extents + margin, axis=1)]
+
+        fbo = self.ctx.fbo
+        color_mask, depth_mask = fbo.color_mask, fbo.depth_mask
+        fbo.color_mask = False, False, False, False
+        fbo.depth_mask = False
+
+        program = self.program
+        program["m_proj"].write(projection_matrix.astype('f4').tobytes())
+        program["m_cam"].write(camera_matrix.astype('f4').tobytes())
+        view, bb_min, bb_max = program["m_view"], program["bb_min"], program["bb_max"]
+        nodes = culler.nodes
+
+        for slot in slots.tolist():
+            query = self.queries[slot]
+            if query is None:
+                query = self.queries[slot] = self.ctx.query(samples=True)
+
+            view.write(nodes[slot].matrix_global_bytes)
+            bb_min.write(self.bounds[slot][0])
+            bb_max.write(self.bounds[slot][1])
+            with query:
+                self.vao.render(program, mode=moderngl.TRIANGLES)
+
+        self.tested[slots] = True
+        fbo.color_mask = color_mask
+        fbo.depth_mask = depth_mask
@@ -0,0 +1,178 @@
+"""
+Load time optimisation of index and vertex order for the post transform vertex cache
+"""
+import numpy
+
+import moderngl
+
+
+def acmr(indices: numpy.ndarray, cache_size=32) -> float:
+    """
+    Average cache miss ratio (vertex shader invocations per triangle)
+    simulating a FIFO post transform cache.
+    1.0 or lower is good while 3.0 means no vertices are reused.
+
+    :param indices: Triangle list indices
+    :param cache_size: Number of entries in the simulated cache
+    :return: The average cache miss ratio
+    """
+    triangles = len(indices) // 3
+    if not triangles:
+        return 0.0
+
+    # A vertex is in the FIFO if less than cache_size misses happened since it was added
+    stamps = {}
+    misses = 0
+    for index in indices.tolist():
+        if misses - stamps.get(index, -cache_size) >= cache_size:
+            stamps[index] = misses
+            misses += 1
+
+    return misses / triangles
+
+
+def tipsify(indices: numpy.ndarray, vertex_count: int, cache_size=32) -> numpy.ndarray:
+    """
+    Reorder triangles for vertex cache locality using the Tipsify algorithm
+    (Sander, Nehab and Barczak: Fast Triangle Reordering for Vertex Locality and Reduced Overdraw).
+
+    :param indices: Triangle list indices
+    :param vertex_count: Number of vertices referenced by the indices
+    :param cache_size: Target cache size
+    :return: Reordered indices
+    """
+    indices = numpy.asarray(indices, dtype='u4')
+    triangles = indices.reshape(-1, 3)
+    if vertex_count == 0 or len(triangles) == 0:
+        return indices
+
+    # Vertex to triangle adjacency as offsets into a sorted triangle list
+    live = numpy.bincount(indices, minlength=vertex_count)
+    offsets = numpy.concatenate(([0], numpy.cumsum(live))).tolist()
+    adjacency = (numpy.argsort(indices, kind='stable') // 3).tolist()
+
+    tri_list = triangles.tolist()
+    live = live.tolist()
+    cache_time = [0] * vertex_count
+    emitted = [False] * len(tri_list)
+    dead_end = []
+    output = []
+
+    timestamp = cache_size + 1
+    cursor = 1
+    fanning = 0
+
+    while fanning >= 0:
+        candidates = []
+        for triangle in adjacency[offsets[fanning]:offsets[fanning + 1]]:
+            if emitted[triangle]:
+                continue
+
+            for vertex in tri_list[triangle]:
+                output.append(vertex)
+                dead_end.append(vertex)
+                candidates.append(vertex)
+                live[vertex] -= 1
+
+                if timestamp - cache_time[vertex] > cache_size:
+                    cache_time[vertex] = timestamp
+                    timestamp += 1
+
+            emitted[triangle] = True
+
+        # Pick the candidate still in cache after emitting its remaining triangles
+        fanning, priority = -1, -1
+        for vertex in candidates:
+            if live[vertex] <= 0:
+                continue
+
+            age = timestamp - cache_time[vertex]
+            candidate_priority = age if age + 2 * live[vertex] <= cache_size else 0
+            if candidate_priority > priority:
+                fanning, priority = vertex, candidate_priority
+
+        if fanning >= 0:
+            continue
+
+        # Dead end. Try recently used vertices before scanning for any vertex left
+        while dead_end:
+            vertex = dead_end.pop()
+            if live[vertex] > 0:
+                fanning = vertex
+                break
+        else:
+            while cursor < vertex_count:
+                if live[cursor] > 0:
+                    fanning = cursor
+                    break
+                cursor += 1
+
+    return numpy.array(output, dtype='u4')
+
+
+def optimize_vertex_fetch(indices: numpy.ndarray, vertex_count: int):
+    """
+    Order vertices by their first use in the index buffer.
+    Unreferenced vertices are moved to the end.
+
+    :param indices: Triangle list indices
+    :param vertex_count: Number of vertices
+    :return: (order, indices) tuple. ``vertices[order]`` is the new vertex order
+             and ``indices`` is remapped to it.
+    """
+    used, first_use = numpy.unique(indices, return_index=True)
+    order = used[numpy.argsort(first_use, kind='stable')]
+    order = numpy.concatenate((order, numpy.setdiff1d(numpy.arange(vertex_count), used))).astype('u4')
+
+    remap = numpy.empty(vertex_count, dtype='u4')
+    remap[order] = numpy.arange(vertex_count, dtype='u4')
+    return order, remap[indices]
+
+
+def index_vertices(vertices: numpy.ndarray):
+    """
+    Create an index buffer for a non-indexed triangle list by merging identical vertices
+
+    :param vertices: numpy structured array of vertices
+    :return: (vertices, indices) tuple with the unique vertices
+    """
+    raw = vertices.view('V{}'.format(vertices.dtype.itemsize))
+    _, first, inverse = numpy.unique(raw, return_index=True, return_inverse=True)
+    return vertices[first], inverse.astype('u4').ravel()
+
+
+def optimize_vao(vao, cache_size=32) -> dict:
+    """
+    Reorder the triangles and vertices in a VAO for the post transform vertex cache.
+    Non-indexed geometry is indexed first by merging identical vertices.
+    Only triangle lists are optimized.
+
+    :param vao: The VAO to optimize
+    :param cache_size: Target cache size
+    :return: dict with ``triangles``, ``vertices``, ``acmr_before`` and ``acmr_after``
+             or ``None`` if the VAO was not optimized
+    """
+    if vao.mode != moderngl.TRIANGLES:
+        return None
+
+    vertices, buffer_format = vao.read_vertices()
+    indices = vao.read_indices()
+
+    if indices is None:
+        acmr_before = acmr(numpy.arange(len(vertices)), cache_size=cache_size)
+        vertices, indices = index_vertices(vertices)
+    else:
+        acmr_before = acmr(indices, cache_size=cache_size)
+
+    indices = tipsify(indices, len(vertices), cache_size=cache_size)
+    order, indices = optimize_vertex_fetch(indices, len(vertices))
+    vertices = vertices[order]
+
+    vao.replace_vertices(vertices, buffer_format, indices=indices)
+
+    return {
+        'triangles': len(indices) // 3,
+        'vertices': len(vertices),
+        'acmr_before': acmr_before,
+        'acmr_after': acmr(indices, cache_size=cache_size),
+    }
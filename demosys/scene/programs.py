@@ -1,5 +1,7 @@
 import os
 
+import numpy
+
 from demosys import context
 from demosys.conf import settings
 from demosys.resources import programs
@@ -7,6 +9,129 @@ from demosys.resources.meta import ProgramDescription
 
 settings.add_program_dir(os.path.join(os.path.dirname(__file__), 'programs'))
 
+# Feature flags for mesh program variants
+HAS_TEXTURE = 1 << 0
+HAS_NORMALS = 1 << 1
+DOUBLE_SIDED = 1 << 2
+SKINNED = 1 << 3
+INSTANCED = 1 << 4
+QUANTIZED_POSITION = 1 << 5
+QUANTIZED_UV = 1 << 6
+OCT_NORMALS = 1 << 7
+
+FEATURE_DEFINES = {
+    HAS_TEXTURE: 'HAS_TEXTURE',
+    HAS_NORMALS: 'HAS_NORMALS',
+    DOUBLE_SIDED: 'DOUBLE_SIDED',
+    SKINNED: 'SKINNED',
+    INSTANCED: 'INSTANCED',
+    QUANTIZED_POSITION: 'QUANTIZED_POSITION',
+    QUANTIZED_UV: 'QUANTIZED_UV',
+    OCT_NORMALS: 'OCT_NORMALS',
+}
+
+# Must match MAX_JOINTS in scene_default/mesh.glsl
+MAX_JOINTS = 64
+
+
+class RenderState:
+    """
+    Tracks the current program, bound textures and uniform values
+    during a frame so redundant changes can be skipped.
+    Counts draw calls and state changes until :py:meth:`reset`.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget the tracked state and reset the counters. Call at the start of a frame."""
+        self.program = None
+        self.textures = {}
+        self.uniforms = {}
+        self.draw_calls = 0
+        self.program_changes = 0
+        self.texture_changes = 0
+        self.uniform_writes = 0
+        # Texture binds and uniform writes skipped because nothing changed
+        self.skipped = 0
+
+    def use_program(self, program):
+        """Make a program current"""
+        if program is not self.program:
+            self.program = program
+            self.program_changes += 1
+
+    def use_texture(self, texture, location=0):
+        """Bind a texture unless already bound to the texture unit"""
+        if self.textures.get(location) is texture:
+            self.skipped += 1
+            return
+
+        texture.use(location=location)
+        self.textures[location] = texture
+        self.texture_changes += 1
+
+    def write(self, program, name: str, data: bytes):
+        """Write uniform bytes unless the uniform already has this value"""
+        key = (id(program), name)
+        if self.uniforms.get(key) == data:
+            self.skipped += 1
+            return
+
+        program[name].write(data)
+        self.uniforms[key] = data
+        self.uniform_writes += 1
+
+    def set_value(self, program, name: str, value):
+        """Set a uniform value unless the uniform already has this value"""
+        key = (id(program), name)
+        if self.uniforms.get(key) == value:
+            self.skipped += 1
+            return
+
+        program[name].value = value
+        self.uniforms[key] = value
+        self.uniform_writes += 1
+
+    def render(self, vao, program, **kwargs):
+        """Render a VAO with a program counting the draw call"""
+        self.use_program(program)
+        vao.render(program, **kwargs)
+        self.draw_calls += 1
+
+    @property
+    def stats(self) -> dict:
+        """The counters as a dict"""
+        return {
+            'draw_calls': self.draw_calls,
+            'program_changes': self.program_changes,
+            'texture_changes': self.texture_changes,
+            'uniform_writes': self.uniform_writes,
+            'skipped': self.skipped,
+        }
+
+
+class _DirectState(RenderState):
+    """Applies every change without tracking state"""
+
+    def use_program(self, program):
+        pass
+
+    def use_texture(self, texture, location=0):
+        texture.use(location=location)
+
+    def write(self, program, name, data):
+        program[name].write(data)
+
+    def set_value(self, program, name, value):
+        program[name].value = value
+
+    def render(self, vao, program, **kwargs):
+        vao.render(program, **kwargs)
+
+
+_direct = _DirectState()
+
 
 class MeshProgram:
 
@@ -27,6 +152,23 @@ class MeshProgram:
         self.program["m_mv"].write(view_matrix)
         mesh.vao.render(self.program)
 
+    def submit(self, mesh, state, projection_matrix=None, view_matrix=None, camera_matrix=None, time=0):
+        """
+        Draw the mesh through a :py:class:`RenderState` skipping redundant state changes.
+        Calls :py:meth:`draw` by default. Override to track state.
+
+        :param state: The :py:class:`RenderState` of the frame
+        :param projection_matrix: projection_matrix (bytes)
+        :param view_matrix: view_matrix (bytes)
+        :param camera_matrix: camera_matrix (bytes)
+        :param time: The current time
+        """
+        self.draw(mesh, projection_matrix=projection_matrix, view_matrix=view_matrix,
+                  camera_matrix=camera_matrix, time=time)
+        # The state of the program used by draw() is unknown
+        state.program = None
+        state.draw_calls += 1
+
     def apply(self, mesh):
         """
         Determine if this MeshProgram should be applied to the mesh
@@ -65,6 +207,14 @@ class ColorProgram(MeshProgram):
         self.program["m_cam"].write(camera_matrix)
         mesh.vao.render(self.program)
 
+    def submit(self, mesh, state, projection_matrix=None, view_matrix=None, camera_matrix=None, time=0):
+        color = mesh.material.color if mesh.material and mesh.material.color else (1.0, 1.0, 1.0, 1.0)
+        state.set_value(self.program, "color", tuple(color))
+        state.write(self.program, "m_proj", projection_matrix)
+        state.write(self.program, "m_view", view_matrix)
+        state.write(self.program, "m_cam", camera_matrix)
+        state.render(mesh.vao, self.program)
+
     def apply(self, mesh):
         if not mesh.material:
             return None
@@ -101,6 +251,14 @@ class TextureProgram(MeshProgram):
         self.program["m_cam"].write(camera_matrix)
         mesh.vao.render(self.program)
 
+    def submit(self, mesh, state, projection_matrix=None, view_matrix=None, camera_matrix=None, time=0):
+        state.use_texture(mesh.material.mat_texture.texture)
+        state.set_value(self.program, "texture0", 0)
+        state.write(self.program, "m_proj", projection_matrix)
+        state.write(self.program, "m_view", view_matrix)
+        state.write(self.program, "m_cam", camera_matrix)
+        state.render(mesh.vao, self.program)
+
     def apply(self, mesh):
         if not mesh.material:
             return None
@@ -137,5 +295,162 @@ class FallbackProgram(MeshProgram):
 
         mesh.vao.render(self.program)
 
+    def submit(self, mesh, state, projection_matrix=None, view_matrix=None, camera_matrix=None, time=0):
+        state.write(self.program, "m_proj", projection_matrix)
+        state.write(self.program, "m_view", view_matrix)
+        state.write(self.program, "m_cam", camera_matrix)
+        state.set_value(self.program, "color", tuple(mesh.material.color[0:3]) if mesh.material else (1.0, 1.0, 1.0))
+        state.render(mesh.vao, self.program)
+
+    def apply(self, mesh):
+        return self
+
+
+class VariantProgram(MeshProgram):
+    """
+    Mesh program compiling variants of a single glsl source on demand.
+    Each feature flag is exposed to the shader as a define
+    (``HAS_TEXTURE``, ``HAS_NORMALS``, ``DOUBLE_SIDED``, ``SKINNED``, ``INSTANCED``,
+    ``QUANTIZED_POSITION``, ``QUANTIZED_UV``, ``OCT_NORMALS``).
+    Compiled variants are cached by their feature bitmask.
+    """
+    def __init__(self, path="scene_default/mesh.glsl"):
+        """
+        :param path: Path of the glsl source the variants are compiled from
+        """
+        super().__init__()
+        self.path = path
+        self.variants = {}
+
+    def features(self, mesh) -> int:
+        """
+        Calculate the feature bitmask for a mesh based on its attributes and material
+
+        :param mesh: The mesh to inspect
+        :return: Feature bitmask
+        """
+        flags = 0
+
+        if mesh.has_normals():
+            flags |= HAS_NORMALS
+
+        if mesh.material and mesh.material.mat_texture is not None and mesh.has_uvs():
+            flags |= HAS_TEXTURE
+
+        if not mesh.material or mesh.material.double_sided:
+            flags |= DOUBLE_SIDED
+
+        if "JOINTS_0" in mesh.attributes and "WEIGHTS_0" in mesh.attributes:
+            flags |= SKINNED
+
+        if "INSTANCE_MATRIX" in mesh.attributes:
+            flags |= INSTANCED
+
+        encodings = {attr_type: encoding for attr_type, (encoding, _) in mesh.quantization.items()}
+        if encodings.get("POSITION") == 'unorm16':
+            flags |= QUANTIZED_POSITION
+
+        if encodings.get("TEXCOORD_0") == 'unorm16' and flags & HAS_TEXTURE:
+            flags |= QUANTIZED_UV
+
+        if encodings.get("NORMAL") == 'oct' and flags & HAS_NORMALS:
+            flags |= OCT_NORMALS
+
+        return flags
+
+    def get_variant(self, flags: int):
+        """
+        Get the program for a feature bitmask.
+        The program is compiled on first request.
+
+        :param flags: Feature bitmask
+        :return: The program instance
+        """
+        program = self.variants.get(flags)
+        if program:
+            return program
+
+        defines = {define: 1 for flag, define in FEATURE_DEFINES.items() if flags & flag}
+        program = programs.load(ProgramDescription(
+            label="{}[{}]".format(self.path, "|".join(sorted(defines))),
+            path=self.path,
+            defines=defines,
+        ))
+
+        # Skinned meshes are rendered in bind pose until joint matrices are written
+        if flags & SKINNED:
+            joints = numpy.tile(numpy.identity(4, dtype='f4'), (MAX_JOINTS, 1, 1))
+            program["m_joints"].write(joints.tobytes())
+
+        self.variants[flags] = program
+        return program
+
+    def use(self, flags, material, projection_matrix=None, view_matrix=None, camera_matrix=None,
+            quantization=None, state=None):
+        """
+        Get the variant for a feature bitmask and write the material and matrix uniforms
+
+        :param flags: Feature bitmask
+        :param material: The material to apply or None
+        :param projection_matrix: projection_matrix (bytes)
+        :param view_matrix: view_matrix (bytes). Ignored by instanced variants.
+        :param camera_matrix: camera_matrix (bytes)
+        :param quantization: The mesh quantization used to decode positions and uvs
+        :param state: :py:class:`RenderState` used to skip redundant changes
+        :return: The program instance
+        """
+        state = state or _direct
+        program = self.get_variant(flags)
+        state.use_program(program)
+
+        if flags & HAS_TEXTURE:
+            state.use_texture(material.mat_texture.texture)
+            state.set_value(program, "texture0", 0)
+        elif material and material.color:
+            state.set_value(program, "color", tuple(material.color))
+        else:
+            state.set_value(program, "color", (1.0, 1.0, 1.0, 1.0))
+
+        state.write(program, "m_proj", projection_matrix)
+        state.write(program, "m_cam", camera_matrix)
+        if not flags & INSTANCED:
+            state.write(program, "m_view", view_matrix)
+
+        if flags & QUANTIZED_POSITION:
+            _, decode = quantization["POSITION"]
+            state.set_value(program, "pos_scale", tuple(decode['scale']))
+            state.set_value(program, "pos_offset", tuple(decode['offset']))
+
+        if flags & QUANTIZED_UV:
+            _, decode = quantization["TEXCOORD_0"]
+            state.set_value(program, "uv_scale", tuple(decode['scale']))
+            state.set_value(program, "uv_offset", tuple(decode['offset']))
+
+        return program
+
+    def draw(self, mesh, projection_matrix=None, view_matrix=None, camera_matrix=None, time=0):
+        program = self.use(
+            mesh.program_features,
+            mesh.material,
+            projection_matrix=projection_matrix,
+            view_matrix=view_matrix,
+            camera_matrix=camera_matrix,
+            quantization=mesh.quantization,
+        )
+        mesh.vao.render(program)
+
+    def submit(self, mesh, state, projection_matrix=None, view_matrix=None, camera_matrix=None, time=0):
+        program = self.use(
+            mesh.program_features,
+            mesh.material,
+            projection_matrix=projection_matrix,
+            view_matrix=view_matrix,
+            camera_matrix=camera_matrix,
+            quantization=mesh.quantization,
+            state=state,
+        )
+        state.render(mesh.vao, program)
+
     def apply(self, mesh):
+        mesh.program_features = self.features(mesh)
         return self
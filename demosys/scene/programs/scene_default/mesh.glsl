@@ -0,0 +1,148 @@
+#version 330
+
+// Feature flags are injected as defines by the VariantProgram:
+// HAS_TEXTURE, HAS_NORMALS, DOUBLE_SIDED, SKINNED, INSTANCED,
+// QUANTIZED_POSITION, QUANTIZED_UV, OCT_NORMALS
+
+#if defined VERTEX_SHADER
+
+in vec3 in_position;
+
+#if defined QUANTIZED_POSITION
+// Unsigned shorts relative to the mesh bounding box
+uniform vec3 pos_scale;
+uniform vec3 pos_offset;
+#endif
+
+#if defined HAS_NORMALS
+#if defined OCT_NORMALS
+in vec2 in_normal;
+#else
+in vec3 in_normal;
+#endif
+out vec3 normal;
+#endif
+
+#if defined HAS_TEXTURE
+in vec2 in_uv;
+out vec2 uv;
+#if defined QUANTIZED_UV
+uniform vec2 uv_scale;
+uniform vec2 uv_offset;
+#endif
+#endif
+
+#if defined SKINNED
+#define MAX_JOINTS 64
+in vec4 in_joints;
+in vec4 in_weights;
+uniform mat4 m_joints[MAX_JOINTS];
+#endif
+
+#if defined INSTANCED
+in mat4 in_instance_matrix;
+#endif
+
+uniform mat4 m_proj;
+uniform mat4 m_view;
+uniform mat4 m_cam;
+
+out vec3 pos;
+
+#if defined OCT_NORMALS
+// Octahedral normals stored as signed shorts
+vec3 oct_decode(vec2 e) {
+    e = e / 32767.0;
+    vec3 n = vec3(e, 1.0 - abs(e.x) - abs(e.y));
+    if (n.z < 0.0) {
+        n.xy = (1.0 - abs(n.yx)) * vec2(n.x >= 0.0 ? 1.0 : -1.0, n.y >= 0.0 ? 1.0 : -1.0);
+    }
+    return normalize(n);
+}
+#endif
+
+void main() {
+#if defined INSTANCED
+    mat4 m_model = in_instance_matrix;
+#else
+    mat4 m_model = m_view;
+#endif
+
+#if defined SKINNED
+    m_model = m_model * (
+        m_joints[int(in_joints.x)] * in_weights.x +
+        m_joints[int(in_joints.y)] * in_weights.y +
+        m_joints[int(in_joints.z)] * in_weights.z +
+        m_joints[int(in_joints.w)] * in_weights.w
+    );
+#endif
+
+    mat4 mv = m_cam * m_model;
+#if defined QUANTIZED_POSITION
+    vec3 position = in_position * pos_scale + pos_offset;
+#else
+    vec3 position = in_position;
+#endif
+
+    vec4 p = mv * vec4(position, 1.0);
+    gl_Position = m_proj * p;
+    pos = p.xyz;
+
+#if defined HAS_NORMALS
+    mat3 m_normal = transpose(inverse(mat3(mv)));
+#if defined OCT_NORMALS
+    normal = m_normal * oct_decode(in_normal);
+#else
+    normal = m_normal * in_normal;
+#endif
+#endif
+
+#if defined HAS_TEXTURE
+#if defined QUANTIZED_UV
+    uv = in_uv * uv_scale + uv_offset;
+#else
+    uv = in_uv;
+#endif
+#endif
+}
+
+#elif defined FRAGMENT_SHADER
+
+out vec4 fragColor;
+
+#if defined HAS_TEXTURE
+uniform sampler2D texture0;
+in vec2 uv;
+#else
+uniform vec4 color;
+#endif
+
+#if defined HAS_NORMALS
+in vec3 normal;
+#endif
+
+in vec3 pos;
+
+void main()
+{
+#if defined HAS_TEXTURE
+    vec4 c = texture(texture0, uv);
+#else
+    vec4 c = color;
+#endif
+
+#if defined HAS_NORMALS
+    vec3 n = normalize(normal);
+    vec3 dir = normalize(-pos);
+#if defined DOUBLE_SIDED
+    float l = abs(dot(dir, n));
+#else
+    float l = max(dot(dir, n), 0.0);
+#endif
+    fragColor = c * 0.25 + c * 0.75 * l;
+#else
+    fragColor = vec4(c.rgb, 1.0);
+#endif
+}
+
+#endif
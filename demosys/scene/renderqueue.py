@@ -0,0 +1,179 @@
+"""
+Draw items of a scene sorted by render state
+"""
+import numpy
+
+from .programs import RenderState, VariantProgram
+
+# Passes drawn in order. Blended meshes are drawn back to front after opaque meshes.
+OPAQUE = 0
+BLENDED = 1
+
+# Bits of each part of the 64 bit sort key from most to least significant
+PASS_BITS = 4
+PROGRAM_BITS = 12
+MATERIAL_BITS = 16
+TEXTURE_BITS = 12
+DEPTH_BITS = 20
+
+
+class RenderQueue:
+    """
+    Draws mesh nodes sorted by a 64 bit key made of
+    ``(pass, program, material, texture, depth)``.
+
+    The state part of the keys is calculated once. Each frame the depth of the
+    visible items is added and the keys are sorted with ``numpy.argsort``.
+    Items are then submitted through a :py:class:`RenderState` skipping
+    redundant program, texture and uniform changes. Opaque items are drawn
+    front to back within each state and blended items back to front.
+
+    Meshes with :py:attr:`Mesh.lods` are drawn with the level matching the
+    projected size of their bounding sphere, selected for all items at once.
+    """
+    def __init__(self, nodes, graph):
+        """
+        :param nodes: Nodes with a mesh to draw
+        :param graph: The :py:class:`SceneGraph` containing the nodes
+        """
+        self.nodes = list(nodes)
+        self.graph = graph
+        self.indices = numpy.array([node.index for node in self.nodes], dtype='i4')
+        self.state = RenderState()
+        # Item indices in the order they were last submitted
+        self.order = numpy.zeros(0, dtype='i4')
+
+        programs, materials, textures = {}, {}, {}
+
+        def ident(table, key, bits):
+            return table.setdefault(key, len(table)) & ((1 << bits) - 1)
+
+        keys = numpy.zeros(len(self.nodes), dtype='u8')
+        self.blended = numpy.zeros(len(self.nodes), dtype=bool)
+        for i, node in enumerate(self.nodes):
+            mesh = node.mesh
+            material = mesh.material
+            texture = material.mat_texture.texture if material and material.mat_texture else None
+            self.blended[i] = bool(material and material.color and len(material.color) > 3 and material.color[3] < 1.0)
+
+            key = int(self.blended[i])
+            key = (key << PROGRAM_BITS) | ident(programs, _program_key(mesh), PROGRAM_BITS)
+            key = (key << MATERIAL_BITS) | ident(materials, id(material), MATERIAL_BITS)
+            key = (key << TEXTURE_BITS) | ident(textures, id(texture), TEXTURE_BITS)
+            keys[i] = key << DEPTH_BITS
+
+        self.keys = keys
+
+        # Bounding spheres and level thresholds of the items with simplified levels
+        self.lod_items = numpy.array(
+            [i for i, node in enumerate(self.nodes) if node.mesh.lods and node.mesh.bounding_sphere()], dtype='i4')
+        spheres = [self.nodes[i].mesh.bounding_sphere() for i in self.lod_items.tolist()]
+        self.lod_centers = numpy.array([center for center, _ in spheres], dtype='f4').reshape(-1, 3)
+        self.lod_radii = numpy.array([radius for _, radius in spheres], dtype='f4')
+        depth = max((len(self.nodes[i].mesh.lods) for i in self.lod_items.tolist()), default=0)
+        self.lod_thresholds = numpy.full((len(self.lod_items), depth), -numpy.inf, dtype='f4')
+        for row, i in enumerate(self.lod_items.tolist()):
+            sizes = [size for size, _ in self.nodes[i].mesh.lods]
+            self.lod_thresholds[row, :len(sizes)] = sizes
+        # The level drawn for each item in the last frame. 0 is the mesh itself.
+        self.levels = numpy.zeros(len(self.nodes), dtype='i4')
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def sort(self, camera_matrix, visible=None) -> numpy.ndarray:
+        """
+        Sort the visible items by their key
+
+        :param camera_matrix: The camera matrix (numpy array)
+        :param visible: Boolean array with the visibility of each item
+        :return: The item indices in draw order
+        """
+        items = numpy.arange(len(self.nodes)) if visible is None else numpy.nonzero(visible)[0]
+        if not len(items):
+            return items
+
+        # Distance along the view direction of each node origin
+        positions = self.graph.world[self.indices[items], 3, :3]
+        camera_matrix = numpy.asarray(camera_matrix, dtype='f4')
+        depth = -(positions @ camera_matrix[:3, 2] + camera_matrix[3, 2])
+
+        low, high = depth.min(), depth.max()
+        scale = ((1 << DEPTH_BITS) - 1) / (high - low) if high > low else 0.0
+        depth = ((depth - low) * scale).astype('u8')
+        depth = numpy.where(self.blended[items], (1 << DEPTH_BITS) - 1 - depth, depth)
+
+        return items[numpy.argsort(self.keys[items] | depth, kind='stable')]
+
+    def select_lods(self, projection_matrix, camera_matrix) -> numpy.ndarray:
+        """
+        Select the level of every item with simplified levels from the
+        fraction of the viewport height covered by its bounding sphere.
+        Cameras inside a sphere always get the full detail mesh.
+
+        :param projection_matrix: projection matrix (numpy array)
+        :param camera_matrix: camera_matrix (numpy array)
+        :return: :py:attr:`levels`
+        """
+        if not len(self.lod_items):
+            return self.levels
+
+        world = self.graph.world[self.indices[self.lod_items]]
+        centers = numpy.einsum('ni,nij->nj', self.lod_centers, world[:, :3, :3]) + world[:, 3, :3]
+        radii = self.lod_radii * numpy.sqrt(numpy.max(numpy.sum(world[:, :3, :3] ** 2, axis=2), axis=1))
+
+        projection_matrix = numpy.asarray(projection_matrix, dtype='f4')
+        camera_matrix = numpy.asarray(camera_matrix, dtype='f4')
+        sizes = radii * projection_matrix[1, 1]
+        # Perspective projections divide by the view depth
+        if projection_matrix[2, 3] != 0.0:
+            depth = -(centers @ camera_matrix[:3, 2] + camera_matrix[3, 2])
+            sizes = numpy.where(depth > radii, sizes / numpy.maximum(depth, 1e-6), numpy.inf)
+
+        self.levels[self.lod_items] = numpy.count_nonzero(sizes[:, None] < self.lod_thresholds, axis=1)
+        return self.levels
+
+    def submit(self, projection_matrix, camera_matrix, time=0, visible=None):
+        """
+        Sort and draw the visible items. Counters are available in :py:attr:`stats`.
+
+        :param projection_matrix: projection matrix (numpy array)
+        :param camera_matrix: camera_matrix (numpy array)
+        :param time: The current time
+        :param visible: Boolean array with the visibility of each item
+        """
+        self.order = self.sort(camera_matrix, visible)
+        levels = self.select_lods(projection_matrix, camera_matrix).tolist()
+        projection_matrix = projection_matrix.astype('f4').tobytes()
+        camera_bytes = camera_matrix.astype('f4').tobytes()
+
+        state = self.state
+        state.reset()
+        nodes = self.nodes
+        for i in self.order.tolist():
+            node = nodes[i]
+            mesh = node.mesh
+            if levels[i]:
+                mesh = mesh.lods[levels[i] - 1][1]
+            if mesh.mesh_program:
+                mesh.mesh_program.submit(
+                    mesh,
+                    state,
+                    projection_matrix=projection_matrix,
+                    view_matrix=node.matrix_global_bytes,
+                    camera_matrix=camera_bytes,
+                    time=time,
+                )
+
+    @property
+    def stats(self) -> dict:
+        """Draw call and state change counters of the last frame"""
+        return self.state.stats
+
+
+def _program_key(mesh):
+    """Meshes drawn with the same program variant share a key"""
+    if isinstance(mesh.mesh_program, VariantProgram):
+        return id(mesh.mesh_program), mesh.program_features
+
+    return id(mesh.mesh_program), 0
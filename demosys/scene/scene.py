@@ -1,14 +1,27 @@
 """
 Wrapper for a loaded scene with properties.
 """
+import numpy
 from pyrr import matrix44, vector3
 
+import moderngl
+
 from demosys import context, geometry
+from demosys.opengl.quantize import quantize_vao
 from demosys.resources import programs
 from demosys.resources.meta import ProgramDescription
 
-from .programs import (ColorProgram, FallbackProgram, MeshProgram,
-                       TextureProgram)
+from .batching import batch_scene
+from .culling import FrustumCuller, transform_aabb_corners
+from .drawlist import DrawList
+from .renderqueue import RenderQueue
+from .graph import SceneGraph
+from .instancing import instance_scene
+from .lod import create_vao, geometry_key, lod_chain, read_cache, read_geometry, write_cache
+from .occlusion import OcclusionCuller
+from .optimize import optimize_vao
+from .programs import MeshProgram, VariantProgram
+from .snapshot import write_snapshot
 
 
 class Scene:
@@ -27,6 +40,37 @@ class Scene:
         self.materials = []
         self.meshes = []
         self.cameras = []
+        # Static meshes merged by batch()
+        self.batches = []
+        # The meshes drawn by the batches were released and can not be drawn separately
+        self._batch_sources_released = False
+        # Meshes shared by multiple nodes drawn with instancing
+        self.instance_groups = []
+        # Flattened node hierarchy created by build_graph()
+        self.graph = None
+
+        # Frustum culling of prepared scenes
+        self.culling = True
+        self.culler = None
+        # Draw the bounding boxes of culled meshes
+        self.draw_culled = False
+        # Cull with this camera matrix instead of the one drawing the scene
+        self.cull_camera_matrix = None
+        # Hide meshes occluded in the previous frame using queries on their bounding boxes
+        self.occlusion_culling = False
+        self.occlusion = None
+        # Number of meshes drawn, culled by the frustum and rejected by occlusion queries in the last frame
+        self.drawn = 0
+        self.culled = 0
+        self.occluded = 0
+        self._cull_slots = None
+        self._frustum_visible = None
+        # Meshes drawn individually sorted by render state
+        self.render_queue = None
+        self._queue_slots = None
+        # The render queue compiled into draw packets by compile()
+        self.compiled = False
+        self.draw_list = None
 
         self.bbox_min = None
         self.bbox_max = None
@@ -50,29 +94,148 @@ class Scene:
     @view_matrix.setter
     def view_matrix(self, value):
         self._view_matrix = value.astype('f4')
-        for node in self.root_nodes:
-            node.calc_view_mat(self._view_matrix)
+        if self.graph:
+            self.graph.update(self._view_matrix)
+            self.culler.moved = True
+            if self.draw_list:
+                self.draw_list.refresh()
+        else:
+            for node in self.root_nodes:
+                node.calc_view_mat(self._view_matrix)
+
+        for group in self.instance_groups:
+            group.update()
 
     def draw(self, projection_matrix=None, camera_matrix=None, time=0):
         """
-        Draw all the nodes in the scene
+        Draw all the nodes in the scene.
+        Meshes outside the view frustum are skipped when :py:attr:`culling` is enabled.
+        Meshes that are not batched or instanced are drawn through :py:attr:`render_queue`
+        sorted by program, material and texture.
 
-        :param projection_matrix: projection matrix (bytes)
-        :param camera_matrix: camera_matrix (bytes)
+        :param projection_matrix: projection matrix (numpy array)
+        :param camera_matrix: camera_matrix (numpy array)
         :param time: The current time
         """
+        visible = None
+        self.update_transforms()
+        if self.culler:
+            visible = self.cull(projection_matrix, camera_matrix)
+            if self.draw_list:
+                self.draw_list.replay(projection_matrix, camera_matrix, time=time,
+                                      visible=visible[self._queue_slots])
+            else:
+                self.render_queue.submit(projection_matrix, camera_matrix, time=time,
+                                         visible=visible[self._queue_slots])
+
+        if self.occlusion:
+            occlusion_matrices = projection_matrix, camera_matrix
+
         projection_matrix = projection_matrix.astype('f4').tobytes()
         camera_matrix = camera_matrix.astype('f4').tobytes()
 
-        for node in self.root_nodes:
-            node.draw(
+        if not self.culler:
+            for node in self.root_nodes:
+                node.draw(
+                    projection_matrix=projection_matrix,
+                    camera_matrix=camera_matrix,
+                    time=time,
+                )
+
+        for group in self.instance_groups:
+            group.draw(
                 projection_matrix=projection_matrix,
                 camera_matrix=camera_matrix,
                 time=time,
             )
 
+        if self.batches:
+            view_matrix = self._view_matrix.astype('f4').tobytes()
+            for batch in self.batches:
+                batch.draw(
+                    projection_matrix=projection_matrix,
+                    view_matrix=view_matrix,
+                    camera_matrix=camera_matrix,
+                    time=time,
+                )
+
+        if self.draw_culled and self.culler:
+            for node, node_visible in zip(self.culler.nodes, visible.tolist()):
+                if not node_visible and node.mesh.bbox_min is not None:
+                    node.mesh.draw_bbox(projection_matrix, node.matrix_global_bytes, camera_matrix,
+                                        self.bbox_program, self.bbox_vao)
+
+        # Queries for the next frame test against the depth of everything drawn
+        if self.occlusion:
+            self.occlusion.test(self._frustum_visible, *occlusion_matrices)
+
         self.ctx.clear_samplers(0, 4)
 
+    def cull(self, projection_matrix, camera_matrix) -> numpy.ndarray:
+        """
+        Test the bounding box of every mesh against the view frustum and hide the
+        culled parts of batches and instance groups. Called by :py:meth:`draw`.
+        With :py:attr:`occlusion_culling` enabled meshes occluded in the previous
+        frame are hidden as well. Updates :py:attr:`drawn`, :py:attr:`culled`
+        and :py:attr:`occluded`.
+
+        :param projection_matrix: projection matrix (numpy array)
+        :param camera_matrix: camera_matrix (numpy array)
+        :return: Boolean array with the visibility of each node in ``culler.nodes``
+        """
+        if self.culling:
+            if self.cull_camera_matrix is not None:
+                camera_matrix = self.cull_camera_matrix
+            visible = self.culler.cull(projection_matrix, camera_matrix)
+        else:
+            visible = numpy.ones(len(self.culler), dtype=bool)
+
+        self._frustum_visible = visible
+        if not self.occlusion_culling:
+            self.occlusion = None
+        elif self.occlusion is None or self.occlusion.culler is not self.culler:
+            self.occlusion = OcclusionCuller(self.culler, self.bbox_vao, self.bbox_program)
+        else:
+            visible = self.occlusion.apply(visible)
+
+        if self._cull_slots is None:
+            self._build_queue()
+
+        for target, slots in self._cull_slots:
+            target.set_visible(visible[slots])
+
+        self.drawn = int(numpy.count_nonzero(visible))
+        self.occluded = self.occlusion.rejected if self.occlusion else 0
+        self.culled = len(visible) - self.drawn - self.occluded
+        return visible
+
+    def compile(self):
+        """
+        Compile the meshes drawn by the render queue into a :py:class:`DrawList`
+        of prebound draw packets. Drawing a compiled scene skips most of the
+        per mesh Python work. Meant for static scenes as the packets keep their
+        state order and moved nodes update every packet.
+        The scene is compiled again after changes like batching.
+
+        :return: The :py:class:`DrawList`
+        """
+        self.compiled = True
+        self._build_queue()
+        return self.draw_list
+
+    def _build_queue(self):
+        """Map batches, instance groups and the render queue to culler slots"""
+        self._cull_slots = [
+            (batch, self.culler.slots_of([part.node for part in batch.parts])) for batch in self.batches
+        ]
+        self._cull_slots.extend(
+            (group, self.culler.slots_of(group.nodes)) for group in self.instance_groups
+        )
+        queued = [node for node in self.culler.nodes if not node.batched and not node.instanced]
+        self.render_queue = RenderQueue(queued, self.graph)
+        self._queue_slots = self.culler.slots_of(queued)
+        self.draw_list = DrawList(self.render_queue) if self.compiled else None
+
     def draw_bbox(self, projection_matrix=None, camera_matrix=None, all=True):
         """Draw scene and mesh bounding boxes"""
         projection_matrix = projection_matrix.astype('f4').tobytes()
@@ -97,9 +260,9 @@ class Scene:
     def apply_mesh_programs(self, mesh_programs=None):
         """Applies mesh programs to meshes"""
         if not mesh_programs:
-            mesh_programs = [ColorProgram(), TextureProgram(), FallbackProgram()]
+            mesh_programs = [VariantProgram()]
 
-        for mesh in self.meshes:
+        for mesh in self.all_meshes():
             for mp in mesh_programs:
                 instance = mp.apply(mesh)
                 if instance is not None:
@@ -112,32 +275,384 @@ class Scene:
             if not mesh.mesh_program:
                 print("WARING: No mesh program applied to '{}'".format(mesh.name))
 
+        # Programs are part of the render queue sort keys
+        self._cull_slots = None
+
     def calc_scene_bbox(self):
-        """Calculate scene bbox"""
-        bbox_min, bbox_max = None, None
-        for node in self.root_nodes:
-            bbox_min, bbox_max = node.calc_global_bbox(
-                matrix44.create_identity(),
-                bbox_min,
-                bbox_max
-            )
+        """
+        Calculate the scene bbox from the bounding boxes of all meshes.
+        The eight corners of every mesh box are transformed in a single numpy pass.
+        Meshes without a bounding box get one from their vertex positions.
+        """
+        meshes, matrices = [], []
+        stack = [(node, numpy.identity(4)) for node in self.root_nodes]
+        while stack:
+            node, matrix = stack.pop()
+            if node.matrix is not None:
+                matrix = numpy.asarray(node.matrix, dtype='f8') @ matrix
+
+            if node.mesh:
+                if node.mesh.bbox_min is None or node.mesh.bbox_max is None:
+                    node.mesh.calc_bbox()
+                if node.mesh.bbox_min is not None and node.mesh.bbox_max is not None:
+                    meshes.append(node.mesh)
+                    matrices.append(matrix)
 
-        self.bbox_min = bbox_min
-        self.bbox_max = bbox_max
+            stack.extend((child, matrix) for child in node.children)
+
+        if not meshes:
+            return
+
+        bbox_min, bbox_max = transform_aabb_corners(
+            [mesh.bbox_min for mesh in meshes],
+            [mesh.bbox_max for mesh in meshes],
+            matrices,
+        )
+        self.bbox_min = bbox_min.min(axis=0)
+        self.bbox_max = bbox_max.max(axis=0)
 
         self.diagonal_size = vector3.length(self.bbox_max - self.bbox_min)
 
-    def prepare(self):
+    def prepare(self, instancing=True, bvh=True):
+        """
+        Apply mesh programs, flatten the node hierarchy and calculate node matrices
+
+        :param instancing: Draw meshes referenced by multiple nodes with instancing
+        :param bvh: Build a bounding volume hierarchy for culling and ray queries
+        """
+        # Instanced meshes are grouped again from the current nodes
+        self.release_instances()
         self.apply_mesh_programs()
+        self.build_graph()
         self.view_matrix = matrix44.create_identity()
 
+        if bvh:
+            self.build_bvh()
+
+        if instancing:
+            self.instance_groups = instance_scene(self)
+
+    def build_graph(self):
+        """
+        Flatten the node hierarchy into a :py:class:`SceneGraph`.
+        Must be called again if nodes are added or removed after preparing the scene.
+        """
+        self.graph = SceneGraph(self.root_nodes)
+        self.graph.update(self._view_matrix)
+        self.culler = FrustumCuller(self.graph)
+        self._cull_slots = None
+
+    @property
+    def bvh(self):
+        """The :py:class:`BVH` over the world space mesh bounding boxes or ``None``"""
+        if not self.culler:
+            return None
+
+        self.culler.refit()
+        return self.culler.bvh
+
+    def build_bvh(self, **kwargs):
+        """
+        Build a bounding volume hierarchy over the world space bounding boxes of all meshes.
+        It is refitted when node matrices change and replaces the flat frustum test in :py:meth:`cull`.
+        Rebuild it if nodes moved far from their original positions.
+
+        :param kwargs: Arguments passed to :py:class:`BVH`
+        :return: The new BVH
+        """
+        if not self.graph:
+            self.build_graph()
+
+        return self.culler.build_bvh(**kwargs)
+
+    def raycast(self, origin, direction, max_distance=numpy.inf):
+        """
+        Find the nodes whose mesh bounding box is hit by a ray in scene space.
+        The BVH is built if the scene does not have one.
+
+        :param origin: Ray origin
+        :param direction: Ray direction. Distances are in units of its length.
+        :param max_distance: Ignore hits further away
+        :return: List of (node, distance) tuples sorted by distance
+        """
+        bvh = self.bvh if self.bvh is not None else self.build_bvh()
+        items, distances = bvh.ray(origin, direction, max_distance=max_distance)
+        nodes = [self.culler.nodes[slot] for slot in self.culler.bounded[items].tolist()]
+        return list(zip(nodes, distances.tolist()))
+
+    def update_transforms(self) -> int:
+        """
+        Recalculate world matrices of nodes changed since the last update.
+        Called by :py:meth:`draw`.
+
+        :return: The number of updated nodes
+        """
+        if not self.graph or not self.graph.dirty:
+            return 0
+
+        updated = self.graph.update_dirty()
+        self.culler.moved = True
+        if self.draw_list:
+            self.draw_list.refresh()
+        for group in self.instance_groups:
+            group.update()
+
+        return updated
+
+    def optimize(self, cache_size=32) -> dict:
+        """
+        Reorder triangles and vertices of all meshes for the post transform vertex cache.
+        Non-indexed meshes are indexed first.
+
+        :param cache_size: Target vertex cache size
+        :return: dict with the number of optimized meshes and the average cache
+                 miss ratio (ACMR) before and after weighted by triangle count
+        """
+        stats = {'meshes': 0, 'triangles': 0, 'acmr_before': 0.0, 'acmr_after': 0.0}
+        vaos = {id(mesh.vao): mesh.vao for mesh in self.meshes if mesh.vao}
+
+        for vao in vaos.values():
+            result = optimize_vao(vao, cache_size=cache_size)
+            if not result:
+                continue
+
+            stats['meshes'] += 1
+            stats['triangles'] += result['triangles']
+            stats['acmr_before'] += result['acmr_before'] * result['triangles']
+            stats['acmr_after'] += result['acmr_after'] * result['triangles']
+
+        if stats['triangles']:
+            stats['acmr_before'] /= stats['triangles']
+            stats['acmr_after'] /= stats['triangles']
+
+        # Replaced vertex buffers release the vertex arrays cached by the render queue
+        self._cull_slots = None
+        return stats
+
+    def quantize(self, position=None, normal='oct', uv='half') -> dict:
+        """
+        Encode the vertex attributes of all meshes in compact formats.
+        Positions, normals and uvs are decoded by the default mesh program.
+
+        :param position: Position encoding. ``half`` or ``unorm16`` relative to the mesh bounding box.
+        :param normal: Normal encoding. ``half``, ``snorm8`` or ``oct``.
+        :param uv: Texture coordinate encoding. ``half`` or ``unorm16`` relative to the uv range.
+        :return: dict with the number of quantized meshes and the vertex data size in bytes before and after
+        """
+        stats = {'meshes': 0, 'bytes_before': 0, 'bytes_after': 0}
+        encodings = {'POSITION': position, 'NORMAL': normal, 'TEXCOORD_0': uv}
+
+        meshes_by_vao = {}
+        for mesh in self.all_meshes():
+            if mesh.vao:
+                meshes_by_vao.setdefault(id(mesh.vao), []).append(mesh)
+
+        for meshes in meshes_by_vao.values():
+            vao = meshes[0].vao
+            names = {
+                meshes[0].attributes[attr_type]['name']: encoding
+                for attr_type, encoding in encodings.items()
+                if encoding and attr_type in meshes[0].attributes
+            }
+
+            size = vao.read_vertices()[0].nbytes
+            encoded = quantize_vao(vao, names)
+            if not encoded:
+                continue
+
+            stats['meshes'] += len(meshes)
+            stats['bytes_before'] += size
+            stats['bytes_after'] += vao.read_vertices()[0].nbytes
+
+            for mesh in meshes:
+                mesh.quantization = {
+                    attr_type: encoded[attribute['name']]
+                    for attr_type, attribute in mesh.attributes.items() if attribute['name'] in encoded
+                }
+
+                # Select the variant decoding the attributes
+                if mesh.mesh_program:
+                    mesh.mesh_program.apply(mesh)
+
+        # Vertex arrays and programs are part of the render queue
+        self._cull_slots = None
+        return stats
+
+    def generate_lods(self, levels=3, ratio=0.5, screen_size=0.25, cache=None) -> dict:
+        """
+        Add simplified levels of detail to the triangle meshes of the scene.
+        Each level keeps ``ratio`` of the triangles of the previous one and is
+        drawn when the mesh covers less than ``screen_size`` of the viewport
+        height, halved for every following level.
+        Meshes with quantized positions or per instance buffers are skipped.
+
+        Simplifying is slow for large meshes. Pass a ``cache`` path to store
+        the levels in a ``.npz`` file reused while the geometry is unchanged.
+
+        :param levels: Number of levels to generate for each mesh
+        :param ratio: Fraction of triangles kept by each level
+        :param screen_size: Viewport height fraction below which the first level is drawn
+        :param cache: Path of the cache file or ``None``
+        :return: dict with the number of meshes and levels, the triangles of the meshes,
+                 the triangles of their coarsest levels and the number of levels read from the cache
+        """
+        stats = {'meshes': 0, 'levels': 0, 'triangles_before': 0, 'triangles_after': 0, 'cached': 0}
+
+        meshes_by_vao = {}
+        for mesh in self.meshes:
+            if _can_simplify(mesh):
+                meshes_by_vao.setdefault(id(mesh.vao), []).append(mesh)
+
+        cached = read_cache(cache, levels, ratio) if cache else {}
+        chains = {}
+
+        for meshes in meshes_by_vao.values():
+            vao = meshes[0].vao
+            vertices, buffer_format, indices = read_geometry(vao)
+            key = geometry_key(vertices, buffer_format, indices)
+            if key in cached:
+                chain = chains[key] = cached[key]
+                stats['cached'] += len(chain)
+            else:
+                position = meshes[0].attributes['POSITION']['name']
+                chain = chains[key] = lod_chain(vertices, indices, position, levels=levels, ratio=ratio)
+
+            for level, (lod_vertices, lod_indices) in enumerate(chain):
+                lod_vao = create_vao("{}_lod{}".format(vao.name, level + 1), lod_vertices, buffer_format, lod_indices)
+                for mesh in meshes:
+                    mesh.add_lod(lod_vao, screen_size * 0.5 ** level)
+
+            stats['meshes'] += len(meshes)
+            stats['levels'] += len(chain) * len(meshes)
+            stats['triangles_before'] += len(indices) // 3 * len(meshes)
+            stats['triangles_after'] += len(chain[-1][1] if chain else indices) // 3 * len(meshes)
+
+        if cache and chains and stats['cached'] < sum(len(chain) for chain in chains.values()):
+            write_cache(cache, chains, levels, ratio)
+
+        # Levels are part of the render queue
+        self._cull_slots = None
+        return stats
+
+    def write_snapshot(self, path) -> int:
+        """
+        Write the scene to a ``.dscene`` snapshot loading without parsing the
+        original file. Vertex and index data is written as it is in the buffers,
+        so optimizing, quantizing and level of detail generation are kept.
+
+        :param path: Path of the snapshot file
+        :return: The size of the file in bytes
+        """
+        return write_snapshot(self, str(path))
+
+    def all_meshes(self):
+        """Generator of all meshes and their levels of detail"""
+        for mesh in self.meshes:
+            yield mesh
+            for _, lod in mesh.lods:
+                yield lod
+
+    def batch(self, indirect=None, release_sources=False) -> int:
+        """
+        Merge static meshes sharing a vertex format into batches
+        drawn by material group. Mesh programs must be applied first.
+
+        The merged vertices are read back from the GPU and kept next to
+        the original buffers, roughly doubling the vertex memory of batched
+        meshes. With ``release_sources`` the VAOs of meshes only drawn through
+        batches are released and their ``vao`` set to ``None``. Such batches
+        can not be released again.
+
+        :param indirect: Use indirect rendering. Auto detected by default.
+        :param release_sources: Release the VAOs of meshes merged into batches
+        :return: The number of released VAOs
+        """
+        self.release_batches()
+        self.batches = batch_scene(self, indirect=indirect)
+        self._cull_slots = None
+
+        if not release_sources:
+            return 0
+
+        # Meshes still drawn by nodes or as levels of detail keep their VAO
+        drawn = {id(node.mesh) for node in self.nodes_with_mesh() if not node.batched}
+        drawn.update(id(lod) for mesh in self.meshes for _, lod in mesh.lods)
+
+        released = 0
+        for batch in self.batches:
+            for part in batch.parts:
+                if id(part.mesh) in drawn or part.mesh.vao is None:
+                    continue
+
+                part.mesh.vao.release()
+                part.mesh.vao = None
+                released += 1
+
+        self._batch_sources_released = released > 0
+        return released
+
+    def release_batches(self):
+        """Release all batches drawing their meshes separately again"""
+        if self._batch_sources_released:
+            raise ValueError("Batches of {} were created with release_sources and can not be released".format(
+                self.name))
+
+        for batch in self.batches:
+            for part in batch.parts:
+                part.node.batched = False
+            batch.release()
+
+        self.batches = []
+        self._cull_slots = None
+
+    def release_instances(self):
+        """Release all instance groups drawing their nodes separately again"""
+        for group in self.instance_groups:
+            group.release()
+
+        self.instance_groups = []
+        self._cull_slots = None
+
+    @property
+    def draw_calls(self) -> int:
+        """Number of draw calls issued by batches, instance groups and meshes not in a batch"""
+        return sum(b.draw_calls for b in self.batches) + len(self.instance_groups) + sum(
+            1 for node in self.nodes_with_mesh() if not node.batched and not node.instanced)
+
+    def nodes_with_mesh(self):
+        """Generator of all nodes with a mesh"""
+        stack = list(reversed(self.root_nodes))
+        while stack:
+            node = stack.pop()
+            if node.mesh:
+                yield node
+            stack.extend(reversed(node.children))
+
     def destroy(self):
         """Destroy the scene data and deallocate buffers"""
-        for mesh in self.meshes:
-            mesh.vao.release()
+        for batch in self.batches:
+            batch.release()
+
+        self.batches = []
+        self.release_instances()
+
+        for mesh in self.all_meshes():
+            if mesh.vao is not None:
+                mesh.vao.release()
 
     def __str__(self):
         return "<Scene: {}>".format(self.name)
 
     def __repr__(self):
         return str(self)
+
+
+def _can_simplify(mesh) -> bool:
+    if mesh.vao is None or mesh.vao.mode != moderngl.TRIANGLES or mesh.lods:
+        return False
+
+    # Encoded positions can not be moved by the simplifier
+    if 'POSITION' not in mesh.attributes or 'POSITION' in mesh.quantization:
+        return False
+
+    return all(not info.per_instance and not info.dynamic for info in mesh.vao.buffers)
@@ -0,0 +1,181 @@
+"""
+Mesh simplification using quadric error metrics
+(Garland and Heckbert: Surface Simplification Using Quadric Error Metrics)
+"""
+import numpy
+
+# Weight of the planes keeping open borders in place
+BORDER_WEIGHT = 100.0
+
+
+def face_quadrics(positions: numpy.ndarray, triangles: numpy.ndarray) -> numpy.ndarray:
+    """
+    Area weighted plane quadric of each triangle
+
+    :param positions: ``(V, 3)`` vertex positions
+    :param triangles: ``(F, 3)`` vertex indices
+    :return: ``(F, 4, 4)`` quadrics
+    """
+    p0, p1, p2 = (positions[triangles[:, i]] for i in range(3))
+    normals = numpy.cross(p1 - p0, p2 - p0)
+    area = numpy.linalg.norm(normals, axis=1)
+    normals = normals / numpy.where(area > 0, area, 1.0)[:, None]
+
+    planes = numpy.concatenate([normals, -numpy.sum(normals * p0, axis=1, keepdims=True)], axis=1)
+    return planes[:, :, None] * planes[:, None, :] * (area * 0.5)[:, None, None]
+
+
+def vertex_quadrics(positions: numpy.ndarray, triangles: numpy.ndarray) -> numpy.ndarray:
+    """
+    Sum the quadrics of the triangles around each vertex.
+    Edges used by a single triangle get an extra plane perpendicular
+    to the triangle so open borders keep their shape.
+
+    :param positions: ``(V, 3)`` vertex positions
+    :param triangles: ``(F, 3)`` vertex indices
+    :return: ``(V, 4, 4)`` quadrics
+    """
+    quadrics = numpy.zeros((len(positions), 4, 4))
+    faces = face_quadrics(positions, triangles)
+    for corner in range(3):
+        numpy.add.at(quadrics, triangles[:, corner], faces)
+
+    # Border edges appear once. Interior edges appear twice in opposite directions.
+    edges = numpy.stack([triangles, numpy.roll(triangles, -1, axis=1)], axis=2).reshape(-1, 2)
+    sorted_edges = numpy.sort(edges, axis=1)
+    _, inverse, counts = numpy.unique(sorted_edges, axis=0, return_inverse=True, return_counts=True)
+    border = counts[inverse.ravel()] == 1
+    if not numpy.any(border):
+        return quadrics
+
+    edges = edges[border]
+    face = numpy.repeat(numpy.arange(len(triangles)), 3)[border]
+    p0, p1, p2 = (positions[triangles[face, i]] for i in range(3))
+    face_normals = numpy.cross(p1 - p0, p2 - p0)
+
+    start, end = positions[edges[:, 0]], positions[edges[:, 1]]
+    normals = numpy.cross(end - start, face_normals)
+    length = numpy.linalg.norm(normals, axis=1)
+    normals = normals / numpy.where(length > 0, length, 1.0)[:, None]
+    planes = numpy.concatenate([normals, -numpy.sum(normals * start, axis=1, keepdims=True)], axis=1)
+
+    weight = BORDER_WEIGHT * numpy.sum((end - start) ** 2, axis=1)
+    border_quadrics = planes[:, :, None] * planes[:, None, :] * weight[:, None, None]
+    numpy.add.at(quadrics, edges[:, 0], border_quadrics)
+    numpy.add.at(quadrics, edges[:, 1], border_quadrics)
+    return quadrics
+
+
+def simplify(positions, indices, target_triangles: int, max_error=numpy.inf):
+    """
+    Reduce the number of triangles by collapsing edges with the lowest quadric error.
+
+    Each pass evaluates every edge at once and collapses a set of edges not sharing
+    any vertices. An edge is collapsed when it has the lowest cost of all edges
+    around both its vertices. Collapses flipping a triangle are rejected.
+
+    :param positions: ``(V, 3)`` vertex positions
+    :param indices: Triangle list indices
+    :param target_triangles: Stop when the triangle count is at or below this
+    :param max_error: Do not collapse edges with a higher error
+    :return: (positions, indices) tuple. Collapsed vertices are moved and unused
+             vertices are left in place. Other vertex attributes of the kept vertex are reused.
+    """
+    positions = numpy.array(positions, dtype='f8').reshape(-1, 3)
+    triangles = numpy.asarray(indices, dtype='i8').reshape(-1, 3)
+    triangles = triangles[_valid(triangles)]
+    quadrics = vertex_quadrics(positions, triangles)
+
+    while len(triangles) > target_triangles:
+        edges = numpy.unique(numpy.sort(
+            numpy.stack([triangles, numpy.roll(triangles, -1, axis=1)], axis=2).reshape(-1, 2), axis=1), axis=0)
+        keep, remove = edges[:, 0], edges[:, 1]
+        targets, cost = _collapse_targets(positions, quadrics[keep] + quadrics[remove], keep, remove)
+
+        selected = _independent_edges(cost, keep, remove, len(positions)) & (cost <= max_error)
+        selected = numpy.nonzero(selected)[0]
+        # Each collapse removes about two triangles
+        selected = selected[numpy.argsort(cost[selected], kind='stable')]
+        selected = selected[:max((len(triangles) - target_triangles + 1) // 2, 1)]
+
+        for _ in range(4):
+            flipped = _flipped(positions, triangles, keep[selected], remove[selected], targets[selected])
+            if not len(flipped):
+                break
+            selected = numpy.delete(selected, flipped)
+
+        if not len(selected):
+            break
+
+        keep, remove = keep[selected], remove[selected]
+        positions[keep] = targets[selected]
+        quadrics[keep] += quadrics[remove]
+
+        remap = numpy.arange(len(positions))
+        remap[remove] = keep
+        triangles = remap[triangles]
+        triangles = triangles[_valid(triangles)]
+
+    return positions, triangles.astype('u4').ravel()
+
+
+def _valid(triangles):
+    """Triangles with three different vertices"""
+    return numpy.all(triangles != numpy.roll(triangles, 1, axis=1), axis=1)
+
+
+def _collapse_targets(positions, quadrics, keep, remove):
+    """The position with the lowest error for each edge and the error"""
+    start, end = positions[keep], positions[remove]
+    candidates = [start, end, (start + end) * 0.5]
+
+    # The optimal position minimizing the quadric when the system is well conditioned
+    system = quadrics[:, :3, :3]
+    solvable = numpy.abs(numpy.linalg.det(system)) > 1e-12
+    optimal = (start + end) * 0.5
+    if numpy.any(solvable):
+        optimal[solvable] = numpy.linalg.solve(system[solvable], -quadrics[solvable, :3, 3:])[..., 0]
+    candidates.append(optimal)
+
+    candidates = numpy.stack(candidates, axis=1)
+    homogeneous = numpy.concatenate([candidates, numpy.ones(candidates.shape[:2] + (1,))], axis=2)
+    errors = numpy.einsum('eci,eij,ecj->ec', homogeneous, quadrics, homogeneous)
+    best = numpy.argmin(errors, axis=1)
+    rows = numpy.arange(len(best))
+    return candidates[rows, best], numpy.maximum(errors[rows, best], 0.0)
+
+
+def _independent_edges(cost, keep, remove, vertex_count):
+    """Edges with the lowest cost around both of their vertices"""
+    rank = numpy.empty(len(cost), dtype='i8')
+    rank[numpy.argsort(cost, kind='stable')] = numpy.arange(len(cost))
+
+    lowest = numpy.full(vertex_count, len(cost), dtype='i8')
+    numpy.minimum.at(lowest, keep, rank)
+    numpy.minimum.at(lowest, remove, rank)
+    return (lowest[keep] == rank) & (lowest[remove] == rank)
+
+
+def _flipped(positions, triangles, keep, remove, targets):
+    """Indices into the collapses that would flip a remaining triangle"""
+    collapse = numpy.full(len(positions), -1)
+    collapse[keep] = numpy.arange(len(keep))
+    collapse[remove] = numpy.arange(len(keep))
+
+    corners = collapse[triangles]
+    affected = numpy.any(corners >= 0, axis=1)
+    triangles, corners = triangles[affected], corners[affected]
+
+    moved = positions[triangles]
+    new = numpy.where((corners >= 0)[..., None], targets[numpy.maximum(corners, 0)], moved)
+
+    # Triangles losing an edge disappear and can not flip
+    merged = collapse[triangles]
+    survives = numpy.all((merged != numpy.roll(merged, 1, axis=1)) | (merged < 0), axis=1)
+
+    before = numpy.cross(moved[:, 1] - moved[:, 0], moved[:, 2] - moved[:, 0])
+    after = numpy.cross(new[:, 1] - new[:, 0], new[:, 2] - new[:, 0])
+    area = numpy.linalg.norm(before, axis=1)
+    flipped = survives & (area > 0.0) & (numpy.sum(before * after, axis=1) <= 0.0)
+
+    return numpy.unique(corners[flipped][corners[flipped] >= 0])
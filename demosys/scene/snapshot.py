@@ -0,0 +1,296 @@
+"""
+Binary scene snapshots laid out for memory mapping.
+
+A ``.dscene`` file starts with a fixed header followed by a json
+description of the scene. Vertex, index, matrix and texture data
+follow as raw blobs aligned to :py:data:`ALIGNMENT` bytes::
+
+    magic (8 bytes) | version (u4) | json size (u4) | json | padding | blobs
+"""
+import json
+import mmap
+import os
+import struct
+
+import numpy
+
+from .instancing import INSTANCE_ATTRIBUTE
+
+MAGIC = b'DSCENE\x00\x00'
+VERSION = 1
+# Byte alignment of every blob
+ALIGNMENT = 16
+
+_HEADER = struct.Struct('<8sII')
+
+
+def write_snapshot(scene, path) -> int:
+    """
+    Write a scene to a ``.dscene`` snapshot.
+
+    Nodes, matrices, materials, samplers, meshes with their levels of detail
+    and the raw content of their vertex and index buffers are stored.
+    Textures loaded from a file are stored as a reference to the file
+    and other textures as pixel data. Cameras, batches and instance groups
+    are not stored. Batching and instancing are applied again when loading.
+
+    :param scene: The scene to write
+    :param path: Path of the snapshot file
+    :return: The size of the file in bytes
+    """
+    blobs = []
+
+    def add_blob(data) -> int:
+        blobs.append(memoryview(data).cast('B'))
+        return len(blobs) - 1
+
+    textures, samplers, materials = _Table(), _Table(), _Table()
+    vaos, meshes = _Table(), _Table()
+
+    def add_mesh(mesh):
+        if mesh in meshes:
+            return meshes.index(mesh)
+
+        index = meshes.add(mesh)
+        if mesh.vao is not None and mesh.vao not in vaos:
+            vaos.add(mesh.vao)
+        if mesh.material is not None and mesh.material not in materials:
+            materials.add(mesh.material)
+        for _, lod in mesh.lods:
+            add_mesh(lod)
+        return index
+
+    # Flatten the node hierarchy keeping children after their parent
+    nodes = _Table()
+    stack = list(reversed(scene.root_nodes))
+    while stack:
+        node = stack.pop()
+        nodes.add(node)
+        stack.extend(reversed(node.children))
+
+    for mesh in scene.meshes:
+        add_mesh(mesh)
+    for node in nodes:
+        if node.mesh:
+            add_mesh(node.mesh)
+
+    for material in materials:
+        mat_texture = material.mat_texture
+        if mat_texture and mat_texture.texture is not None and mat_texture.texture not in textures:
+            textures.add(mat_texture.texture)
+        if mat_texture and mat_texture.sampler is not None and mat_texture.sampler not in samplers:
+            samplers.add(mat_texture.sampler)
+
+    matrices = numpy.array([
+        numpy.identity(4) if node.matrix is None else node.matrix for node in nodes
+    ], dtype='f4').reshape(-1, 4, 4)
+
+    header = {
+        'name': str(scene.name),
+        'bbox_min': _list(scene.bbox_min),
+        'bbox_max': _list(scene.bbox_max),
+        'roots': [nodes.index(node) for node in scene.root_nodes],
+        'scene_meshes': [meshes.index(mesh) for mesh in scene.meshes],
+        'matrices': add_blob(matrices),
+        'nodes': [{
+            'mesh': meshes.index(node.mesh) if node.mesh else None,
+            'matrix': node.matrix is not None,
+            'children': [nodes.index(child) for child in node.children],
+        } for node in nodes],
+        'textures': [_texture_info(texture, add_blob) for texture in textures],
+        'samplers': [_sampler_info(sampler) for sampler in samplers],
+        'materials': [{
+            'name': material.name,
+            'color': _list(material.color),
+            'double_sided': material.double_sided,
+            'texture': textures.index(material.mat_texture.texture)
+            if material.mat_texture and material.mat_texture.texture is not None else None,
+            'sampler': samplers.index(material.mat_texture.sampler)
+            if material.mat_texture and material.mat_texture.sampler is not None else None,
+        } for material in materials],
+        'vaos': [_vao_info(vao, add_blob) for vao in vaos],
+        'meshes': [{
+            'name': mesh.name,
+            'vao': vaos.index(mesh.vao) if mesh.vao is not None else None,
+            'material': materials.index(mesh.material) if mesh.material is not None else None,
+            'attributes': {
+                attr_type: info for attr_type, info in mesh.attributes.items() if attr_type != 'INSTANCE_MATRIX'
+            },
+            'bbox_min': _list(mesh.bbox_min),
+            'bbox_max': _list(mesh.bbox_max),
+            'quantization': mesh.quantization,
+            'lods': [[size, meshes.index(lod)] for size, lod in mesh.lods],
+        } for mesh in meshes],
+    }
+
+    # Offsets are relative to the first blob
+    offset, table = 0, []
+    for blob in blobs:
+        table.append([offset, blob.nbytes])
+        offset = _align(offset + blob.nbytes)
+    header['blobs'] = table
+
+    data = json.dumps(header).encode()
+    start = _align(_HEADER.size + len(data))
+
+    temp = path + '.tmp'
+    with open(temp, 'wb') as fd:
+        fd.write(_HEADER.pack(MAGIC, VERSION, len(data)))
+        fd.write(data)
+        fd.write(bytes(start - _HEADER.size - len(data)))
+        for blob, (blob_offset, size) in zip(blobs, table):
+            fd.write(bytes(start + blob_offset - fd.tell()))
+            fd.write(blob)
+        size = fd.tell()
+    os.replace(temp, path)
+
+    return size
+
+
+class Snapshot:
+    """
+    A memory mapped ``.dscene`` file. Blobs are returned as memoryviews
+    into the mapping so data can be uploaded without copying it first.
+    All blobs must be released before the snapshot is closed.
+
+    Example::
+
+        with Snapshot(path) as snapshot:
+            with snapshot.blob(snapshot.header['matrices']) as data:
+                matrices = numpy.frombuffer(data, dtype='f4').reshape(-1, 4, 4).copy()
+    """
+    def __init__(self, path):
+        """
+        :param path: Path of the snapshot file
+        """
+        self.path = path
+        with open(str(path), 'rb') as fd:
+            self._mmap = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._view = memoryview(self._mmap)
+        try:
+            magic, version, size = _HEADER.unpack_from(self._view)
+        except struct.error:
+            self.close()
+            raise ValueError("{} is not a scene snapshot".format(path))
+
+        if magic != MAGIC:
+            self.close()
+            raise ValueError("{} has incorrect header {} != {}".format(path, magic, MAGIC))
+
+        if version != VERSION:
+            self.close()
+            raise ValueError("{} has unsupported version {}".format(path, version))
+
+        with self._view[_HEADER.size:_HEADER.size + size] as data:
+            self.header = json.loads(bytes(data).decode())
+        self._start = _align(_HEADER.size + size)
+
+    def blob(self, index) -> memoryview:
+        """
+        A blob in the mapped file
+
+        :param index: Index of the blob
+        :return: ``memoryview`` of the blob bytes
+        """
+        offset, size = self.header['blobs'][index]
+        return self._view[self._start + offset:self._start + offset + size]
+
+    def array(self, index, dtype) -> numpy.ndarray:
+        """
+        Copy a blob into a numpy array
+
+        :param index: Index of the blob
+        :param dtype: numpy dtype of the elements
+        :return: ``numpy.ndarray``
+        """
+        with self.blob(index) as data:
+            return numpy.frombuffer(data, dtype=dtype).copy()
+
+    def close(self):
+        """Unmap the file"""
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _Table(list):
+    """List of objects with indices looked up by identity"""
+    def __init__(self):
+        super().__init__()
+        self._indices = {}
+
+    def add(self, item) -> int:
+        self._indices[id(item)] = len(self)
+        self.append(item)
+        return len(self) - 1
+
+    def index(self, item, *args) -> int:
+        return self._indices[id(item)]
+
+    def __contains__(self, item):
+        return id(item) in self._indices
+
+
+def _vao_info(vao, add_blob) -> dict:
+    """Describe the buffers of a VAO and add their content as blobs"""
+    if vao._dynamic_buffers:
+        raise ValueError("VAO {} has dynamic buffers and can not be written to a snapshot".format(vao.name))
+
+    buffers = []
+    for info in vao.buffers:
+        # Instance matrices are created again when the scene is prepared
+        if INSTANCE_ATTRIBUTE in info.attributes:
+            continue
+
+        buffers.append({
+            'format': " ".join(attrib_format.format for attrib_format in info.attrib_formats),
+            'attributes': list(info.attributes),
+            'per_instance': info.per_instance,
+            'data': add_blob(info.read()),
+        })
+
+    indices = None
+    if vao.index_element_size:
+        data = vao._index_range.read() if vao._index_range else vao._index_buffer.read()
+        indices = {'element_size': vao.index_element_size, 'data': add_blob(data)}
+
+    return {'name': vao.name, 'mode': vao.mode, 'buffers': buffers, 'indices': indices}
+
+
+def _texture_info(texture, add_blob) -> dict:
+    """Reference textures loaded from files and store the pixels of other textures"""
+    meta = (getattr(texture, 'extra', None) or {}).get('meta')
+    if meta is not None and meta.path:
+        return {'path': str(meta.path), 'flip': meta.flip, 'mipmap': meta.mipmap}
+
+    return {
+        'size': list(texture.size),
+        'components': texture.components,
+        'dtype': texture.dtype,
+        'mipmap': meta.mipmap if meta is not None else True,
+        'data': add_blob(texture.read()),
+    }
+
+
+def _sampler_info(sampler) -> dict:
+    return {
+        'filter': list(sampler.filter),
+        'repeat_x': sampler.repeat_x,
+        'repeat_y': sampler.repeat_y,
+        'anisotropy': sampler.anisotropy,
+    }
+
+
+def _list(value):
+    """Convert numpy arrays and tuples to json lists"""
+    return None if value is None else numpy.asarray(value, dtype='f8').tolist()
+
+
+def _align(offset) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
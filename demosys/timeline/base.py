@@ -1,3 +1,4 @@
+from demosys.opengl.profiler import profiler
 
 
 class BaseTimeline:
@@ -20,6 +21,18 @@ class BaseTimeline:
         """
         raise NotImplementedError()
 
+    def draw_effect(self, effect, time, frametime, target):
+        """
+        Draw an effect. The GPU time is measured by the profiler when enabled.
+
+        :param effect: The effect instance to draw
+        :param time: The current time in seconds
+        :param frametime: The time one frame should take in seconds
+        :param target: The target FBO
+        """
+        with profiler.scope(effect.label or effect.name):
+            effect.draw(time, frametime, target)
+
     def key_event(self, key, action, mods):
         """
         Forwarded key events from the system.
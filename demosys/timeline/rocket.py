@@ -33,4 +33,4 @@ class Timeline(BaseTimeline):
         for effect in self.effects:
             value = effect.rocket_timeline_track.time_value(time)
             if value > 0.5:
-                effect.draw(time, frametime, target)
+                self.draw_effect(effect, time, frametime, target)
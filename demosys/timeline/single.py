@@ -8,7 +8,7 @@ class Timeline(BaseTimeline):
 
     def draw(self, time, frametime, target):
         effect = self._project.get_default_effect()
-        effect.draw(time, frametime, target)
+        self.draw_effect(effect, time, frametime, target)
 
     def key_event(self, key, action, mods):
         pass
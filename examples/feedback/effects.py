@@ -6,7 +6,7 @@ from pyrr import matrix44, vector3
 
 import moderngl as mgl
 from demosys.effects import effect
-from demosys.opengl.vao import VAO
+from demosys.opengl.feedback import TransformFeedback
 
 
 class FeedbackEffect(effect.Effect):
@@ -15,16 +15,7 @@ class FeedbackEffect(effect.Effect):
         self.feedback = self.get_program("transform")
         self.program = self.get_program("billboards")
         self.texture = self.get_texture("particle")
-
-        # VAOs representing the two different buffer bindings
-        self.particles1 = None
-        self.particles2 = None
         self.particles = None
-
-        # VBOs for each position buffer
-        self.pos1 = None
-        self.pos2 = None
-        self.pos = None
         self.init_particles()
 
     def draw(self, time, frametime, target):
@@ -51,7 +42,7 @@ class FeedbackEffect(effect.Effect):
         self.feedback["gravity_pos"].write(gravity_pos.astype('f4').tobytes())
         self.feedback["gravity_force"].value = gravity_force
         self.feedback["timedelta"].value = frametime
-        self.particles.transform(self.feedback, self.pos)
+        self.particles.step(self.feedback)
 
         # Draw particles
         self.program["m_proj"].write(m_proj.astype('f4').tobytes())
@@ -60,10 +51,6 @@ class FeedbackEffect(effect.Effect):
         self.program["texture0"].value = 0
         self.particles.render(self.program)
 
-        # Swap buffers
-        self.pos = self.pos1 if self.pos == self.pos2 else self.pos2
-        self.particles = self.particles1 if self.particles == self.particles2 else self.particles2
-
     def init_particles(self):
         count = 50000
         area = 100.0
@@ -80,17 +67,5 @@ class FeedbackEffect(effect.Effect):
                 yield random.uniform(-speed, speed)
                 yield random.uniform(-speed, speed)
 
-        data1 = numpy.fromiter(gen(), count=count * 6, dtype=numpy.float32)
-        data2 = numpy.fromiter(gen(), count=count * 6, dtype=numpy.float32)
-
-        self.pos1 = self.ctx.buffer(data1.tobytes())
-        self.particles1 = VAO("particles1", mode=mgl.POINTS)
-        self.particles1.buffer(self.pos1, '3f 3f', ['in_position', 'in_velocity'])
-
-        self.pos2 = self.ctx.buffer(data2.tobytes())
-        self.particles2 = VAO("particles2", mode=mgl.POINTS)
-        self.particles2.buffer(self.pos2, '3f 3f', ['in_position', 'in_velocity'])
-
-        # Set initial start buffers
-        self.particles = self.particles1
-        self.pos = self.pos2
+        data = numpy.fromiter(gen(), count=count * 6, dtype=numpy.float32)
+        self.particles = TransformFeedback('3f 3f', ['in_position', 'in_velocity'], data=data, name="particles")
@@ -0,0 +1,20 @@
+#version 430
+
+#if defined COMPUTE_SHADER
+
+layout(local_size_x = 64) in;
+
+layout(std430, binding = 0) buffer Data {
+    float values[];
+};
+
+uniform uint count;
+
+void main() {
+    uint i = gl_GlobalInvocationID.x;
+    if (i < count) {
+        values[i] = values[i] * 2.0;
+    }
+}
+
+#endif
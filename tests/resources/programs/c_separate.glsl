@@ -0,0 +1,11 @@
+#version 430
+
+layout(local_size_x = 8, local_size_y = 8) in;
+
+layout(std430, binding = 0) buffer Data {
+    uint values[];
+};
+
+void main() {
+    atomicAdd(values[0], 1u);
+}
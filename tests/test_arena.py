@@ -0,0 +1,85 @@
+import numpy
+
+import moderngl
+from demosys import resources
+from demosys.opengl.arena import BufferArena, shared_arena
+from demosys.opengl.vao import VAO
+from demosys.resources.meta import SceneDescription
+from demosys.test.testcase import DemosysTestCase
+
+
+class ArenaTest(DemosysTestCase):
+
+    def test_allocate(self):
+        arena = BufferArena(block_size=1024, alignment=16)
+        ranges = [arena.allocate(100) for _ in range(8)]
+        self.assertEqual([r.offset for r in ranges[:3]], [0, 112, 224])
+        self.assertEqual(len(arena.blocks), 1)
+        self.assertEqual(arena.used, 8 * 112)
+
+        # Does not fit in the first block
+        extra = arena.allocate(200)
+        self.assertEqual(len(arena.blocks), 2)
+        self.assertIs(extra.buffer, arena.blocks[1].buffer)
+
+        # Freed neighbours are merged and reused
+        ranges[1].release()
+        ranges[2].release()
+        self.assertEqual(arena.blocks[0].free[0], [112, 224])
+        self.assertEqual(arena.allocate(200).offset, 112)
+
+        # Empty blocks except the first are released
+        extra.release()
+        self.assertEqual(len(arena.blocks), 1)
+
+        # Large ranges get a block of their own
+        large = arena.allocate(4000)
+        self.assertEqual(large.buffer.size, 4000)
+
+    def test_write_read(self):
+        arena = BufferArena(block_size=1024)
+        arena.allocate(10)
+        data = numpy.arange(16, dtype='f4')
+        buffer_range = arena.allocate_data(data)
+        self.assertEqual(buffer_range.offset, 16)
+        numpy.testing.assert_array_equal(numpy.frombuffer(buffer_range.read(), dtype='f4'), data)
+
+        with self.assertRaises(ValueError):
+            buffer_range.write(bytes(100))
+
+    def test_vao(self):
+        shader = self.load_program("v_write_1.glsl")
+        arena = BufferArena(block_size=1024)
+        arena.allocate(10)
+
+        vao = VAO("arena", mode=moderngl.POINTS)
+        vao.buffer(numpy.array([1, 2, 3], dtype='u4'), '1u', 'in_val', arena=arena)
+        vao.index_buffer(numpy.array([2, 0, 1], dtype='u4'), narrow=True, arena=arena)
+        self.assertEqual(vao.buffers[0].offset, 16)
+        self.assertEqual(vao.first_index, 32)
+        self.assertEqual(vao.index_count, 3)
+        self.assertEqual(vao.read_indices().tolist(), [2, 0, 1])
+
+        result = self.ctx.buffer(reserve=12)
+        vao.transform(shader, result)
+        self.assertEqual(numpy.frombuffer(result.read(), dtype='u4').tolist(), [258, 256, 257])
+
+        # Ranges return to the arena
+        vao.release()
+        self.assertEqual(arena.allocations, 1)
+
+    def test_scene(self):
+        path = 'BoxTextured/glTF/BoxTextured.gltf'
+        reference = resources.scenes.load(SceneDescription(label=path, path=path))
+        scene = resources.scenes.load(SceneDescription(label=path, path=path, arena=True))
+
+        arena = shared_arena()
+        allocations = arena.allocations
+        vao = scene.meshes[0].vao
+        self.assertTrue(all(info.range for info in vao.buffers))
+        self.assertEqual(vao.read_indices().tolist(), reference.meshes[0].vao.read_indices().tolist())
+        numpy.testing.assert_array_equal(vao.read_vertices()[0], reference.meshes[0].vao.read_vertices()[0])
+
+        # Destroying the scene returns its ranges
+        scene.destroy()
+        self.assertEqual(arena.allocations, allocations - len(vao.buffers) - 1)
@@ -0,0 +1,99 @@
+import numpy
+from pyrr import matrix44
+
+from demosys.scene.bvh import BVH
+from demosys.scene.culling import aabbs_in_frustum, frustum_planes
+from demosys.test.testcase import DemosysTestCase
+
+
+class BVHTest(DemosysTestCase):
+
+    def random_boxes(self, count=2000, seed=1):
+        random = numpy.random.RandomState(seed)
+        centers = random.uniform(-50.0, 50.0, size=(count, 3))
+        extents = random.uniform(0.1, 2.0, size=(count, 3))
+        return centers - extents, centers + extents
+
+    def planes(self):
+        projection = matrix44.create_perspective_projection_matrix(60.0, 16 / 9, 0.1, 40.0)
+        camera = matrix44.create_look_at((0.0, 0.0, 30.0), (10.0, 5.0, 0.0), (0.0, 1.0, 0.0))
+        return frustum_planes(camera @ projection)
+
+    def brute_ray(self, bbox_min, bbox_max, origin, direction, max_distance=numpy.inf):
+        hits = []
+        for i, (bmin, bmax) in enumerate(zip(bbox_min, bbox_max)):
+            near, far = (bmin - origin) / direction, (bmax - origin) / direction
+            enter = max(numpy.minimum(near, far).max(), 0.0)
+            if enter <= min(numpy.maximum(near, far).min(), max_distance):
+                hits.append(i)
+        return sorted(hits)
+
+    def assertTreeValid(self, bvh):
+        count = bvh.node_count
+        leaves = bvh.leaves
+        # Every item is in exactly one leaf
+        self.assertEqual(int(bvh.count[leaves].sum()), len(bvh))
+        self.assertEqual(sorted(bvh.order.tolist()), list(range(len(bvh))))
+
+        for node in range(count):
+            items = bvh.order[bvh.first[node]:bvh.first[node] + bvh.count[node]]
+            self.assertTrue(numpy.all(bvh.node_min[node] <= bvh.bbox_min[items]))
+            self.assertTrue(numpy.all(bvh.node_max[node] >= bvh.bbox_max[items]))
+
+    def test_build(self):
+        bvh = BVH(*self.random_boxes())
+        self.assertTreeValid(bvh)
+        self.assertLess(bvh.node_count, 2 * len(bvh))
+        self.assertLess(int(bvh.depth.max()), 30)
+
+        # Degenerate input
+        self.assertEqual(len(BVH(numpy.zeros((0, 3)), numpy.zeros((0, 3)))), 0)
+        same = BVH(numpy.zeros((20, 3)), numpy.ones((20, 3)))
+        self.assertEqual(same.node_count, 1)
+        self.assertEqual(int(same.frustum(self.planes()).sum()), 20)
+
+    def test_frustum(self):
+        bbox_min, bbox_max = self.random_boxes()
+        bvh = BVH(bbox_min, bbox_max)
+        planes = self.planes()
+
+        expected = aabbs_in_frustum(planes, (bbox_min + bbox_max) * 0.5, (bbox_max - bbox_min) * 0.5)
+        visible = bvh.frustum(planes)
+        self.assertGreater(int(expected.sum()), 0)
+        self.assertLess(int(expected.sum()), len(bvh))
+        numpy.testing.assert_array_equal(visible, expected)
+
+    def test_ray(self):
+        bbox_min, bbox_max = self.random_boxes()
+        bvh = BVH(bbox_min, bbox_max)
+        origin = numpy.array([-60.0, -3.0, 2.0])
+        direction = numpy.array([1.0, 0.1, 0.05])
+
+        items, distances = bvh.ray(origin, direction)
+        self.assertEqual(sorted(items.tolist()), self.brute_ray(bbox_min, bbox_max, origin, direction))
+        self.assertTrue(numpy.all(numpy.diff(distances) >= 0.0))
+
+        # Segments stop at the end point
+        end = origin + direction * 50.0
+        items, distances = bvh.segment(origin, end)
+        length = numpy.linalg.norm(direction * 50.0)
+        unit = direction / numpy.linalg.norm(direction)
+        self.assertEqual(sorted(items.tolist()), self.brute_ray(bbox_min, bbox_max, origin, unit, length))
+        self.assertTrue(numpy.all(distances <= length))
+
+        # Axis aligned rays
+        items, _ = bvh.ray((-60.0, 0.0, 0.0), (1.0, 0.0, 0.0))
+        self.assertEqual(sorted(items.tolist()),
+                         self.brute_ray(bbox_min, bbox_max, numpy.array([-60.0, 0.0, 0.0]), numpy.array([1.0, 1e-30, 1e-30])))
+
+    def test_refit(self):
+        bbox_min, bbox_max = self.random_boxes()
+        bvh = BVH(bbox_min, bbox_max)
+
+        offset = numpy.random.RandomState(2).uniform(-5.0, 5.0, size=bbox_min.shape)
+        bvh.refit(bbox_min + offset, bbox_max + offset)
+        self.assertTreeValid(bvh)
+
+        planes = self.planes()
+        expected = aabbs_in_frustum(planes, (bbox_min + bbox_max) * 0.5 + offset, (bbox_max - bbox_min) * 0.5)
+        numpy.testing.assert_array_equal(bvh.frustum(planes), expected)
@@ -0,0 +1,136 @@
+import numpy
+
+from demosys.opengl.arena import BufferArena
+from demosys.opengl.commands import DrawCommandBuffer
+from demosys.opengl.vao import VAO
+from demosys.test.testcase import DemosysTestCase
+
+
+class DrawCommandBufferTest(DemosysTestCase):
+
+    def test_build(self):
+        commands = DrawCommandBuffer(capacity=2)
+        for i in range(5):
+            self.assertEqual(commands.add(6, first_index=i * 6, base_vertex=i * 4), i)
+
+        self.assertEqual(len(commands), 5)
+        self.assertEqual(commands.data['first_index'].tolist(), [0, 6, 12, 18, 24])
+
+        buffer = commands.upload()
+        data = numpy.frombuffer(buffer.read(), dtype=commands.dtype)[:5]
+        self.assertEqual(data['base_vertex'].tolist(), [0, 4, 8, 12, 16])
+
+    def test_enable(self):
+        commands = DrawCommandBuffer()
+        for i in range(4):
+            commands.add(3, instance_count=2, first_index=i * 3)
+        buffer = commands.upload()
+
+        # Only the changed range is written. The first command is not uploaded again.
+        buffer.write(numpy.zeros(1, dtype=commands.dtype).tobytes())
+        commands.set_enabled(numpy.array([True, False, True, False]))
+        self.assertEqual(commands.enabled_count, 2)
+
+        commands.upload()
+        data = numpy.frombuffer(buffer.read(), dtype=commands.dtype)[:4]
+        self.assertEqual(data['instance_count'].tolist(), [0, 0, 2, 0])
+
+        # Unchanged masks upload nothing
+        buffer.write(numpy.zeros(4, dtype=commands.dtype).tobytes())
+        commands.set_enabled(numpy.array([True, False, True, False]))
+        commands.upload()
+        data = numpy.frombuffer(buffer.read(), dtype=commands.dtype)[:4]
+        self.assertEqual(data['count'].tolist(), [0, 0, 0, 0])
+
+        commands.enable(1)
+        self.assertEqual(commands.data['instance_count'].tolist(), [2, 2, 2, 0])
+
+        with self.assertRaises(ValueError):
+            commands.set_enabled(numpy.ones(3, dtype=bool), first=2)
+
+    def test_render(self):
+        if self.ctx.version_code < 430:
+            self.skipTest("Indirect rendering requires OpenGL 4.3")
+
+        program = self.load_program("vf_pos.glsl")
+
+        # A triangle in the left and right half of the viewport sharing the same indices
+        vao = VAO("halves")
+        vao.buffer(numpy.array([
+            -1.0, -1.0, 0.0, 0.0, -1.0, 0.0, -1.0, 1.0, 0.0,
+            0.0, -1.0, 0.0, 1.0, -1.0, 0.0, 1.0, 1.0, 0.0,
+        ], dtype='f4'), '3f', ['in_position'])
+        vao.index_buffer(numpy.array([0, 1, 2], dtype='u4'))
+
+        commands = DrawCommandBuffer()
+        commands.add(3)
+        commands.add(3, base_vertex=3)
+
+        texture = self.ctx.texture((16, 16), 1)
+        fbo = self.ctx.framebuffer(color_attachments=[texture])
+        self.addCleanup(fbo.release)
+        self.addCleanup(texture.release)
+
+        def render():
+            fbo.clear()
+            fbo.use()
+            commands.render(vao, program)
+            self.window.use()
+            pixels = numpy.frombuffer(fbo.read(components=1), dtype='u1').reshape(16, 16)
+            return int(pixels[:, :8].sum()), int(pixels[:, 8:].sum())
+
+        left, right = render()
+        self.assertGreater(left, 0)
+        self.assertGreater(right, 0)
+
+        commands.disable(0)
+        self.assertEqual(render(), (0, right))
+
+        commands.enable(0)
+        commands.disable(1)
+        self.assertEqual(render(), (left, 0))
+
+        commands.release()
+        vao.release()
+
+    def test_render_arena(self):
+        """Commands are relative to an index range in an arena"""
+        if self.ctx.version_code < 430:
+            self.skipTest("Indirect rendering requires OpenGL 4.3")
+
+        program = self.load_program("vf_pos.glsl")
+        arena = BufferArena(block_size=1024)
+        arena.allocate(64)
+
+        # A triangle in the left half and one in the right half of the viewport
+        vao = VAO("halves")
+        vao.buffer(numpy.array([
+            -1.0, -1.0, 0.0, 0.0, -1.0, 0.0, -1.0, 1.0, 0.0,
+            0.0, -1.0, 0.0, 1.0, -1.0, 0.0, 1.0, 1.0, 0.0,
+        ], dtype='f4'), '3f', ['in_position'], arena=arena)
+        vao.index_buffer(numpy.array([0, 1, 2, 3, 4, 5], dtype='u4'), arena=arena)
+        self.assertGreater(vao.first_index, 0)
+
+        commands = DrawCommandBuffer()
+        commands.add(3, first_index=3)
+
+        texture = self.ctx.texture((16, 16), 1)
+        fbo = self.ctx.framebuffer(color_attachments=[texture])
+        self.addCleanup(fbo.release)
+        self.addCleanup(texture.release)
+
+        fbo.clear()
+        fbo.use()
+        commands.render(vao, program)
+        self.window.use()
+        pixels = numpy.frombuffer(fbo.read(components=1), dtype='u1').reshape(16, 16)
+        self.assertEqual(int(pixels[:, :8].sum()), 0)
+        self.assertGreater(int(pixels[:, 8:].sum()), 0)
+
+        # The uploaded commands include the first index of the range
+        uploaded = numpy.frombuffer(commands.buffer.read(size=commands.dtype.itemsize), dtype=commands.dtype)
+        self.assertEqual(int(uploaded['first_index'][0]), vao.first_index + 3)
+        self.assertEqual(int(commands.data['first_index'][0]), 3)
+
+        commands.release()
+        vao.release()
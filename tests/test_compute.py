@@ -0,0 +1,42 @@
+import unittest
+
+import numpy
+
+from demosys import resources
+from demosys.opengl.compute import ComputeDispatch
+from demosys.resources.meta import ProgramDescription
+from demosys.test.testcase import DemosysTestCase
+
+
+class ComputeTestCase(DemosysTestCase):
+
+    def setUp(self):
+        if self.ctx.version_code < 430:
+            raise unittest.SkipTest("Compute shaders require OpenGL 4.3")
+
+    def test_single(self):
+        program = self.load_program("c_double.glsl")
+        self.assertEqual(program.extra['local_size'], (64, 1, 1))
+
+        data = numpy.arange(100, dtype='f4')
+        buffer = self.ctx.buffer(data.tobytes())
+        program['count'].value = 100
+
+        compute = ComputeDispatch(program)
+        compute.storage_buffer(0, buffer)
+        self.assertEqual(compute.run(100), (2, 1, 1))
+
+        result = numpy.frombuffer(buffer.read(), dtype='f4')
+        numpy.testing.assert_array_equal(result, data * 2)
+
+    def test_separate(self):
+        program = resources.programs.load(ProgramDescription(label="c_separate", compute_shader="c_separate.glsl"))
+        self.assertEqual(program.extra['local_size'], (8, 8, 1))
+
+        buffer = self.ctx.buffer(reserve=4)
+        compute = ComputeDispatch(program)
+        compute.storage_buffer(0, buffer)
+        self.assertEqual(compute.group_count(20, 8), (3, 1, 1))
+        compute.run(20, 8)
+
+        self.assertEqual(numpy.frombuffer(buffer.read(), dtype='u4')[0], 3 * 64)
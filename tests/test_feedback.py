@@ -0,0 +1,38 @@
+import numpy
+
+from demosys.opengl.feedback import TransformFeedback
+from demosys.opengl.program import ShaderSource
+from demosys.test.testcase import DemosysTestCase
+
+
+class TransformFeedbackTestCase(DemosysTestCase):
+
+    def test_steps(self):
+        program = self.load_program("v_write_1.glsl")
+        feedback = TransformFeedback('1u', ['in_val'], data=numpy.zeros(3, dtype='u4'), states=3)
+        self.assertEqual(feedback.vertices, 3)
+
+        self.assertEqual(feedback.step(program, steps=2), 6)
+        self.assertEqual(feedback.total_vertices_processed, 6)
+        numpy.testing.assert_array_equal(numpy.frombuffer(feedback.state().read(), dtype='u4'), [510] * 3)
+        numpy.testing.assert_array_equal(numpy.frombuffer(feedback.state(1).read(), dtype='u4'), [255] * 3)
+
+        feedback.step(program)
+        numpy.testing.assert_array_equal(numpy.frombuffer(feedback.buffer_current.read(), dtype='u4'), [765] * 3)
+        feedback.release()
+
+    def test_count_primitives(self):
+        program = self.load_program("v_write_1.glsl")
+        feedback = TransformFeedback('1u', ['in_val'], vertices=4, count_primitives=True)
+        feedback.step(program)
+        self.assertEqual(feedback.primitives_written, 4)
+
+    def test_find_out_attribs(self):
+        source = ShaderSource("VERTEX_SHADER", "test", "\n".join([
+            "#version 330",
+            "out vec3 out_position;",
+            "flat out uint out_id;",
+            "layout(location = 2) out vec2 out_a, out_b;",
+            "out float out_array[2];",
+        ]))
+        self.assertEqual(source.find_out_attribs(), ['out_position', 'out_id', 'out_a', 'out_b', 'out_array'])
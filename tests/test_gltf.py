@@ -0,0 +1,115 @@
+import json
+import os
+import struct
+import tempfile
+import tracemalloc
+
+import numpy
+
+from demosys.loaders.scene.gltf import GLTF2, GLTFBuffer
+from demosys.resources.meta import SceneDescription
+from demosys.test.testcase import DemosysTestCase
+
+
+def write_glb(path, positions, indices):
+    """Write a single mesh glb with a position and an index accessor"""
+    binary = positions.tobytes() + indices.tobytes()
+    meta = {
+        'asset': {'version': '2.0'},
+        'scene': 0,
+        'scenes': [{'nodes': [0]}],
+        'nodes': [{'mesh': 0}],
+        'meshes': [{'primitives': [{'attributes': {'POSITION': 0}, 'indices': 1}]}],
+        'accessors': [
+            {'bufferView': 0, 'componentType': 5126, 'count': len(positions), 'type': 'VEC3',
+             'min': positions.min(axis=0).tolist(), 'max': positions.max(axis=0).tolist()},
+            {'bufferView': 1, 'componentType': 5125, 'count': len(indices), 'type': 'SCALAR'},
+        ],
+        'bufferViews': [
+            {'buffer': 0, 'byteOffset': 0, 'byteLength': positions.nbytes},
+            {'buffer': 0, 'byteOffset': positions.nbytes, 'byteLength': indices.nbytes},
+        ],
+        'buffers': [{'byteLength': len(binary)}],
+    }
+    json_chunk = json.dumps(meta).encode()
+    json_chunk += b' ' * (-len(json_chunk) % 4)
+
+    with open(path, 'wb') as fd:
+        fd.write(struct.pack('<4sII', b'glTF', 2, 12 + 8 + len(json_chunk) + 8 + len(binary)))
+        fd.write(struct.pack('<I4s', len(json_chunk), b'JSON'))
+        fd.write(json_chunk)
+        fd.write(struct.pack('<I4s', len(binary), b'BIN\x00'))
+        fd.write(binary)
+
+
+class GLTFTest(DemosysTestCase):
+
+    def test_formats(self):
+        """Separate, embedded and binary buffers load the same geometry"""
+        scene = self.load_scene('BoxTextured/glTF/BoxTextured.gltf')
+        for path in ['BoxTextured/glTF-Embedded/BoxTextured.gltf', 'BoxTextured/glTF-Binary/BoxTextured.glb']:
+            loaded = self.load_scene(path)
+            self.assertEqual(len(scene.meshes), len(loaded.meshes))
+            for mesh, loaded_mesh in zip(scene.meshes, loaded.meshes):
+                vertices, buffer_format = mesh.vao.read_vertices()
+                loaded_vertices, loaded_format = loaded_mesh.vao.read_vertices()
+                self.assertEqual(buffer_format, loaded_format)
+                self.assertEqual(vertices.tobytes(), loaded_vertices.tobytes())
+                numpy.testing.assert_array_equal(mesh.vao.read_indices(), loaded_mesh.vao.read_indices())
+
+    def test_buffer_map(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'data.bin')
+            with open(path, 'wb') as fd:
+                fd.write(bytes(range(16)))
+
+            buffer = GLTFBuffer(0, {'byteLength': 8}, directory)
+            buffer.map(path, offset=4, length=8)
+            data = buffer.read(byte_offset=2, byte_length=4)
+            self.assertIsInstance(data, memoryview)
+            self.assertEqual(bytes(data), bytes([6, 7, 8, 9]))
+
+            # Arrays created from the buffer keep the mapping alive
+            array = numpy.frombuffer(data, dtype='u1')
+            self.assertFalse(buffer.close())
+            self.assertIsNone(buffer.data)
+            self.assertEqual(array.tolist(), [6, 7, 8, 9])
+
+    def test_close(self):
+        """No buffer file stays mapped once a scene is loaded"""
+        if not os.path.exists('/proc/self/maps'):
+            self.skipTest("Mapped files are listed in /proc/self/maps")
+
+        for path in ['BoxTextured/glTF/BoxTextured.gltf', 'BoxTextured/glTF-Binary/BoxTextured.glb']:
+            loader = GLTF2(SceneDescription(label=path, path=path))
+            loader.load()
+            self.assertTrue(all(buffer.data is None for buffer in loader.meta.buffers))
+
+            with open('/proc/self/maps') as fd:
+                maps = fd.read()
+            self.assertNotIn('BoxTextured0.bin', maps)
+            self.assertNotIn('BoxTextured.glb', maps)
+
+    def test_glb_memory(self):
+        """The binary chunk is mapped and uploaded without copies"""
+        count = 200000
+        positions = numpy.random.RandomState(0).uniform(-1.0, 1.0, (count, 3)).astype('f4')
+        indices = numpy.arange(count, dtype='u4')[::-1].copy()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'large.glb')
+            write_glb(path, positions, indices)
+
+            tracemalloc.start()
+            try:
+                scene = self.load_scene(path)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+            self.assertLess(peak, os.path.getsize(path) * 0.25)
+
+            vertices, _ = scene.meshes[0].vao.read_vertices()
+            numpy.testing.assert_array_equal(vertices['in_position'].reshape(-1, 3), positions)
+            numpy.testing.assert_array_equal(scene.meshes[0].vao.read_indices(), indices)
+            scene.destroy()
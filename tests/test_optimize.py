@@ -0,0 +1,58 @@
+import numpy
+
+from demosys import geometry, resources
+from demosys.resources.meta import SceneDescription
+from demosys.scene import optimize
+from demosys.test.testcase import DemosysTestCase
+
+
+class OptimizeTest(DemosysTestCase):
+
+    def shuffled_plane(self):
+        vao = geometry.plane_xz(resolution=(40, 40))
+        triangles = vao.read_indices().reshape(-1, 3)
+        numpy.random.RandomState(1).shuffle(triangles)
+        return vao, triangles.ravel()
+
+    def test_tipsify(self):
+        vao, indices = self.shuffled_plane()
+        result = optimize.tipsify(indices, vao.vertex_count, cache_size=16)
+
+        # The same triangles are emitted in a cache friendly order
+        self.assertEqual(len(result), len(indices))
+        self.assertEqual(
+            sorted(map(tuple, indices.reshape(-1, 3).tolist())),
+            sorted(map(tuple, result.reshape(-1, 3).tolist())),
+        )
+        self.assertLess(optimize.acmr(result, cache_size=16), optimize.acmr(indices, cache_size=16))
+        self.assertLess(optimize.acmr(result, cache_size=16), 1.0)
+
+    def test_vertex_fetch(self):
+        indices = numpy.array([3, 1, 0, 0, 1, 2], dtype='u4')
+        order, remapped = optimize.optimize_vertex_fetch(indices, 5)
+        self.assertEqual(order.tolist(), [3, 1, 0, 2, 4])
+        self.assertEqual(remapped.tolist(), [0, 1, 2, 2, 1, 3])
+
+    def test_optimize_vao(self):
+        vao, indices = self.shuffled_plane()
+        vao.index_buffer(indices, narrow=True)
+        positions = vao.read_vertices()[0]['in_position'][indices]
+
+        stats = optimize.optimize_vao(vao, cache_size=16)
+        self.assertLess(stats['acmr_after'], stats['acmr_before'])
+
+        # Triangles reference the same positions after reordering
+        vertices, _ = vao.read_vertices()
+        result = vertices['in_position'][vao.read_indices()]
+        self.assertEqual(
+            sorted(map(tuple, positions.reshape(-1, 9).tolist())),
+            sorted(map(tuple, result.reshape(-1, 9).tolist())),
+        )
+
+    def test_optimize_scene(self):
+        path = 'cube.obj'
+        scene = resources.scenes.load(SceneDescription(label=path, path=path, optimize=True))
+        vao = scene.meshes[0].vao
+        # The triangle soup is indexed
+        self.assertEqual(vao.vertex_count, 24)
+        self.assertEqual(len(vao.read_indices()), 36)
@@ -0,0 +1,32 @@
+from demosys import geometry
+from demosys.opengl.profiler import GPUProfiler
+from demosys.test.testcase import DemosysTestCase
+
+
+class ProfilerTestCase(DemosysTestCase):
+
+    def setUp(self):
+        self.program = self.load_program("vf_pos.glsl")
+        self.profiler = GPUProfiler(enabled=True, latency=2, samples=10)
+
+    def test_scopes(self):
+        quad = geometry.quad_fs()
+
+        for _ in range(5):
+            with self.profiler.scope("effect"):
+                quad.render(self.program)
+                with self.profiler.scope("pass"):
+                    quad.render(self.program)
+            self.profiler.end_frame()
+
+        averages = self.profiler.averages()
+        self.assertEqual(list(averages.keys()), ['effect', 'effect/pass'])
+        self.assertEqual(len(self.profiler._times['effect']), 3)
+        self.assertGreaterEqual(self.profiler.average('effect', inclusive=True), averages['effect'])
+
+    def test_disabled(self):
+        self.profiler.configure(enabled=False)
+        with self.profiler.scope("effect"):
+            pass
+        self.profiler.end_frame()
+        self.assertEqual(self.profiler.averages(), {})
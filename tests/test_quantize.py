@@ -0,0 +1,67 @@
+import numpy
+
+from demosys import geometry
+from demosys.opengl import quantize
+from demosys.test.testcase import DemosysTestCase
+
+
+class QuantizeTest(DemosysTestCase):
+
+    def random_normals(self, count=1000):
+        normals = numpy.random.RandomState(1).normal(size=(count, 3))
+        return normals / numpy.linalg.norm(normals, axis=1, keepdims=True)
+
+    def test_oct_normals(self):
+        normals = self.random_normals()
+        values, frmt, decode = quantize.quantize_attribute(normals, 'oct')
+        self.assertEqual(frmt, '2i2')
+        self.assertEqual(values.dtype, numpy.int16)
+
+        result = quantize.dequantize_attribute(values, 'oct', decode)
+        self.assertLess(numpy.abs(result - normals).max(), 1e-3)
+
+    def test_snorm8_normals(self):
+        normals = self.random_normals()
+        values, frmt, decode = quantize.quantize_attribute(normals, 'snorm8')
+        self.assertEqual(frmt, '3i1')
+        self.assertIsNone(decode)
+
+        result = quantize.dequantize_attribute(values, 'snorm8')
+        self.assertLess(numpy.abs(result - normals).max(), 0.02)
+
+    def test_unorm16(self):
+        positions = numpy.random.RandomState(1).uniform(-10.0, 5.0, size=(100, 3))
+        values, frmt, decode = quantize.quantize_attribute(positions, 'unorm16')
+        self.assertEqual(frmt, '3u2')
+        numpy.testing.assert_allclose(decode['offset'], positions.min(axis=0))
+
+        result = quantize.dequantize_attribute(values, 'unorm16', decode)
+        self.assertLess(numpy.abs(result - positions).max(), 15.0 / 65535)
+
+        with self.assertRaises(ValueError):
+            quantize.quantize_attribute(positions, 'unorm8')
+
+    def test_quantize_vao(self):
+        vao = geometry.sphere()
+        vertices, _ = vao.read_vertices()
+        self.assertEqual(vertices.dtype.itemsize, 32)
+
+        encoded = quantize.quantize_vao(vao, {'in_position': 'unorm16', 'in_normal': 'oct', 'in_uv': 'half'})
+        self.assertEqual(sorted(encoded.keys()), ['in_normal', 'in_position', 'in_uv'])
+        self.assertEqual(len(vao.buffers), 1)
+
+        result, buffer_format = vao.read_vertices()
+        self.assertEqual(buffer_format, '3u2 2x 2i2 2f2')
+        self.assertEqual(result.dtype.itemsize, 16)
+
+        positions = quantize.dequantize_attribute(result['in_position'], 'unorm16', encoded['in_position'][1])
+        self.assertLess(numpy.abs(positions - vertices['in_position']).max(), 1e-4)
+
+        # Attributes already encoded are left alone
+        self.assertEqual(quantize.quantize_vao(vao, {'in_normal': 'oct'}), {})
+
+    def test_geometry(self):
+        vao = geometry.sphere(quantize=True)
+        vertices, buffer_format = vao.read_vertices()
+        self.assertEqual(buffer_format, '3f 3f2 2x 2f2')
+        self.assertEqual(vertices.dtype.itemsize, 24)
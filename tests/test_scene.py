@@ -0,0 +1,527 @@
+import os
+import tempfile
+
+import numpy
+from pyrr import matrix44
+
+import moderngl
+
+from demosys import geometry
+from demosys.scene import Material, MaterialTexture, Mesh, Node, Scene, programs
+from demosys.test.testcase import DemosysTestCase
+
+
+class SceneTestCase(DemosysTestCase):
+
+    def setUp(self):
+        self.projection = matrix44.create_perspective_projection_matrix(75.0, 16 / 9, 0.1, 100.0, dtype='f4')
+        self.camera = matrix44.create_from_translation((0.0, 0.0, -5.0), dtype='f4')
+
+    def test_program_variants(self):
+        scene = self.load_scene('BoxTextured/glTF/BoxTextured.gltf')
+        mesh = scene.meshes[0]
+        self.assertIsInstance(mesh.mesh_program, programs.VariantProgram)
+        self.assertEqual(
+            mesh.program_features,
+            programs.HAS_TEXTURE | programs.HAS_NORMALS | programs.DOUBLE_SIDED,
+        )
+
+        # Variants are compiled on first draw
+        self.assertEqual(len(mesh.mesh_program.variants), 0)
+        scene.draw(projection_matrix=self.projection, camera_matrix=self.camera)
+        self.assertEqual(list(mesh.mesh_program.variants.keys()), [mesh.program_features])
+
+        # Cached variants are reused
+        variant = mesh.mesh_program.get_variant(mesh.program_features)
+        self.assertIs(mesh.mesh_program.get_variant(mesh.program_features), variant)
+
+        # Variants are compiled from a path. A program can not be passed in.
+        with self.assertRaises(TypeError):
+            programs.VariantProgram(program=variant)
+
+    def test_program_variants_obj(self):
+        scene = self.load_scene('cube.obj')
+        scene.draw(projection_matrix=self.projection, camera_matrix=self.camera)
+        for mesh in scene.meshes:
+            self.assertFalse(mesh.program_features & programs.HAS_TEXTURE)
+
+    def create_mesh(self, material):
+        mesh = Mesh("cube", vao=geometry.cube(0.5, 0.5, 0.5, uvs=False), material=material)
+        mesh.add_attribute('POSITION', 'in_position', 3)
+        mesh.add_attribute('NORMAL', 'in_normal', 3)
+        mesh.bbox_min = numpy.array([-0.25, -0.25, -0.25], dtype='f4')
+        mesh.bbox_max = numpy.array([0.25, 0.25, 0.25], dtype='f4')
+        return mesh
+
+    def create_scene(self, count=4, shared=False, instancing=True):
+        """Scene with a row of cubes sharing two materials or a single mesh"""
+        scene = Scene("cubes")
+        materials = [Material("red"), Material("green")]
+        materials[0].color = (1.0, 0.0, 0.0, 1.0)
+        materials[1].color = (0.0, 1.0, 0.0, 1.0)
+        shared_mesh = self.create_mesh(materials[0]) if shared else None
+        if shared:
+            scene.meshes.append(shared_mesh)
+
+        for i in range(count):
+            mesh = shared_mesh or self.create_mesh(materials[i % 2])
+            if not shared:
+                scene.meshes.append(mesh)
+            matrix = matrix44.multiply(
+                matrix44.create_from_y_rotation(0.5 * i, dtype='f4'),
+                matrix44.create_from_translation((i - count / 2, 0.0, 0.0), dtype='f4'),
+            )
+            scene.root_nodes.append(Node(mesh=mesh, matrix=matrix))
+
+        scene.prepare(instancing=instancing)
+        return scene
+
+    def render(self, scene):
+        self.window.fbo.clear()
+        scene.draw(projection_matrix=self.projection, camera_matrix=self.camera)
+        return numpy.frombuffer(self.window.fbo.read(), dtype='u1').astype('i4')
+
+    def test_batching(self):
+        scene = self.create_scene()
+        self.assertEqual(scene.draw_calls, 4)
+        reference = self.render(scene)
+
+        scene.batch()
+        self.assertEqual(len(scene.batches), 1)
+        self.assertEqual(scene.batches[0].vertex_count, 36 * 4)
+        self.assertEqual(len(scene.batches[0].groups), 2)
+        self.assertEqual(scene.draw_calls, 2)
+        self.assertTrue(all(node.batched for node in scene.root_nodes))
+
+        batched = self.render(scene)
+        self.assertGreater(reference.sum(), 0)
+        self.assertLess(numpy.abs(reference - batched).mean(), 0.5)
+
+        # Without indirect rendering consecutive visible parts are drawn together
+        scene.batch(indirect=False)
+        self.assertEqual(scene.draw_calls, 2)
+        batched = self.render(scene)
+        self.assertLess(numpy.abs(reference - batched).mean(), 0.5)
+
+        scene.release_batches()
+        self.assertFalse(any(node.batched for node in scene.root_nodes))
+
+        scene = self.create_scene(count=6)
+        scene.batch(indirect=False)
+        batch = scene.batches[0]
+        batch.set_visible([True, False, True, True, True, True])
+        self.assertEqual(batch.draw_calls, 3)
+        part = batch.parts[2]
+        self.assertEqual(batch.ranges()[0][1], (part.first_index, part.index_count))
+        batch.set_visible([False, False, False, True, True, True])
+        self.assertEqual(batch.ranges(), [[], [(batch.parts[3].first_index, 3 * batch.parts[3].index_count)]])
+        self.assertEqual(batch.draw_calls, 1)
+
+        # Releasing the merged sources frees their VAOs for good
+        self.assertEqual(scene.batch(release_sources=True), 6)
+        self.assertTrue(all(mesh.vao is None for mesh in scene.meshes))
+        self.assertLess(numpy.abs(self.render(self.create_scene(count=6)) - self.render(scene)).mean(), 0.5)
+        with self.assertRaises(ValueError):
+            scene.release_batches()
+        scene.destroy()
+
+    def test_instancing(self):
+        reference = self.render(self.create_scene(shared=True, instancing=False))
+
+        scene = self.create_scene(shared=True)
+        self.assertEqual(len(scene.instance_groups), 1)
+        self.assertEqual(scene.instance_groups[0].instances, 4)
+        self.assertTrue(scene.meshes[0].program_features & programs.INSTANCED)
+        self.assertEqual(scene.draw_calls, 1)
+
+        instanced = self.render(scene)
+        self.assertGreater(reference.sum(), 0)
+        self.assertLess(numpy.abs(reference - instanced).mean(), 0.5)
+
+        # Instances follow the scene's view matrix
+        scene.view_matrix = matrix44.create_from_translation((0.0, 1.0, 0.0), dtype='f4')
+        numpy.testing.assert_allclose(
+            scene.instance_groups[0].matrices[0], scene.root_nodes[0].matrix_global)
+
+        # Instanced meshes are not batched
+        scene.batch()
+        self.assertEqual(scene.batches, [])
+
+        # Preparing again replaces the groups instead of dropping the mesh
+        group = scene.instance_groups[0]
+        scene.view_matrix = matrix44.create_identity(dtype='f4')
+        scene.prepare()
+        self.assertEqual(len(scene.instance_groups), 1)
+        self.assertIsNot(scene.instance_groups[0], group)
+        self.assertEqual(len([info for info in scene.meshes[0].vao.buffers if info.per_instance]), 1)
+        self.assertEqual(scene.draw_calls, 1)
+        self.assertLess(numpy.abs(reference - self.render(scene)).mean(), 0.5)
+
+        # Released groups draw their nodes separately
+        scene.release_instances()
+        self.assertFalse(any(node.instanced for node in scene.root_nodes))
+        self.assertFalse(scene.meshes[0].program_features & programs.INSTANCED)
+        self.assertEqual(scene.draw_calls, 4)
+        self.assertLess(numpy.abs(reference - self.render(scene)).mean(), 0.5)
+
+    def test_quantize(self):
+        reference = self.render(self.create_scene())
+
+        scene = self.create_scene()
+        stats = scene.quantize(position='unorm16')
+        self.assertEqual(stats['meshes'], 4)
+        self.assertEqual(stats['bytes_before'], 36 * 24 * 4)
+        self.assertEqual(stats['bytes_after'], 36 * 12 * 4)
+
+        features = scene.meshes[0].program_features
+        self.assertTrue(features & programs.QUANTIZED_POSITION)
+        self.assertTrue(features & programs.OCT_NORMALS)
+
+        quantized = self.render(scene)
+        self.assertGreater(reference.sum(), 0)
+        self.assertLess(numpy.abs(reference - quantized).mean(), 0.5)
+
+        # Positions are decoded per mesh so they are not batched
+        scene.batch()
+        self.assertEqual(scene.batches, [])
+
+    def create_hierarchy(self, depth=3, children=3):
+        """Tree of nodes with a rotation and translation at each level"""
+        def create(level):
+            matrix = matrix44.multiply(
+                matrix44.create_from_z_rotation(0.1 * level, dtype='f4'),
+                matrix44.create_from_translation((1.0, level, 0.0), dtype='f4'),
+            )
+            node = Node(matrix=matrix if level % 2 == 0 else None)
+            if level < depth:
+                for _ in range(children):
+                    node.add_child(create(level + 1))
+            return node
+
+        return [create(0), create(0)]
+
+    def test_scene_graph(self):
+        view_matrix = matrix44.create_from_translation((0.0, 0.0, -5.0), dtype='f4')
+
+        # Reference matrices calculated recursively
+        reference = self.create_hierarchy()
+        for node in reference:
+            node.calc_view_mat(view_matrix)
+
+        scene = Scene("graph")
+        scene.root_nodes = self.create_hierarchy()
+        scene.prepare()
+        scene.view_matrix = view_matrix
+
+        graph = scene.graph
+        self.assertEqual(len(graph), 2 * (1 + 3 + 9 + 27))
+        self.assertEqual(len(graph.levels), 4)
+        self.assertEqual(graph.parents[:3].tolist(), [-1, 0, 1])
+        self.assertEqual(graph.subtree_end[0], 40)
+
+        def walk(nodes):
+            for node in nodes:
+                yield node
+                yield from walk(node.children)
+
+        for expected, node in zip(walk(reference), walk(scene.root_nodes)):
+            numpy.testing.assert_allclose(node.matrix_global, expected.matrix_global, atol=1e-5)
+            self.assertEqual(node.matrix is None, expected.matrix is None)
+            self.assertEqual(len(node.matrix_global_bytes), 64)
+
+        # Nodes are views into the graph
+        node = scene.root_nodes[0]
+        node.matrix = matrix44.create_from_translation((2.0, 0.0, 0.0), dtype='f4')
+        numpy.testing.assert_array_equal(graph.local[node.index], node.matrix)
+
+    def test_dirty_transforms(self):
+        scene = Scene("graph")
+        scene.root_nodes = self.create_hierarchy()
+        scene.prepare()
+        graph = scene.graph
+        self.assertEqual(scene.update_transforms(), 0)
+
+        # Only the subtree of the changed node is updated
+        node = scene.root_nodes[1].children[0]
+        child = node.children[0].children[0]
+        node.matrix = matrix44.create_from_translation((0.0, 3.0, 0.0), dtype='f4')
+        old_bytes = child.matrix_global_bytes
+        self.assertEqual(scene.update_transforms(), 13)
+        self.assertFalse(graph.dirty)
+        self.assertNotEqual(child.matrix_global_bytes, old_bytes)
+
+        # Same result as a full update
+        world = graph.world.copy()
+        graph.update(scene.view_matrix)
+        numpy.testing.assert_allclose(world, graph.world, atol=1e-6)
+
+        # In place changes must be flagged
+        node.matrix[3, 0] = 5.0
+        node.mark_dirty()
+        scene.draw(projection_matrix=self.projection, camera_matrix=self.camera)
+        self.assertAlmostEqual(float(child.matrix_global[3, 0]), float(graph.world[child.index][3, 0]))
+        self.assertFalse(graph.dirty)
+
+
+    def test_frustum_culling(self):
+        # Only the four cubes on the right are inside the frustum
+        self.camera = matrix44.create_from_translation((-3.0, 0.0, -2.0), dtype='f4')
+
+        scene = self.create_scene(count=8)
+        scene.culling = False
+        reference = self.render(scene)
+        self.assertEqual((scene.drawn, scene.culled), (8, 0))
+
+        scene.culling = True
+        culled = self.render(scene)
+        self.assertEqual((scene.drawn, scene.culled), (4, 4))
+        self.assertGreater(reference.sum(), 0)
+        self.assertLess(numpy.abs(reference - culled).mean(), 0.5)
+
+        # Culled parts of batches are disabled
+        scene.batch(indirect=False)
+        batched = self.render(scene)
+        self.assertEqual(int(numpy.count_nonzero(scene.batches[0].commands.data['instance_count'])), 4)
+        self.assertLess(numpy.abs(reference - batched).mean(), 0.5)
+
+        # Only visible instances are uploaded
+        scene = self.create_scene(count=8, shared=True)
+        scene.culling = False
+        reference = self.render(scene)
+        self.assertEqual(scene.instance_groups[0].instance_count, 8)
+
+        scene.culling = True
+        instanced = self.render(scene)
+        self.assertEqual(scene.instance_groups[0].instance_count, 4)
+        self.assertLess(numpy.abs(reference - instanced).mean(), 0.5)
+
+        # Culled boxes are visible when culling with a different camera
+        scene.cull_camera_matrix = self.camera
+        self.camera = matrix44.create_from_translation((0.0, 0.0, -8.0), dtype='f4')
+        instanced = self.render(scene)
+        self.assertEqual(scene.culled, 4)
+        scene.draw_culled = True
+        self.assertGreater(self.render(scene).sum(), instanced.sum())
+
+    def test_bvh(self):
+        scene = self.create_scene(count=8)
+        self.assertIsNotNone(scene.bvh)
+        self.assertEqual(len(scene.bvh), 8)
+
+        # A ray along the row of cubes hits all of them in order
+        hits = scene.raycast((-10.0, 0.0, 0.0), (1.0, 0.0, 0.0))
+        self.assertEqual([node for node, _ in hits], scene.root_nodes)
+        self.assertTrue(all(a[1] <= b[1] for a, b in zip(hits, hits[1:])))
+        self.assertEqual(scene.raycast((-10.0, 2.0, 0.0), (1.0, 0.0, 0.0)), [])
+
+        # Moved nodes are refitted and culled at their new position
+        self.camera = matrix44.create_from_translation((-3.0, 0.0, -2.0), dtype='f4')
+        self.render(scene)
+        self.assertEqual(scene.drawn, 4)
+        scene.root_nodes[0].matrix = matrix44.create_from_translation((3.0, 0.0, 0.0), dtype='f4')
+        self.render(scene)
+        self.assertEqual(scene.drawn, 5)
+        self.assertIn(scene.root_nodes[0], [node for node, _ in scene.raycast((3.0, 3.0, 0.0), (0.0, -1.0, 0.0))])
+
+    def test_render_queue(self):
+        reference_scene = self.create_scene(count=8, instancing=False)
+        self.window.fbo.clear()
+        for node in reference_scene.root_nodes:
+            node.draw(
+                projection_matrix=self.projection.astype('f4').tobytes(),
+                camera_matrix=self.camera.astype('f4').tobytes(),
+            )
+        reference = numpy.frombuffer(self.window.fbo.read(), dtype='u1').astype('i4')
+
+        # Nodes alternate between two materials
+        scene = self.create_scene(count=8, instancing=False)
+        queued = self.render(scene)
+        self.assertLess(numpy.abs(reference - queued).mean(), 0.5)
+
+        queue = scene.render_queue
+        materials = [queue.nodes[i].mesh.material for i in queue.order.tolist()]
+        self.assertEqual(sum(a is not b for a, b in zip(materials, materials[1:])), 1)
+        self.assertEqual(queue.stats['draw_calls'], 8)
+        self.assertEqual(queue.stats['program_changes'], 1)
+        # Projection, camera, color for each material and the view matrix of each node
+        self.assertEqual(queue.stats['uniform_writes'], 2 + 2 + 8)
+
+        # Opaque meshes are drawn front to back within each material
+        depth = -(scene.graph.world[queue.indices[queue.order], 3, :3] @ self.camera[:3, 2] + self.camera[3, 2])
+        for material in set(materials):
+            values = [d for d, m in zip(depth.tolist(), materials) if m is material]
+            self.assertEqual(values, sorted(values))
+
+        # A texture shared by all meshes is bound once
+        texture = self.ctx.texture((2, 2), 4, data=bytes([255] * 16))
+        scene = Scene("textured")
+        material = Material("textured")
+        material.mat_texture = MaterialTexture(texture)
+        for i in range(4):
+            mesh = Mesh("cube", vao=geometry.cube(0.5, 0.5, 0.5), material=material)
+            mesh.add_attribute('POSITION', 'in_position', 3)
+            mesh.add_attribute('NORMAL', 'in_normal', 3)
+            mesh.add_attribute('TEXCOORD_0', 'in_uv', 2)
+            scene.meshes.append(mesh)
+            scene.root_nodes.append(Node(mesh=mesh, matrix=matrix44.create_from_translation((i - 2, 0, 0), dtype='f4')))
+
+        scene.prepare()
+        self.assertGreater(self.render(scene).sum(), 0)
+        self.assertEqual(scene.render_queue.stats['draw_calls'], 4)
+        self.assertEqual(scene.render_queue.stats['texture_changes'], 1)
+
+    def test_compile(self):
+        self.camera = matrix44.create_from_translation((-3.0, 0.0, -2.0), dtype='f4')
+        scene = self.create_scene(count=8, instancing=False)
+        reference = self.render(scene)
+
+        draw_list = scene.compile()
+        self.assertEqual(len(draw_list), 8)
+        self.assertFalse(any(packet.fallback for packet in draw_list.packets))
+        # Materials alternate between nodes but only change once in the list
+        self.assertEqual(sum(1 for packet in draw_list.packets if packet.values), 2)
+        self.assertEqual(sum(1 for packet in draw_list.packets if packet.camera), 1)
+
+        compiled = self.render(scene)
+        self.assertEqual(draw_list.draw_calls, 4)
+        self.assertLess(numpy.abs(reference - compiled).mean(), 0.5)
+
+        # Moved nodes update the packets
+        scene.root_nodes[0].matrix = matrix44.create_from_translation((3.0, 0.0, 0.0), dtype='f4')
+        compiled = self.render(scene)
+        self.assertEqual(draw_list.draw_calls, 5)
+        scene.draw_list = None
+        self.assertLess(numpy.abs(self.render(scene) - compiled).mean(), 0.5)
+
+    def test_compile_modified(self):
+        """Optimizing or quantizing a compiled scene rebuilds the draw list"""
+        scene = self.create_scene(instancing=False)
+        reference = self.render(scene)
+
+        draw_list = scene.compile()
+        self.render(scene)
+        scene.optimize()
+        self.assertLess(numpy.abs(reference - self.render(scene)).mean(), 0.5)
+        self.assertIsNot(scene.draw_list, draw_list)
+
+        # Quantized meshes select other program variants
+        draw_list = scene.draw_list
+        scene.quantize(position='unorm16')
+        self.assertLess(numpy.abs(reference - self.render(scene)).mean(), 0.5)
+        self.assertIsNot(scene.draw_list, draw_list)
+        self.assertEqual(len(scene.draw_list), 4)
+
+    def test_occlusion_culling(self):
+        scene = Scene("occlusion")
+        material = Material("red")
+        material.color = (1.0, 0.0, 0.0, 1.0)
+        mesh = self.create_mesh(material)
+        scene.meshes.append(mesh)
+        # A wall in front of three cubes and a cube next to it
+        wall = Node(mesh=mesh, matrix=matrix44.create_from_scale((10.0, 10.0, 1.0), dtype='f4'))
+        scene.root_nodes.append(wall)
+        for position in ((-1.0, 0.0, -3.0), (0.0, 0.0, -3.0), (1.0, 0.0, -3.0), (5.0, 0.0, 0.0)):
+            scene.root_nodes.append(Node(mesh=mesh, matrix=matrix44.create_from_translation(position, dtype='f4')))
+        scene.prepare(instancing=False)
+        scene.occlusion_culling = True
+        self.ctx.enable(moderngl.DEPTH_TEST)
+        self.addCleanup(self.ctx.disable, moderngl.DEPTH_TEST)
+
+        # Queries issued in one frame hide meshes in the next
+        reference = self.render(scene)
+        self.assertEqual((scene.drawn, scene.occluded), (5, 0))
+        occluded = self.render(scene)
+        self.assertEqual((scene.drawn, scene.occluded, scene.culled), (2, 3, 0))
+        self.assertEqual(scene.occlusion.occluded.tolist(), [False, True, True, True, False])
+        self.assertLess(numpy.abs(reference - occluded).mean(), 0.5)
+
+        # Uncovered meshes show up one frame late
+        wall.matrix = matrix44.create_from_translation((100.0, 0.0, 0.0), dtype='f4')
+        self.render(scene)
+        self.assertEqual(scene.occluded, 3)
+        self.render(scene)
+        self.assertEqual((scene.drawn, scene.occluded, scene.culled), (4, 0, 1))
+
+        scene.occlusion_culling = False
+        self.render(scene)
+        self.assertIsNone(scene.occlusion)
+        self.assertEqual(scene.occluded, 0)
+
+    def test_lods(self):
+        scene = Scene("sphere")
+        mesh = Mesh("sphere", vao=geometry.sphere(radius=1.0, sectors=64, rings=32), material=Material("white"))
+        mesh.add_attribute('POSITION', 'in_position', 3)
+        mesh.add_attribute('NORMAL', 'in_normal', 3)
+        mesh.bbox_min = numpy.array([-1.0, -1.0, -1.0], dtype='f4')
+        mesh.bbox_max = numpy.array([1.0, 1.0, 1.0], dtype='f4')
+        scene.meshes.append(mesh)
+        scene.root_nodes.append(Node(mesh=mesh, matrix=matrix44.create_identity(dtype='f4')))
+
+        with tempfile.TemporaryDirectory() as directory:
+            cache = os.path.join(directory, 'sphere.lod.npz')
+            stats = scene.generate_lods(levels=2, cache=cache)
+            self.assertEqual(stats['levels'], 2)
+            self.assertEqual(stats['cached'], 0)
+            self.assertLess(stats['triangles_after'], stats['triangles_before'] // 3)
+            self.assertTrue(os.path.exists(cache))
+
+            # The same geometry is read back from the cache
+            cached = Mesh("sphere", vao=geometry.sphere(radius=1.0, sectors=64, rings=32))
+            cached.add_attribute('POSITION', 'in_position', 3)
+            other = Scene("cached")
+            other.meshes.append(cached)
+            self.assertEqual(other.generate_lods(levels=2, cache=cache)['cached'], 2)
+
+        self.assertEqual([size for size, _ in mesh.lods], [0.25, 0.125])
+        self.assertIs(mesh.select_lod(0.5), mesh)
+        self.assertIs(mesh.select_lod(0.2), mesh.lods[0][1])
+        self.assertIs(mesh.select_lod(0.1), mesh.lods[1][1])
+
+        scene.prepare()
+        self.assertEqual(scene.instance_groups, [])
+        levels = []
+        for distance in (3.0, 12.0, 20.0, 0.5):
+            self.camera = matrix44.create_from_translation((0.0, 0.0, -distance), dtype='f4')
+            image = self.render(scene)
+            levels.append(int(scene.render_queue.levels[0]))
+            if distance == 12.0:
+                coarse = image
+                self.camera = matrix44.create_from_translation((0.0, 0.0, -distance), dtype='f4')
+                scene.render_queue.lod_thresholds[:] = -numpy.inf
+                reference = self.render(scene)
+                scene._cull_slots = None
+
+        # Cameras inside the bounding sphere draw the full detail mesh
+        self.assertEqual(levels, [0, 1, 2, 0])
+        self.assertGreater(reference.sum(), 0)
+        self.assertLess(numpy.abs(reference - coarse).mean(), 1.0)
+
+        # Compiled scenes select levels as well
+        scene.compile()
+        self.camera = matrix44.create_from_translation((0.0, 0.0, -20.0), dtype='f4')
+        self.render(scene)
+        self.assertEqual(int(scene.render_queue.levels[0]), 2)
+        self.assertEqual(scene.draw_list.draw_calls, 1)
+
+    def test_scene_bbox(self):
+        # Boxes are calculated from vertices for obj files
+        scene = self.load_scene('cube.obj')
+        self.assertIsNotNone(scene.meshes[0].bbox_min)
+        numpy.testing.assert_allclose(scene.bbox_min, [0.0, 0.0, 0.0], atol=1e-5)
+        numpy.testing.assert_allclose(scene.bbox_max, [1.0, 1.0, 1.0], atol=1e-5)
+
+        mesh = self.create_mesh(None)
+        mesh.bbox_min = mesh.bbox_max = None
+        mesh.calc_bbox()
+        numpy.testing.assert_allclose(mesh.bbox_min, [-0.25] * 3)
+        numpy.testing.assert_allclose(mesh.bbox_max, [0.25] * 3)
+
+        # Rotated boxes enclose all eight corners
+        scene = self.create_scene(count=8)
+        scene.calc_scene_bbox()
+        corners = []
+        for node in scene.root_nodes:
+            for corner in numpy.array(numpy.meshgrid(*[[-0.25, 0.25]] * 3)).reshape(3, -1).T:
+                corners.append((numpy.append(corner, 1.0) @ node.matrix)[:3])
+        numpy.testing.assert_allclose(scene.bbox_min, numpy.min(corners, axis=0), atol=1e-5)
+        numpy.testing.assert_allclose(scene.bbox_max, numpy.max(corners, axis=0), atol=1e-5)
@@ -0,0 +1,106 @@
+import os
+import tempfile
+
+import numpy
+
+from demosys import geometry, resources
+from demosys.resources.meta import SceneDescription
+from demosys.scene import lod, simplify
+from demosys.test.testcase import DemosysTestCase
+
+
+class SimplifyTest(DemosysTestCase):
+
+    def sphere(self):
+        vertices, _, indices = lod.read_geometry(geometry.sphere(radius=1.0, sectors=64, rings=32))
+        return vertices, indices
+
+    def test_simplify_sphere(self):
+        vertices, indices = self.sphere()
+        positions, result = simplify.simplify(vertices['in_position'], indices, 500)
+
+        triangles = result.reshape(-1, 3)
+        self.assertLessEqual(len(triangles), 500)
+        self.assertGreater(len(triangles), 250)
+        self.assertTrue(numpy.all(triangles[:, 0] != triangles[:, 1]))
+
+        # The surface stays close to the sphere
+        radii = numpy.linalg.norm(positions[numpy.unique(result)], axis=1)
+        self.assertLess(numpy.abs(radii - 1.0).max(), 0.05)
+
+    def test_simplify_plane_border(self):
+        vao = geometry.plane_xz(size=(2, 2), resolution=(20, 20))
+        original = vao.read_vertices()[0]['in_position']
+        positions, result = simplify.simplify(original, vao.read_indices(), 20)
+
+        # A flat plane collapses to a few triangles keeping its outline
+        self.assertLessEqual(len(result) // 3, 20)
+        used = positions[numpy.unique(result)]
+        numpy.testing.assert_allclose(used.min(axis=0), original.min(axis=0), atol=1e-5)
+        numpy.testing.assert_allclose(used.max(axis=0), original.max(axis=0), atol=1e-5)
+        numpy.testing.assert_allclose(positions[:, 1], 0.0, atol=1e-6)
+
+    def test_lod_chain(self):
+        vertices, indices = self.sphere()
+        chain = lod.lod_chain(vertices, indices, 'in_position', levels=3, ratio=0.5)
+        self.assertEqual(len(chain), 3)
+
+        triangles = len(indices) // 3
+        for level_vertices, level_indices in chain:
+            self.assertLessEqual(len(level_indices) // 3, triangles // 2)
+            self.assertEqual(int(level_indices.max()) + 1, len(level_vertices))
+            self.assertEqual(level_vertices.dtype, vertices.dtype)
+            triangles = len(level_indices) // 3
+
+    def test_cache(self):
+        vertices, indices = self.sphere()
+        chain = lod.lod_chain(vertices, indices, 'in_position', levels=2)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sphere.lod.npz')
+            lod.write_cache(path, {'sphere': chain}, 2, 0.5)
+
+            cached = lod.read_cache(path, 2, 0.5)
+            self.assertEqual(list(cached.keys()), ['sphere'])
+            for (level_vertices, level_indices), (cached_vertices, cached_indices) in zip(chain, cached['sphere']):
+                numpy.testing.assert_array_equal(level_vertices, cached_vertices)
+                numpy.testing.assert_array_equal(level_indices, cached_indices)
+
+            # Caches made with other settings are ignored
+            self.assertEqual(lod.read_cache(path, 3, 0.5), {})
+            self.assertEqual(lod.read_cache(os.path.join(directory, 'missing.npz'), 2, 0.5), {})
+
+    def write_sphere_obj(self, path):
+        """Write the test sphere as a triangulated obj file"""
+        vertices, indices = self.sphere()
+        with open(path, 'w') as fd:
+            for position in vertices['in_position'].reshape(-1, 3):
+                fd.write("v {} {} {}\n".format(*position))
+            for triangle in indices.reshape(-1, 3) + 1:
+                fd.write("f {} {} {}\n".format(*triangle))
+
+        return len(indices) // 3
+
+    def test_load_scene(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sphere.obj')
+            triangles = self.write_sphere_obj(path)
+
+            scene = resources.scenes.load(SceneDescription(label='sphere', path=path, lods=2, lod_cache=False))
+            levels = [level.vao.index_count // 3 for _, level in scene.meshes[0].lods]
+            self.assertEqual(len(levels), 2)
+            self.assertLessEqual(levels[0], triangles // 2)
+            self.assertLess(levels[1], levels[0])
+            self.assertFalse(os.path.exists(path + '.lod.npz'))
+
+            # Levels are cached next to the scene and read back on the next load
+            description = SceneDescription(label='sphere_cached', path=path, lods=2)
+            self.assertTrue(description.lod_cache)
+            scene = resources.scenes.load(description)
+            self.assertTrue(os.path.exists(path + '.lod.npz'))
+            cached = resources.scenes.load(SceneDescription(label='sphere_reload', path=path, lods=2))
+            self.assertEqual(
+                [level.vao.index_count for _, level in scene.meshes[0].lods],
+                [level.vao.index_count for _, level in cached.meshes[0].lods],
+            )
+            self.assertEqual(len(cached.meshes[0].lods), 2)
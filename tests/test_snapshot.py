@@ -0,0 +1,97 @@
+import os
+import tempfile
+
+import numpy
+from pyrr import matrix44
+
+from demosys import resources
+from demosys.resources.meta import SceneDescription
+from demosys.scene.snapshot import Snapshot
+from demosys.test.testcase import DemosysTestCase
+
+
+class SnapshotTest(DemosysTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.projection = matrix44.create_perspective_projection_matrix(75.0, 16 / 9, 0.1, 100.0, dtype='f4')
+        self.camera = matrix44.create_from_translation((0.0, 0.0, -3.0), dtype='f4')
+
+    def roundtrip(self, scene, name, **kwargs):
+        path = os.path.join(self.directory.name, name)
+        size = scene.write_snapshot(path)
+        self.assertEqual(size, os.path.getsize(path))
+        return resources.scenes.load(SceneDescription(label=name, path=path, **kwargs))
+
+    def render(self, scene):
+        self.window.fbo.clear()
+        scene.draw(projection_matrix=self.projection, camera_matrix=self.camera)
+        return numpy.frombuffer(self.window.fbo.read(), dtype='u1').astype('i4')
+
+    def assertSameMeshes(self, scene, loaded):
+        self.assertEqual(len(scene.meshes), len(loaded.meshes))
+        for mesh, loaded_mesh in zip(scene.meshes, loaded.meshes):
+            self.assertEqual(mesh.name, loaded_mesh.name)
+            self.assertEqual(mesh.attributes, loaded_mesh.attributes)
+            self.assertEqual(mesh.program_features, loaded_mesh.program_features)
+            numpy.testing.assert_allclose(mesh.bbox_min, loaded_mesh.bbox_min)
+            numpy.testing.assert_allclose(mesh.bbox_max, loaded_mesh.bbox_max)
+
+            vertices, buffer_format = mesh.vao.read_vertices()
+            loaded_vertices, loaded_format = loaded_mesh.vao.read_vertices()
+            self.assertEqual(buffer_format, loaded_format)
+            self.assertEqual(vertices.tobytes(), loaded_vertices.tobytes())
+            numpy.testing.assert_array_equal(mesh.vao.read_indices(), loaded_mesh.vao.read_indices())
+
+    def test_gltf(self):
+        scene = self.load_scene('BoxTextured/glTF/BoxTextured.gltf')
+        loaded = self.roundtrip(scene, 'box.dscene')
+
+        self.assertSameMeshes(scene, loaded)
+        numpy.testing.assert_allclose(scene.bbox_min, loaded.bbox_min)
+        numpy.testing.assert_allclose(scene.bbox_max, loaded.bbox_max)
+        self.assertEqual(len(scene.nodes), len(loaded.nodes))
+        for node, loaded_node in zip(scene.nodes, loaded.nodes):
+            self.assertEqual(node.matrix is None, loaded_node.matrix is None)
+            numpy.testing.assert_allclose(node.matrix_global, loaded_node.matrix_global, atol=1e-6)
+
+        # Embedded textures are stored as pixels
+        material, loaded_material = scene.meshes[0].material, loaded.meshes[0].material
+        self.assertEqual(material.color, loaded_material.color)
+        self.assertEqual(loaded_material.mat_texture.texture.size, material.mat_texture.texture.size)
+        self.assertEqual(loaded_material.mat_texture.texture.read(), material.mat_texture.texture.read())
+        self.assertEqual(loaded_material.mat_texture.sampler.filter, material.mat_texture.sampler.filter)
+
+        reference = self.render(scene)
+        self.assertGreater(reference.sum(), 0)
+        self.assertEqual(numpy.abs(reference - self.render(loaded)).max(), 0)
+
+    def test_processed_scene(self):
+        path = 'cube.obj'
+        scene = resources.scenes.load(SceneDescription(label=path, path=path, optimize=True, quantize=True))
+        loaded = self.roundtrip(scene, 'cube.dscene', arena=True)
+        self.assertIsNotNone(loaded.meshes[0].vao.buffers[0].range)
+
+        # Optimized and quantized buffers are stored as they are
+        self.assertSameMeshes(scene, loaded)
+        self.assertEqual(scene.meshes[0].quantization, loaded.meshes[0].quantization)
+        self.assertEqual(numpy.abs(self.render(scene) - self.render(loaded)).max(), 0)
+
+    def test_snapshot(self):
+        scene = self.load_scene('cube.obj')
+        path = os.path.join(self.directory.name, 'cube.dscene')
+        scene.write_snapshot(path)
+
+        with Snapshot(path) as snapshot:
+            self.assertEqual(len(snapshot.header['nodes']), 1)
+            vao = snapshot.header['vaos'][0]
+            with snapshot.blob(vao['buffers'][0]['data']) as data:
+                # Blobs are views into the mapped file
+                self.assertIsInstance(data, memoryview)
+                self.assertEqual(data.nbytes, scene.meshes[0].vao.buffers[0].size)
+
+        with open(path, 'r+b') as fd:
+            fd.write(b'NOSCENE!')
+        with self.assertRaises(ValueError):
+            Snapshot(path)
@@ -1,7 +1,9 @@
+import numpy
+
 import moderngl
 from demosys.test.testcase import DemosysTestCase
 from demosys import geometry
-from demosys.opengl.vao import VAO
+from demosys.opengl.vao import VAO, DynamicBuffer, interleave_vertices
 
 
 class VAOTest(DemosysTestCase):
@@ -41,3 +43,123 @@ class VAOTest(DemosysTestCase):
             per_instance=True,
         )
         vao.render(shader, instances=10)
+
+    def test_instance_cache(self):
+        vao = geometry.cube(1.0, 1.0, 1.0)
+        shader1 = self.load_program("vf_pos.glsl")
+        shader2 = self.load_program("vf_pos.glsl")
+
+        instance = vao.instance(shader1)
+        self.assertIs(vao.instance(shader1), instance)
+        vao.instance(shader2)
+        # Both programs share the same attribute layout
+        self.assertEqual(vao.cache_info, {'vertex_arrays': 2, 'layouts': 1})
+
+        # Instances for released programs are cleaned up
+        shader1.release()
+        self.assertEqual(vao.release_unused(), 1)
+        self.assertEqual(vao.cache_info['vertex_arrays'], 1)
+
+        vao.release()
+        self.assertEqual(vao.cache_info, {'vertex_arrays': 0, 'layouts': 0})
+
+    def test_dynamic_buffer(self):
+        shader = self.load_program("v_write_1.glsl")
+        dynamic = DynamicBuffer(12, regions=3)
+        vao = VAO("dynamic", mode=moderngl.POINTS)
+        self.assertIs(vao.buffer(dynamic, '1u', 'in_val'), dynamic)
+        result = self.ctx.buffer(reserve=12)
+
+        # Updates before rendering stay in the same region
+        dynamic.update(numpy.array([1, 2, 3], dtype='u4'))
+        dynamic.update(numpy.array([4], dtype='u4'), offset=4)
+        self.assertEqual(dynamic.index, 0)
+        vao.transform(shader, result)
+        self.assertEqual(numpy.frombuffer(result.read(), dtype='u4').tolist(), [256, 259, 258])
+
+        # A partial update after rendering moves to a new region keeping the old contents
+        dynamic.update(numpy.array([5], dtype='u4'))
+        self.assertEqual(dynamic.index, 1)
+        self.assertEqual(dynamic.copies, 1)
+        vao.transform(shader, result)
+        self.assertEqual(numpy.frombuffer(result.read(), dtype='u4').tolist(), [260, 259, 258])
+
+        # Wrapping around within the same frame reuses a region still in flight
+        for i in range(2):
+            dynamic.update(numpy.array([i, i, i], dtype='u4'))
+            vao.transform(shader, result)
+
+        self.assertEqual(dynamic.index, 0)
+        self.assertEqual(dynamic.stalls, 1)
+        self.assertEqual(vao.cache_info['vertex_arrays'], 3)
+        vao.release()
+
+    def test_dynamic_buffer_orphan(self):
+        shader = self.load_program("v_write_1.glsl")
+        dynamic = DynamicBuffer(12, regions=1)
+        vao = VAO("dynamic", mode=moderngl.POINTS)
+        vao.buffer(dynamic, '1u', 'in_val')
+        result = self.ctx.buffer(reserve=12)
+
+        dynamic.update(numpy.array([1, 2, 3], dtype='u4'))
+        vao.transform(shader, result)
+        dynamic.update(numpy.array([4], dtype='u4'), offset=8)
+        self.assertEqual(dynamic.orphans, 1)
+        vao.transform(shader, result)
+        self.assertEqual(numpy.frombuffer(result.read(), dtype='u4').tolist(), [256, 257, 259])
+        vao.release()
+
+    def test_interleave(self):
+        shader = self.load_program("vf_pos.glsl")
+        vao = geometry.sphere(sectors=8, rings=4, interleave=True)
+        self.assertEqual(len(vao.buffers), 1)
+        self.assertEqual(vao.buffers[0].attributes, ['in_position', 'in_normal', 'in_uv'])
+        self.assertEqual(vao.vertex_count, 32)
+        vao.render(shader)
+
+        # Attributes are padded to 4 byte alignment
+        vao = VAO("padding")
+        positions = numpy.arange(12, dtype='f4')
+        colors = numpy.arange(12, dtype='u1')
+        vao.buffer(positions, '3f', 'in_position')
+        vao.buffer(colors, '3f1', 'in_color')
+        vao.interleave()
+
+        info = vao.buffers[0]
+        self.assertEqual(info.vertex_size, 16)
+        self.assertEqual([f.format for f in info.attrib_formats], ['3f', '3f1', '1x'])
+        data = numpy.frombuffer(info.buffer.read(), dtype=info.dtype)
+        self.assertEqual(data['in_position'].flatten().tolist(), positions.tolist())
+        self.assertEqual(data['in_color'].flatten().tolist(), colors.tolist())
+        vao.render(shader)
+
+        # Arrays still on the CPU are interleaved before uploading
+        data, buffer_format = interleave_vertices([('in_position', '3f', positions), ('in_color', '3f1', colors)])
+        self.assertEqual(buffer_format, '3f 3f1 1x')
+        self.assertEqual(data.dtype, info.dtype)
+        self.assertEqual(data.tobytes(), info.buffer.read())
+
+        # Generated geometry is interleaved without reading it back
+        vao = geometry.cube(1.0, 1.0, 1.0, interleave=True)
+        vertices, buffer_format = vao.read_vertices()
+        reference, reference_format = geometry.cube(1.0, 1.0, 1.0).read_vertices()
+        self.assertEqual(buffer_format, reference_format)
+        self.assertEqual(vertices.tobytes(), reference.tobytes())
+
+    def test_index_narrowing(self):
+        shader = self.load_program("vf_pos.glsl")
+        vao = geometry.sphere(sectors=8, rings=4)
+        self.assertEqual(vao.index_element_size, 1)
+        vao.render(shader)
+
+        vao = geometry.plane_xz(resolution=(300, 300))
+        self.assertEqual(vao.index_element_size, 4)
+
+        vao = VAO("narrow")
+        vao.buffer(numpy.zeros(1000 * 3, dtype='f4'), '3f', 'in_position')
+        vao.index_buffer(numpy.array([0, 1, 999], dtype='u4'), narrow=True)
+        self.assertEqual(vao.index_element_size, 2)
+        vao.render(shader)
+
+        vao.index_buffer(numpy.array([0, 1, 2], dtype='u4'))
+        self.assertEqual(vao.index_element_size, 4)